@@ -15,7 +15,7 @@ from datetime import datetime
 
 from config import get_config
 from extensions import init_extensions, db
-from routes import types_bp, generate_bp, templates_bp, export_bp, auth_bp, history_bp, stats_bp, template_market_bp, api_key_bp, scheduler_bp, datasource_bp, relation_bp, notification_bp, webhook_bp, masking_bp, validation_bp, import_bp, audit_bp, settings_bp
+from routes import types_bp, generate_bp, templates_bp, export_bp, auth_bp, history_bp, stats_bp, template_market_bp, api_key_bp, scheduler_bp, datasource_bp, relation_bp, notification_bp, webhook_bp, masking_bp, validation_bp, import_bp, audit_bp, settings_bp, job_bp
 
 # Swagger 配置
 SWAGGER_CONFIG = {
@@ -113,11 +113,28 @@ def create_app(config_class=None):
     app.register_blueprint(import_bp)
     app.register_blueprint(audit_bp)
     app.register_blueprint(settings_bp)
+    app.register_blueprint(job_bp)
     
     # 初始化调度器
     from services.scheduler_service import scheduler_service
     scheduler_service.init_scheduler(app)
     
+    # 初始化异步生成任务
+    from services.job_service import generation_job_service
+    generation_job_service.init_app(app)
+    
+    # 初始化数据源连接池
+    from connectors.connection_pool import pool_manager
+    pool_manager.init_app(app)
+    
+    # 初始化数据源结构缓存
+    from services.schema_cache_service import schema_cache_service
+    schema_cache_service.init_app(app)
+    
+    # 初始化服务端 seed 的后台线程
+    from services.datasource_write_service import datasource_write_service
+    datasource_write_service.init_app(app)
+    
     # 健康检查端点
     @app.route("/api/health", methods=["GET"])
     def health():
@@ -27,6 +27,35 @@ class Config:
         "http://localhost:3000",
         "http://127.0.0.1:5173"
     ]
+    
+    # 异步生成任务配置
+    GENERATION_JOB_DIR = os.environ.get('GENERATION_JOB_DIR') or str(BASE_DIR / "data" / "jobs")  # 结果落盘目录
+    GENERATION_JOB_WORKERS = int(os.environ.get('GENERATION_JOB_WORKERS', 2))  # 后台工作线程数
+    GENERATION_JOB_STALE_SECONDS = int(os.environ.get('GENERATION_JOB_STALE_SECONDS', 60))  # 任务超过该秒数没有心跳即视为已中断
+    
+    # 定时任务 storage 输出的文件目录
+    SCHEDULED_EXPORT_DIR = os.environ.get('SCHEDULED_EXPORT_DIR') or str(BASE_DIR / "data" / "exports")
+    
+    # 多进程分片生成的进程数（<= 1 表示不启用，默认不启用），用于大数据量生成
+    GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS', 1))
+    
+    # 数据源连接池（按数据源复用连接，避免每次请求重新握手）
+    DATASOURCE_POOL_MIN_SIZE = int(os.environ.get('DATASOURCE_POOL_MIN_SIZE', 0))  # 空闲回收时保留的最少连接数
+    DATASOURCE_POOL_MAX_SIZE = int(os.environ.get('DATASOURCE_POOL_MAX_SIZE', 5))  # 每个数据源的最大连接数
+    DATASOURCE_POOL_IDLE_TIMEOUT = int(os.environ.get('DATASOURCE_POOL_IDLE_TIMEOUT', 300))  # 空闲连接回收时间（秒）
+    DATASOURCE_POOL_HEALTH_CHECK_INTERVAL = int(os.environ.get('DATASOURCE_POOL_HEALTH_CHECK_INTERVAL', 30))  # 空闲超过该秒数的连接借出前先检查
+    
+    # 运行中的数据源写入超过该秒数没有提交新的块即视为已中断（进程重启或退出），可以继续写入
+    DATASOURCE_WRITE_STALE_SECONDS = int(os.environ.get('DATASOURCE_WRITE_STALE_SECONDS', 600))
+    
+    # 数据源结构元数据缓存：过期前直接返回缓存，过期后比较结构指纹，变化时才重新获取（秒）
+    SCHEMA_CACHE_TTL = int(os.environ.get('SCHEMA_CACHE_TTL', 300))
+    
+    # MongoDB 结构推断（$sample 聚合）采样的文档数
+    DATASOURCE_MONGO_SCHEMA_SAMPLE_SIZE = int(os.environ.get('DATASOURCE_MONGO_SCHEMA_SAMPLE_SIZE', 1000))
+    
+    # MySQL 写入允许 LOAD DATA LOCAL INFILE（开启后服务器可请求读取本机文件，只在数据源均为可信服务器时开启）
+    DATASOURCE_MYSQL_LOCAL_INFILE = os.environ.get('DATASOURCE_MYSQL_LOCAL_INFILE', 'false').lower() == 'true'
 
 
 class DevelopmentConfig(Config):
@@ -6,10 +6,15 @@ from .base_connector import BaseConnector
 from .mysql_connector import MySQLConnector
 from .postgres_connector import PostgreSQLConnector
 from .mongo_connector import MongoDBConnector
+from .connection_pool import ConnectionPool, ConnectionPoolManager, create_connector, pool_manager
 
 __all__ = [
     'BaseConnector',
     'MySQLConnector',
     'PostgreSQLConnector',
-    'MongoDBConnector'
+    'MongoDBConnector',
+    'ConnectionPool',
+    'ConnectionPoolManager',
+    'create_connector',
+    'pool_manager'
 ]
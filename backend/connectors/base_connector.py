@@ -2,12 +2,28 @@
 数据库连接器基类
 定义通用接口
 """
+import itertools
+import time
+from collections import deque
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Callable
 
 
 class BaseConnector(ABC):
-    """数据库连接器基类"""
+    """
+    数据库连接器基类
+    子类实现 create_connection 建立原始连接；绑定连接池后 connect() 从池中借出连接，
+    disconnect() 归还连接而不关闭
+    """
+
+    # 连接是否可被多个调用方同时使用（如 MongoClient），为 True 时连接池只保留一个共享连接
+    SHARED_CONNECTION = False
+    
+    # 是否支持把多块写入放在一个事务中（write_chunks 的 single_transaction）
+    SUPPORTS_TRANSACTIONS = True
+    
+    # write_chunks 返回的统计中保留明细的最近块数
+    RECENT_CHUNK_STATS = 20
     
     def __init__(
         self,
@@ -25,15 +41,57 @@ class BaseConnector(ABC):
         self.password = password
         self.options = kwargs
         self._connection = None
+        self._pool = None
+        # 最近一次写入的统计 {method, rows, seconds, rows_per_second}
+        self.last_write_stats = None
+        # 写入方式名称，记入写入统计
+        self.write_method = 'insert'
+    
+    def bind_pool(self, pool) -> None:
+        """绑定连接池，之后的 connect / disconnect 从池中借出 / 归还连接"""
+        self._pool = pool
     
-    @abstractmethod
     def connect(self) -> bool:
-        """建立连接"""
-        pass
+        """建立连接（已绑定连接池时从池中借出）"""
+        if self._connection is not None:
+            return True
+        if self._pool is not None:
+            self._connection = self._pool.acquire()
+        else:
+            self._connection = self.create_connection()
+        return True
+    
+    def disconnect(self, discard: bool = False) -> None:
+        """
+        断开连接（已绑定连接池时归还到池中）
+        :param discard: 连接可能已处于异常状态，归还时关闭而不复用
+        """
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        if self._pool is not None:
+            self._pool.release(connection, discard=discard)
+        else:
+            self.close_connection(connection)
     
     @abstractmethod
-    def disconnect(self) -> None:
-        """断开连接"""
+    def create_connection(self) -> Any:
+        """建立一个新的原始连接"""
+        pass
+    
+    def close_connection(self, connection: Any) -> None:
+        """关闭原始连接"""
+        try:
+            connection.close()
+        except Exception:
+            pass
+    
+    def ping_connection(self, connection: Any) -> bool:
+        """健康检查：连接仍可用返回 True"""
+        return True
+    
+    def reset_connection(self, connection: Any) -> None:
+        """归还连接池前重置连接状态，抛出异常时连接被丢弃"""
         pass
     
     @abstractmethod
@@ -47,10 +105,34 @@ class BaseConnector(ABC):
         pass
     
     @abstractmethod
-    def get_table_schema(self, table_name: str) -> Dict[str, Any]:
-        """获取表结构"""
+    def get_table_schema(self, table_name: str, exact_count: bool = False) -> Dict[str, Any]:
+        """
+        获取表结构
+        :param exact_count: row_count 为精确行数（全表计数），默认取系统目录中的估计值
+        """
+        pass
+    
+    @abstractmethod
+    def count_rows(self, table_name: str) -> int:
+        """精确行数"""
         pass
     
+    def schema_fingerprint(self) -> Optional[str]:
+        """
+        schema 结构的指纹（表、列、索引定义与估计行数的校验和），结构与行数估计不变时指纹不变，
+        用于判断缓存是否失效；不支持时返回 None
+        """
+        return None
+    
+    def describe_tables(self, table_names: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        批量获取表结构（不含行数）：[{name, type, columns, indexes}]
+        默认逐表调用 get_table_schema；关系型连接器覆盖为按整个 schema 固定次数查询
+        :param table_names: 只获取这些表，默认全部
+        """
+        names = table_names if table_names is not None else [t['name'] for t in self.get_tables()]
+        return [self.get_table_schema(name) for name in names]
+    
     @abstractmethod
     def execute_query(self, query: str, params: tuple = None) -> List[Dict]:
         """执行查询"""
@@ -61,9 +143,98 @@ class BaseConnector(ABC):
         """插入数据"""
         pass
     
+    @abstractmethod
+    def write_chunk(self, table_name: str, rows: List[Dict]) -> int:
+        """写入一块行（不提交），返回写入的行数；write_chunks 按块调用"""
+        pass
+    
+    def commit(self) -> None:
+        """提交当前事务"""
+        self._connection.commit()
+    
+    def rollback(self) -> None:
+        """回滚当前事务"""
+        self._connection.rollback()
+    
+    def write_chunks(
+        self,
+        table_name: str,
+        rows: Iterable[Dict],
+        chunk_size: int,
+        single_transaction: bool = False,
+        skip_rows: int = 0,
+        on_chunk: Callable[[Dict[str, Any], bool], None] = None,
+        first_chunk: int = 0
+    ) -> Dict[str, Any]:
+        """
+        分块写入驱动（各连接器共用）：按 chunk_size 行切块调用 write_chunk
+        - single_transaction 为 False 时每块写入后提交，失败只回滚当前块，之前的块已持久化
+        - single_transaction 为 True 时全部写完后一次提交，失败整体回滚
+        - skip_rows 跳过前若干行（从上次提交的检查点继续写入）
+        - on_chunk(块统计, 是否已提交) 在每块写入后调用，用于保存进度检查点
+        - first_chunk 为第一块的序号（续写时接着之前的块编号）
+        rows 可以是生成器，内存占用只与块大小有关
+        :return: 写入统计 {method, rows, seconds, rows_per_second, chunk_count,
+                 chunks: [{index, rows, seconds, rows_per_second}]}，chunks 只保留最近 RECENT_CHUNK_STATS 块
+        :raises ValueError: 连接器不支持单事务写入
+        """
+        if single_transaction and not self.SUPPORTS_TRANSACTIONS:
+            raise ValueError(f"{type(self).__name__} 不支持单事务写入")
+        if not self._connection:
+            self.connect()
+        
+        rows = iter(rows)
+        if skip_rows:
+            # 跳过已提交的行
+            next(itertools.islice(rows, skip_rows, skip_rows), None)
+        
+        started = time.perf_counter()
+        total = 0
+        chunks = deque(maxlen=self.RECENT_CHUNK_STATS)
+        index = first_chunk
+        try:
+            while True:
+                chunk = list(itertools.islice(rows, chunk_size))
+                if not chunk:
+                    break
+                chunk_started = time.perf_counter()
+                written = self.write_chunk(table_name, chunk)
+                if not single_transaction:
+                    self.commit()
+                stats = self._write_stats(self.write_method, written, chunk_started)
+                stats['index'] = index
+                chunks.append(stats)
+                total += written
+                index += 1
+                if on_chunk:
+                    on_chunk(stats, not single_transaction)
+            if single_transaction:
+                self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        
+        summary = self._write_stats(self.write_method, total, started)
+        summary['chunk_count'] = index - first_chunk
+        summary['chunks'] = list(chunks)
+        self.last_write_stats = summary
+        return summary
+    
+    @staticmethod
+    def _write_stats(method: str, rows: int, started: float) -> Dict[str, Any]:
+        """写入统计：started 为 time.perf_counter() 的起始值"""
+        seconds = time.perf_counter() - started
+        return {
+            'method': method,
+            'rows': rows,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(rows / seconds) if seconds > 0 else None
+        }
+    
     def __enter__(self):
         self.connect()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.disconnect()
+        # 发生异常时连接状态未知，不放回连接池
+        self.disconnect(discard=exc_type is not None)
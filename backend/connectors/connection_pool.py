@@ -0,0 +1,371 @@
+"""
+数据源连接池
+按数据源 UUID 维护连接池，复用已完成 TLS 与认证握手的连接：
+- 每个池有最小/最大连接数，空闲超时的连接（超出最小数的部分）被回收，
+  管理器的后台线程定期清理所有池，不再使用的数据源也不会一直占用连接
+- 空闲超过健康检查间隔的连接在借出前先 ping，失效则丢弃重建
+- 数据源配置更新或删除时使池失效，正在使用的连接归还时直接关闭
+- MongoClient 自身即为线程安全的连接池，每个数据源共享一个客户端（shared 模式）
+"""
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .base_connector import BaseConnector
+
+
+class ConnectionPool:
+    """单个数据源的连接池"""
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        close: Callable[[Any], None],
+        ping: Callable[[Any], bool],
+        reset: Callable[[Any], None] = None,
+        min_size: int = 0,
+        max_size: int = 5,
+        idle_timeout: float = 300,
+        health_check_interval: float = 30,
+        acquire_timeout: float = 30,
+        shared: bool = False
+    ):
+        """
+        :param factory: 新建连接
+        :param close: 关闭连接
+        :param ping: 健康检查，连接可用返回 True
+        :param reset: 归还时重置连接状态（如回滚未提交的事务），抛出异常时丢弃连接
+        :param shared: 为 True 时池中只有一个可被多个调用方同时使用的连接（线程安全的客户端）
+        """
+        self._factory = factory
+        self._close = close
+        self._ping = ping
+        self._reset = reset
+        self.min_size = min_size
+        self.max_size = 1 if shared else max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self.shared = shared
+
+        self._idle: List[Tuple[Any, float]] = []  # (连接, 归还时间)，末尾为最近归还
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self) -> Any:
+        """
+        借出一个连接：优先复用最近归还的空闲连接，没有空闲连接且未达上限时新建，
+        否则等待其他调用方归还
+        :raises ConnectionError: 池已关闭或等待超时
+        """
+        if self.shared:
+            return self._acquire_shared()
+
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise ConnectionError("连接池已关闭")
+                expired = self._pop_expired()
+                if self._idle:
+                    connection, released_at = self._idle.pop()
+                    self._in_use += 1
+                elif self._in_use < self.max_size:
+                    connection, released_at = None, None
+                    self._in_use += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ConnectionError(f"等待数据库连接超时（连接池上限 {self.max_size}）")
+                    self._cond.wait(remaining)
+                    continue
+
+            # 关闭过期连接、建立连接与健康检查都在锁外进行，不阻塞其他调用方
+            self._close_all(expired)
+            try:
+                if connection is None:
+                    return self._factory()
+                if time.monotonic() - released_at < self.health_check_interval or self._ping(connection):
+                    return connection
+            except Exception:
+                self._discard_slot()
+                raise
+            self._safe_close(connection)
+            self._discard_slot()
+
+    def release(self, connection: Any, discard: bool = False) -> None:
+        """归还连接；discard 为 True、重置失败或池已关闭时关闭连接（shared 模式下无操作）"""
+        if self.shared:
+            # 共享客户端可能仍被其他调用方使用，不在归还时关闭，失效由借出前的健康检查发现
+            return
+
+        if not discard and self._reset is not None:
+            try:
+                self._reset(connection)
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed:
+                expired = [connection]
+            else:
+                self._idle.append((connection, time.monotonic()))
+                expired = self._pop_expired()
+            self._cond.notify()
+        self._close_all(expired)
+
+    def evict_idle(self) -> int:
+        """回收空闲超时的连接，返回关闭的连接数（由管理器的后台线程定期调用）"""
+        if self.shared:
+            return 0
+        with self._cond:
+            expired = self._pop_expired()
+        self._close_all(expired)
+        return len(expired)
+
+    def close(self) -> None:
+        """关闭池：立即关闭空闲连接，正在使用的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        self._close_all(connection for connection, _ in idle)
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池状态"""
+        with self._cond:
+            return {
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'max_size': self.max_size,
+                'shared': self.shared,
+            }
+
+    def _acquire_shared(self) -> Any:
+        """shared 模式：复用同一个客户端，超过健康检查间隔时先 ping"""
+        with self._cond:
+            if self._closed:
+                raise ConnectionError("连接池已关闭")
+            if self._idle:
+                connection, checked_at = self._idle[0]
+                now = time.monotonic()
+                if now - checked_at < self.health_check_interval:
+                    return connection
+                if self._ping(connection):
+                    self._idle[0] = (connection, now)
+                    return connection
+                self._idle = []
+            else:
+                connection = None
+            # 共享客户端的创建在锁内进行，避免并发请求各建一个客户端
+            if connection is not None:
+                self._safe_close(connection)
+            connection = self._factory()
+            self._idle = [(connection, time.monotonic())]
+            return connection
+
+    def _pop_expired(self) -> List[Any]:
+        """
+        从空闲列表中取出空闲超时的连接，保留至少 min_size 个（调用方持有锁）
+        取出的连接由调用方在释放锁之后关闭，关闭慢的连接不阻塞其他借用方
+        """
+        if not self._idle or self.idle_timeout is None:
+            return []
+        now = time.monotonic()
+        keep = max(self.min_size - self._in_use, 0)
+        expired = [
+            i for i, (_, released_at) in enumerate(self._idle[:max(len(self._idle) - keep, 0)])
+            if now - released_at >= self.idle_timeout
+        ]
+        return [self._idle.pop(i)[0] for i in reversed(expired)]
+
+    def _discard_slot(self) -> None:
+        """借出失败时释放占用的名额"""
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def _close_all(self, connections) -> None:
+        for connection in connections:
+            self._safe_close(connection)
+
+    def _safe_close(self, connection: Any) -> None:
+        try:
+            self._close(connection)
+        except Exception:
+            pass
+
+
+class ConnectionPoolManager:
+    """
+    连接池管理器
+    以数据源 UUID 为键管理连接池；池同时记录创建时数据源配置的指纹，
+    配置（地址、账号、密码、SSL 等）变化后自动重建
+    """
+
+    DEFAULT_SETTINGS = {
+        'min_size': 0,
+        'max_size': 5,
+        'idle_timeout': 300,
+        'health_check_interval': 30,
+        'acquire_timeout': 30,
+    }
+
+    REAP_SECONDS = 60  # 后台清理空闲连接的最长间隔
+
+    def __init__(self):
+        self._pools: Dict[str, Tuple[str, ConnectionPool]] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self.settings = dict(self.DEFAULT_SETTINGS)
+        self.mysql_local_infile = False
+        self.mongo_schema_sample_size = None
+
+    def init_app(self, app):
+        """从应用配置读取连接池参数，并启动空闲连接清理线程"""
+        for key in self.DEFAULT_SETTINGS:
+            value = app.config.get(f'DATASOURCE_POOL_{key.upper()}')
+            if value is not None:
+                self.settings[key] = value
+        self.mysql_local_infile = bool(app.config.get('DATASOURCE_MYSQL_LOCAL_INFILE', False))
+        self.mongo_schema_sample_size = app.config.get('DATASOURCE_MONGO_SCHEMA_SAMPLE_SIZE')
+
+        if self._reaper is None and self.settings['idle_timeout'] is not None:
+            self._reaper = threading.Thread(target=self._reap_loop, name='datasource-pool-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        """定期回收所有池的空闲超时连接；只在 acquire/release 时回收的话，不再使用的数据源会一直占用连接"""
+        while True:
+            time.sleep(min(self.REAP_SECONDS, max(self.settings['idle_timeout'], 1)))
+            self.evict_idle()
+
+    def evict_idle(self) -> int:
+        """回收所有池的空闲超时连接，返回关闭的连接数"""
+        with self._lock:
+            pools = [pool for _, pool in self._pools.values()]
+        closed = 0
+        for pool in pools:
+            try:
+                closed += pool.evict_idle()
+            except Exception as e:
+                print(f"Failed to evict idle datasource connections: {e}")
+        return closed
+
+    def connector_for(self, datasource) -> Optional[BaseConnector]:
+        """
+        为数据源创建从连接池借用连接的连接器，不支持的类型返回 None
+        连接器在 connect() 时借出连接，disconnect() 时归还
+        """
+        connector = create_connector(
+            datasource,
+            mysql_local_infile=self.mysql_local_infile,
+            mongo_schema_sample_size=self.mongo_schema_sample_size
+        )
+        if connector is None:
+            return None
+        connector.bind_pool(self.get_pool(datasource, connector))
+        return connector
+
+    def get_pool(self, datasource, connector: BaseConnector) -> ConnectionPool:
+        """获取数据源的连接池，不存在或配置已变化时新建"""
+        fingerprint = self._fingerprint(datasource)
+        stale = None
+        with self._lock:
+            entry = self._pools.get(datasource.uuid)
+            if entry and entry[0] == fingerprint:
+                return entry[1]
+            if entry:
+                stale = entry[1]
+            pool = ConnectionPool(
+                factory=connector.create_connection,
+                close=connector.close_connection,
+                ping=connector.ping_connection,
+                reset=connector.reset_connection,
+                shared=connector.SHARED_CONNECTION,
+                **self.settings
+            )
+            self._pools[datasource.uuid] = (fingerprint, pool)
+        if stale:
+            stale.close()
+        return pool
+
+    def invalidate(self, datasource_uuid: str) -> None:
+        """使数据源的连接池失效（数据源配置更新或删除后调用）"""
+        with self._lock:
+            entry = self._pools.pop(datasource_uuid, None)
+        if entry:
+            entry[1].close()
+
+    def close_all(self) -> None:
+        """关闭所有连接池"""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for _, pool in pools.values():
+            pool.close()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各数据源连接池的状态"""
+        with self._lock:
+            pools = dict(self._pools)
+        return {uuid: pool.stats() for uuid, (_, pool) in pools.items()}
+
+    @staticmethod
+    def _fingerprint(datasource) -> str:
+        """数据源连接配置的指纹（密码只参与哈希，不保存明文）"""
+        parts = [
+            datasource.type, datasource.host, datasource.port, datasource.database,
+            datasource.username, datasource.get_password(), datasource.use_ssl,
+        ]
+        return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+
+def create_connector(
+    datasource,
+    mysql_local_infile: bool = False,
+    mongo_schema_sample_size: int = None
+) -> Optional[BaseConnector]:
+    """
+    根据数据源类型创建连接器（不使用连接池），不支持的类型返回 None
+    :param mysql_local_infile: MySQL 连接是否允许 LOAD DATA LOCAL INFILE
+    :param mongo_schema_sample_size: MongoDB 结构推断采样的文档数
+    """
+    if datasource.type == 'mysql':
+        from .mysql_connector import MySQLConnector
+        return MySQLConnector(
+            host=datasource.host,
+            port=datasource.port,
+            database=datasource.database,
+            username=datasource.username,
+            password=datasource.get_password(),
+            use_ssl=datasource.use_ssl,
+            local_infile=mysql_local_infile
+        )
+    if datasource.type == 'postgresql':
+        from .postgres_connector import PostgreSQLConnector
+        return PostgreSQLConnector(
+            host=datasource.host,
+            port=datasource.port,
+            database=datasource.database,
+            username=datasource.username,
+            password=datasource.get_password(),
+            use_ssl=datasource.use_ssl
+        )
+    if datasource.type == 'mongodb':
+        from .mongo_connector import MongoDBConnector
+        return MongoDBConnector(
+            host=datasource.host,
+            port=datasource.port,
+            database=datasource.database,
+            username=datasource.username,
+            password=datasource.get_password(),
+            schema_sample_size=mongo_schema_sample_size
+        )
+    return None
+
+
+# 单例实例
+pool_manager = ConnectionPoolManager()
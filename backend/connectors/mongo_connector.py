@@ -1,12 +1,40 @@
 """
 MongoDB 数据库连接器
 """
-from typing import List, Dict, Any, Optional, Tuple
+import itertools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
 from .base_connector import BaseConnector
 
 
 class MongoDBConnector(BaseConnector):
     """MongoDB 连接器"""
+
+    SHARED_CONNECTION = True
+    SUPPORTS_TRANSACTIONS = False  # 多文档事务需要副本集，分块写入只支持每块独立写入
+
+    METHOD_INSERT_MANY = 'insert_many'
+
+    BATCH_SIZE = 1000  # 每次 insert_many 的文档数
+    MIN_BATCH_SIZE = 100  # 分块写入时拆分批次的下限：块不少于 2 * MIN_BATCH_SIZE 个文档才会并发写入
+    WRITE_WORKERS = 4  # 并发写入的批次数（共享同一个 MongoClient）
+    MAX_REPORTED_ERRORS = 100  # 写入统计中最多保留的错误明细数
+    DUPLICATE_KEY = 11000  # 重复键错误码
+
+    SCHEMA_SAMPLE_SIZE = 1000  # 结构推断默认采样的文档数
+    SCHEMA_MAX_DEPTH = 3  # 结构推断展开嵌套文档的层数
+    SCHEMA_WORKERS = 4  # 并发推断结构的集合数
+    SCHEMA_MAX_TIME_MS = 30000  # 单个集合结构推断的服务端超时
+
+    # 可选的写关注：一次性的测试数据可用 unacknowledged 换取吞吐（写入失败不会被报告）
+    WRITE_CONCERNS = {
+        'majority': {'w': 'majority'},
+        'acknowledged': {'w': 1},
+        'journaled': {'w': 1, 'j': True},
+        'unacknowledged': {'w': 0},
+    }
     
     def __init__(
         self,
@@ -17,16 +45,28 @@ class MongoDBConnector(BaseConnector):
         password: str = None,
         auth_source: str = 'admin',
         replica_set: str = None,
+        write_concern: str = None,
+        schema_sample_size: int = None,
         **kwargs
     ):
+        """
+        :param write_concern: 写入使用的写关注（WRITE_CONCERNS 中的名称），默认沿用客户端设置
+        :param schema_sample_size: 结构推断采样的文档数，默认 SCHEMA_SAMPLE_SIZE
+        """
         super().__init__(host, port, database, username, password, **kwargs)
         self.auth_source = auth_source
         self.replica_set = replica_set
-        self._client = None
+        self.write_concern = write_concern
+        # 设置后 with_row_ids 按 "命名空间:行号" 生成确定的 _id，写入时这些 _id 的重复键视为已写入
+        self.row_id_namespace = None
+        self.schema_sample_size = schema_sample_size or self.SCHEMA_SAMPLE_SIZE
         self._db = None
+        self._write_pool = None  # 写入线程池，连接器内各次写入复用，disconnect 时关闭
+        self._write_pool_size = 0
+        self.write_method = self.METHOD_INSERT_MANY
     
-    def connect(self) -> bool:
-        """建立连接"""
+    def create_connection(self):
+        """建立连接（MongoClient 自带连接池，可被多个线程共享）"""
         try:
             from pymongo import MongoClient
             
@@ -40,38 +80,59 @@ class MongoDBConnector(BaseConnector):
             if self.replica_set:
                 uri += f"&replicaSet={self.replica_set}"
             
-            self._client = MongoClient(uri, serverSelectionTimeoutMS=10000)
+            client = MongoClient(uri, serverSelectionTimeoutMS=10000)
             
             # 测试连接
-            self._client.server_info()
-            
-            if self.database:
-                self._db = self._client[self.database]
-            
-            return True
+            client.server_info()
+            return client
+        except ImportError:
+            raise ImportError("未安装 pymongo 库")
         except Exception as e:
             raise ConnectionError(f"MongoDB 连接失败: {str(e)}")
     
-    def disconnect(self) -> None:
-        """断开连接"""
-        if self._client:
-            try:
-                self._client.close()
-            except:
-                pass
-            self._client = None
-            self._db = None
+    def ping_connection(self, connection) -> bool:
+        """健康检查"""
+        try:
+            connection.admin.command('ping')
+            return True
+        except Exception:
+            return False
+    
+    def connect(self) -> bool:
+        """建立连接"""
+        super().connect()
+        if self.database:
+            self._db = self._connection[self.database]
+        return True
+    
+    def disconnect(self, discard: bool = False) -> None:
+        """断开连接，并关闭写入线程池"""
+        super().disconnect(discard=discard)
+        self._db = None
+        pool, self._write_pool = self._write_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+    
+    @property
+    def client(self):
+        """当前借用的 MongoClient（需先 connect）"""
+        return self._connection
+    
+    @property
+    def db(self):
+        """当前数据库对象（需先 connect，未指定数据库时为 None）"""
+        return self._db
     
     def test_connection(self) -> Tuple[bool, str, Optional[Dict]]:
         """测试连接"""
         try:
             self.connect()
             
-            server_info = self._client.server_info()
+            server_info = self._connection.server_info()
             version = server_info.get('version', 'unknown')
             
             # 获取集合数量
-            if self._db:
+            if self._db is not None:
                 collection_count = len(self._db.list_collection_names())
             else:
                 collection_count = 0
@@ -83,14 +144,15 @@ class MongoDBConnector(BaseConnector):
                 'collection_count': collection_count
             }
         except Exception as e:
+            self.disconnect(discard=True)
             return False, f"连接失败: {str(e)}", None
     
     def get_tables(self) -> List[Dict[str, Any]]:
         """获取集合列表"""
-        if not self._client:
+        if self._connection is None:
             self.connect()
         
-        if not self._db:
+        if self._db is None:
             return []
         
         collections = []
@@ -106,89 +168,137 @@ class MongoDBConnector(BaseConnector):
         
         return collections
     
-    def get_table_schema(self, table_name: str) -> Dict[str, Any]:
-        """获取集合结构（通过采样推断）"""
-        if not self._client:
+    def get_table_schema(self, table_name: str, exact_count: bool = False) -> Dict[str, Any]:
+        """获取集合结构（服务端采样推断，row_count 默认为集合元数据中的估计文档数）"""
+        schema = self.describe_tables([table_name])[0]
+        if exact_count:
+            schema['row_count'] = self.count_rows(table_name)
+        schema['row_count_exact'] = exact_count
+        return schema
+    
+    def describe_tables(self, table_names: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        批量推断集合结构，多个集合在线程池中并发处理（共享同一个 MongoClient）
+        :return: [{name, type, columns, indexes, row_count, sampled}]，sampled 为实际采样的文档数
+        """
+        if self._connection is None:
             self.connect()
         
-        if not self._db:
-            return {'name': table_name, 'columns': [], 'row_count': 0}
-        
-        collection = self._db[table_name]
-        
-        # 采样文档来推断字段
-        sample_size = 100
-        samples = list(collection.find().limit(sample_size))
-        
-        # 统计字段
-        field_stats = {}
-        for doc in samples:
-            self._analyze_document(doc, field_stats)
+        if self._db is None:
+            return []
         
-        # 转换为列信息
-        columns = []
-        for field_name, stats in field_stats.items():
-            most_common_type = max(stats['types'], key=stats['types'].get)
-            columns.append({
-                'name': field_name,
-                'type': most_common_type,
-                'nullable': stats['null_count'] > 0,
-                'primary_key': field_name == '_id',
-                'sample_count': stats['count']
-            })
+        names = table_names if table_names is not None else sorted(self._db.list_collection_names())
+        if not names:
+            return []
+        workers = min(self.SCHEMA_WORKERS, len(names))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mongo-schema') as pool:
+            return list(pool.map(self._describe_collection, names))
+    
+    def _describe_collection(self, name: str) -> Dict[str, Any]:
+        """推断单个集合的结构（在工作线程中执行）"""
+        from pymongo.errors import OperationFailure
         
-        # 获取文档数量
-        row_count = collection.count_documents({})
+        collection = self._db[name]
+        columns, sampled = self.infer_columns(name)
         
-        # 获取索引信息
-        indexes = []
-        for index in collection.list_indexes():
-            indexes.append({
+        # 视图不支持索引与文档数估计
+        try:
+            indexes = [{
                 'name': index['name'],
                 'keys': list(index['key'].keys()),
                 'unique': index.get('unique', False)
-            })
+            } for index in collection.list_indexes()]
+            row_count = collection.estimated_document_count()
+        except OperationFailure:
+            indexes, row_count = [], None
         
         return {
-            'name': table_name,
+            'name': name,
+            'type': 'collection',
             'columns': columns,
             'indexes': indexes,
-            'row_count': row_count
+            'row_count': row_count,
+            'sampled': sampled
         }
     
-    def _analyze_document(self, doc: Dict, field_stats: Dict, prefix: str = ''):
-        """分析文档结构"""
-        for key, value in doc.items():
-            field_name = f"{prefix}{key}" if prefix else key
-            
-            if field_name not in field_stats:
-                field_stats[field_name] = {
-                    'count': 0,
-                    'null_count': 0,
-                    'types': {}
-                }
-            
-            stats = field_stats[field_name]
-            stats['count'] += 1
-            
-            if value is None:
-                stats['null_count'] += 1
-                type_name = 'null'
-            else:
-                type_name = type(value).__name__
-            
-            stats['types'][type_name] = stats['types'].get(type_name, 0) + 1
-            
-            # 递归处理嵌套文档
-            if isinstance(value, dict):
-                self._analyze_document(value, field_stats, f"{field_name}.")
+    def infer_columns(self, collection_name: str, sample_size: int = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        在服务端推断字段：$sample 随机采样后用 $objectToArray 展开字段（嵌套文档展开为 a.b 路径），
+        按 (字段路径, BSON 类型) 分组计数，只返回类型直方图，不传输文档本身。
+        $sample 在采样数小于集合的 5% 时使用随机游标，不扫描集合
+        :return: (列信息, 实际采样的文档数)
+        """
+        collection = self._db[collection_name]
+        groups = collection.aggregate(
+            self._schema_pipeline(sample_size or self.schema_sample_size),
+            maxTimeMS=self.SCHEMA_MAX_TIME_MS
+        )
+        
+        histograms: Dict[str, Dict[str, int]] = {}
+        for group in groups:
+            key = group['_id']
+            histograms.setdefault(key['k'], {})[key['t']] = group['count']
+        
+        # 每个文档都有 _id，其出现次数即采样的文档数
+        sampled = sum(histograms.get('_id', {}).values())
+        columns = []
+        for name in sorted(histograms, key=lambda n: (n != '_id', n)):
+            types = histograms[name]
+            present = sum(types.values())
+            null_count = types.get('null', 0)
+            non_null = {t: c for t, c in types.items() if t != 'null'}
+            columns.append({
+                'name': name,
+                'type': max(non_null, key=non_null.get) if non_null else 'null',
+                'types': types,
+                # 缺少该字段的文档与值为 null 的文档都计入空值
+                'nullable': null_count > 0 or present < sampled,
+                'null_ratio': round((sampled - present + null_count) / sampled, 4) if sampled else 0,
+                'primary_key': name == '_id',
+                'sample_count': present
+            })
+        return columns, sampled
+    
+    def _schema_pipeline(self, sample_size: int) -> List[Dict[str, Any]]:
+        """结构推断的聚合管道：每个字段展开为 {k: 路径, v: 值, d: 层级}，逐层展开嵌套文档后分组"""
+        pipeline = [
+            {'$sample': {'size': sample_size}},
+            {'$project': {'_id': 0, 'f': {'$map': {
+                'input': {'$objectToArray': '$$ROOT'},
+                'as': 'p',
+                'in': {'k': '$$p.k', 'v': '$$p.v', 'd': 0}
+            }}}},
+            {'$unwind': '$f'},
+        ]
+        for depth in range(1, self.SCHEMA_MAX_DEPTH):
+            # 上一层的嵌套文档追加其子字段，其余字段原样保留
+            children = {'$map': {
+                'input': {'$objectToArray': '$f.v'},
+                'as': 'p',
+                'in': {'k': {'$concat': ['$f.k', '.', '$$p.k']}, 'v': '$$p.v', 'd': depth}
+            }}
+            is_parent = {'$and': [{'$eq': ['$f.d', depth - 1]}, {'$eq': [{'$type': '$f.v'}, 'object']}]}
+            pipeline += [
+                {'$project': {'f': {'$concatArrays': [['$f'], {'$cond': [is_parent, children, []]}]}}},
+                {'$unwind': '$f'},
+            ]
+        pipeline.append({'$group': {'_id': {'k': '$f.k', 't': {'$type': '$f.v'}}, 'count': {'$sum': 1}}})
+        return pipeline
+    
+    def count_rows(self, table_name: str) -> int:
+        """精确文档数"""
+        if self._connection is None:
+            self.connect()
+        if self._db is None:
+            return 0
+        return self._db[table_name].count_documents({})
     
     def execute_query(self, query: str, params: tuple = None) -> List[Dict]:
         """执行查询（MongoDB 使用 find）"""
-        if not self._client:
+        if self._connection is None:
             self.connect()
         
-        if not self._db:
+        if self._db is None:
             return []
         
         # 解析简单的查询格式: collection_name:filter_json
@@ -217,38 +327,213 @@ class MongoDBConnector(BaseConnector):
         return results
     
     def insert_data(self, table_name: str, data: List[Dict]) -> Tuple[bool, int, Optional[str]]:
-        """插入数据"""
+        """插入数据（无序批量写入，部分文档失败时其余文档照常写入，写入统计见 last_write_stats）"""
         if not data:
             return True, 0, None
         
-        if not self._client:
+        if self._connection is None:
             self.connect()
         
-        if not self._db:
+        if self._db is None:
             return False, 0, "未指定数据库"
         
         try:
-            collection = self._db[table_name]
-            
-            # 移除 _id 字段（如果存在且为空）
-            clean_data = []
-            for doc in data:
-                clean_doc = {k: v for k, v in doc.items() if k != '_id' or v}
-                clean_data.append(clean_doc)
-            
-            result = collection.insert_many(clean_data)
-            inserted = len(result.inserted_ids)
-            
-            return True, inserted, None
+            self.last_write_stats = self.bulk_insert(table_name, data)
         except Exception as e:
             return False, 0, str(e)
+        
+        stats = self.last_write_stats
+        if stats['failed']:
+            return False, stats['rows'], self._describe_errors(stats)
+        return True, stats['rows'], None
+    
+    def write_chunk(self, table_name: str, rows: List[Dict]) -> int:
+        """
+        写入一块文档：块内各批次无序并发写入，全部完成后有文档失败则抛出汇总错误
+        （已写入的文档无法回滚，该块不计入检查点；文档带 with_row_ids 生成的 _id 时，
+        从检查点继续写入遇到这些文档会因重复键被跳过，不会重复写入）
+        块须全部写完才能记录检查点，各块之间不重叠；块较小时按 WRITE_WORKERS 拆成更小的批次，
+        不少于 MIN_BATCH_SIZE 个文档一批，因此块不少于 2 * MIN_BATCH_SIZE 个文档时才会并发写入
+        """
+        batch_size = max(self.MIN_BATCH_SIZE, min(self.BATCH_SIZE, -(-len(rows) // self.WRITE_WORKERS)))
+        stats = self.bulk_insert(table_name, rows, batch_size=batch_size)
+        if stats['failed']:
+            raise RuntimeError(self._describe_errors(stats))
+        return stats['rows']
+    
+    def with_row_ids(self, rows: Iterable[Dict], start: int = 0) -> Iterator[Dict]:
+        """
+        为没有 _id 的文档补上确定的 _id（"row_id_namespace:行号"），start 为第一行的行号；
+        未设置 row_id_namespace 时原样返回
+        """
+        namespace = self.row_id_namespace
+        if not namespace:
+            yield from rows
+            return
+        for index, doc in enumerate(rows, start):
+            if not doc.get('_id'):
+                doc['_id'] = f"{namespace}:{index}"
+            yield doc
+    
+    def bulk_insert(
+        self,
+        table_name: str,
+        rows: Iterable[Dict],
+        batch_size: int = None,
+        workers: int = None,
+        write_concern: str = None
+    ) -> Dict[str, Any]:
+        """
+        无序批量写入（insert_many ordered=False）
+        文档按 batch_size 分批，最多 workers 个批次在连接器的写入线程池中并发写入同一个 MongoClient；
+        边读取边分批，同时在途的批次有上限，rows 可以是生成器。
+        单个文档或批次失败不影响其他文档，错误按批次汇总到统计中
+        （文档由 pymongo 原地补上 _id；值为空的 _id 会被去掉，由服务端生成）
+        with_row_ids 生成的 _id 重复时视为之前已写入，计入 rows 与 duplicates 而不是 failed
+        :param write_concern: WRITE_CONCERNS 中的名称，默认取连接器的 write_concern
+        :return: 写入统计 {method, rows, seconds, rows_per_second, failed, duplicates, errors}，
+                 errors 为 [{batch, index, code, message}]，index 为文档在本次写入中的序号
+        """
+        if self._connection is None:
+            self.connect()
+        if self._db is None:
+            raise ValueError("未指定数据库")
+        
+        collection = self._collection_for_write(table_name, write_concern or self.write_concern)
+        batch_size = batch_size or self.BATCH_SIZE
+        workers = workers or self.WRITE_WORKERS
+        
+        started = time.perf_counter()
+        result = {'rows': 0, 'failed': 0, 'duplicates': 0, 'errors': []}
+        pending = deque()
+        pool = self._get_write_pool(workers)
+        try:
+            for index, batch in enumerate(self._iter_batches(rows, batch_size)):
+                if len(pending) >= workers:
+                    self._collect_batch(pending.popleft(), result)
+                pending.append((index, index * batch_size, len(batch),
+                                pool.submit(self._insert_batch, collection, batch)))
+        finally:
+            # 读取文档出错时也等待已提交的批次完成，不留下仍在写入的批次
+            while pending:
+                self._collect_batch(pending.popleft(), result)
+        
+        stats = self._write_stats(self.METHOD_INSERT_MANY, result['rows'], started)
+        stats['failed'] = result['failed']
+        stats['duplicates'] = result['duplicates']
+        stats['errors'] = result['errors']
+        return stats
+    
+    def _get_write_pool(self, workers: int) -> ThreadPoolExecutor:
+        """连接器的写入线程池，分块写入的各块复用同一个线程池；需要更多线程时重建"""
+        if self._write_pool is None or self._write_pool_size < workers:
+            if self._write_pool is not None:
+                self._write_pool.shutdown(wait=False)
+            self._write_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mongo-write')
+            self._write_pool_size = workers
+        return self._write_pool
+    
+    def _collection_for_write(self, table_name: str, write_concern: Optional[str]):
+        """按写关注名称取集合对象"""
+        collection = self._db[table_name]
+        if not write_concern:
+            return collection
+        if write_concern not in self.WRITE_CONCERNS:
+            raise ValueError(f"write_concern must be one of {list(self.WRITE_CONCERNS)}")
+        from pymongo import WriteConcern
+        return collection.with_options(write_concern=WriteConcern(**self.WRITE_CONCERNS[write_concern]))
+    
+    @staticmethod
+    def _iter_batches(rows: Iterable[Dict], batch_size: int) -> Iterator[List[Dict]]:
+        """逐批读取文档，只复制带空 _id 的文档（去掉 _id 交由服务端生成）"""
+        rows = iter(rows)
+        while True:
+            batch = [
+                {k: v for k, v in doc.items() if k != '_id'} if '_id' in doc and not doc['_id'] else doc
+                for doc in itertools.islice(rows, batch_size)
+            ]
+            if not batch:
+                return
+            yield batch
+    
+    @staticmethod
+    def _insert_batch(collection, batch: List[Dict]) -> int:
+        """写入一批（在工作线程中执行）"""
+        collection.insert_many(batch, ordered=False)
+        return len(batch)
+    
+    def _collect_batch(self, entry: Tuple, result: Dict[str, Any]) -> None:
+        """
+        汇总一个批次的结果：BulkWriteError 中未失败的文档仍计入写入行数，
+        with_row_ids 生成的 _id 的重复键错误视为已写入
+        """
+        from pymongo.errors import BulkWriteError
+        
+        index, offset, size, future = entry
+        duplicates = 0
+        try:
+            result['rows'] += future.result()
+            return
+        except BulkWriteError as e:
+            details = e.details or {}
+            write_errors = details.get('writeErrors', [])
+            inserted = details.get('nInserted', size - len(write_errors))
+            if self.row_id_namespace:
+                remaining = [error for error in write_errors if not self._is_row_id_duplicate(error)]
+                duplicates = len(write_errors) - len(remaining)
+                write_errors = remaining
+            errors = [{
+                'batch': index,
+                'index': offset + error.get('index', 0),
+                'code': error.get('code'),
+                'message': error.get('errmsg'),
+            } for error in write_errors]
+        except Exception as e:
+            inserted = 0
+            errors = [{'batch': index, 'index': None, 'code': None, 'message': str(e)}]
+        
+        result['rows'] += inserted + duplicates
+        result['duplicates'] += duplicates
+        result['failed'] += size - inserted - duplicates
+        room = self.MAX_REPORTED_ERRORS - len(result['errors'])
+        result['errors'].extend(errors[:max(room, 0)])
+    
+    def _is_row_id_duplicate(self, error: Dict[str, Any]) -> bool:
+        """写入错误是否为 with_row_ids 生成的 _id 的重复键（文档在之前的写入中已写入）"""
+        if error.get('code') != self.DUPLICATE_KEY:
+            return False
+        # 只认 _id 的重复，其他唯一索引冲突仍是写入错误（MongoDB 4.2 起错误中带 keyValue）
+        key_value = error.get('keyValue')
+        if key_value is not None:
+            doc_id = key_value.get('_id')
+        elif 'index: _id_ ' in (error.get('errmsg') or ''):
+            doc_id = (error.get('op') or {}).get('_id')
+        else:
+            return False
+        return isinstance(doc_id, str) and doc_id.startswith(f"{self.row_id_namespace}:")
+    
+    @staticmethod
+    def _describe_errors(stats: Dict[str, Any]) -> str:
+        """写入失败的汇总信息"""
+        message = f"{stats['failed']} 个文档写入失败（成功 {stats['rows']} 个）"
+        if stats['errors']:
+            message += f": {stats['errors'][0]['message']}"
+        return message
+    
+    def commit(self) -> None:
+        """每次 insert_many 即已持久化，无需提交"""
+        pass
+    
+    def rollback(self) -> None:
+        """不支持回滚已写入的文档"""
+        pass
     
     def create_collection(self, collection_name: str, options: Dict = None) -> Tuple[bool, Optional[str]]:
         """创建集合"""
-        if not self._client:
+        if self._connection is None:
             self.connect()
         
-        if not self._db:
+        if self._db is None:
             return False, "未指定数据库"
         
         try:
@@ -262,10 +547,10 @@ class MongoDBConnector(BaseConnector):
     
     def create_index(self, collection_name: str, keys: List[str], unique: bool = False) -> Tuple[bool, Optional[str]]:
         """创建索引"""
-        if not self._client:
+        if self._connection is None:
             self.connect()
         
-        if not self._db:
+        if self._db is None:
             return False, "未指定数据库"
         
         try:
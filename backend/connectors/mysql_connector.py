@@ -1,12 +1,26 @@
 """
 MySQL 数据库连接器
 """
-from typing import List, Dict, Any, Optional, Tuple
+import itertools
+import json
+import tempfile
+import time
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
 from .base_connector import BaseConnector
 
 
 class MySQLConnector(BaseConnector):
     """MySQL 连接器"""
+
+    METHOD_LOAD_DATA = 'load_data'  # LOAD DATA LOCAL INFILE 批量导入
+    METHOD_INSERT = 'insert'  # 多行 INSERT
+    METHODS = [METHOD_LOAD_DATA, METHOD_INSERT]
+
+    INSERT_BATCH_ROWS = 1000  # 多行 INSERT 每条语句的最大行数
+    MAX_STATEMENT_BYTES = 16 * 1024 * 1024  # 多行 INSERT 语句的字节数上限（max_allowed_packet 更大时也不超过）
+    PACKET_HEADROOM = 1024  # 语句大小与 max_allowed_packet 之间保留的余量
+    DEFAULT_MAX_ALLOWED_PACKET = 4 * 1024 * 1024  # 无法读取服务器设置时按 MySQL 5.7 的默认值
+    LOAD_DATA_CHUNK_ROWS = 5000  # 每次编码为 TSV 写入临时文件的行数
     
     def __init__(
         self,
@@ -17,20 +31,27 @@ class MySQLConnector(BaseConnector):
         password: str = None,
         charset: str = 'utf8mb4',
         use_ssl: bool = False,
+        local_infile: bool = False,
         **kwargs
     ):
+        """
+        :param local_infile: 允许 LOAD DATA LOCAL INFILE（客户端开启后服务器可请求读取本机文件，只应对可信的服务器开启）
+        """
         super().__init__(host, port, database, username, password, **kwargs)
         self.charset = charset
         self.use_ssl = use_ssl
+        self.local_infile = local_infile
+        self.write_method = self.METHOD_INSERT
+        self._server_settings = None
     
-    def connect(self) -> bool:
+    def create_connection(self):
         """建立连接"""
         try:
             import pymysql
             
             ssl_config = {'ssl': {}} if self.use_ssl else None
             
-            self._connection = pymysql.connect(
+            return pymysql.connect(
                 host=self.host,
                 port=self.port,
                 user=self.username,
@@ -39,20 +60,25 @@ class MySQLConnector(BaseConnector):
                 charset=self.charset,
                 connect_timeout=10,
                 ssl=ssl_config,
+                local_infile=self.local_infile,
                 cursorclass=pymysql.cursors.DictCursor
             )
-            return True
+        except ImportError:
+            raise ImportError("未安装 pymysql 库")
         except Exception as e:
             raise ConnectionError(f"MySQL 连接失败: {str(e)}")
     
-    def disconnect(self) -> None:
-        """断开连接"""
-        if self._connection:
-            try:
-                self._connection.close()
-            except:
-                pass
-            self._connection = None
+    def ping_connection(self, connection) -> bool:
+        """健康检查（不自动重连）"""
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+    
+    def reset_connection(self, connection) -> None:
+        """回滚未提交的事务"""
+        connection.rollback()
     
     def test_connection(self) -> Tuple[bool, str, Optional[Dict]]:
         """测试连接"""
@@ -77,6 +103,7 @@ class MySQLConnector(BaseConnector):
                 'table_count': table_count
             }
         except Exception as e:
+            self.disconnect(discard=True)
             return False, f"连接失败: {str(e)}", None
     
     def get_tables(self) -> List[Dict[str, Any]]:
@@ -98,48 +125,128 @@ class MySQLConnector(BaseConnector):
         cursor.close()
         return tables
     
-    def get_table_schema(self, table_name: str) -> Dict[str, Any]:
-        """获取表结构"""
+    def get_table_schema(self, table_name: str, exact_count: bool = False) -> Dict[str, Any]:
+        """获取表结构（row_count 默认为 information_schema.TABLES.TABLE_ROWS 估计值，InnoDB 上 COUNT(*) 需全表扫描）"""
+        tables = self.describe_tables([table_name])
+        if not tables:
+            raise ValueError(f"表不存在: {table_name}")
+        schema = tables[0]
+        if exact_count:
+            schema['row_count'] = self.count_rows(table_name)
+        schema['row_count_exact'] = exact_count
+        return schema
+    
+    def count_rows(self, table_name: str) -> int:
+        """精确行数"""
         if not self._connection:
             self.connect()
         
         cursor = self._connection.cursor()
+        try:
+            cursor.execute(f"SELECT COUNT(*) as count FROM {self._table_ref(table_name)}")
+            return cursor.fetchone()['count']
+        finally:
+            cursor.close()
+    
+    def schema_fingerprint(self) -> Optional[str]:
+        """
+        列定义、索引定义与各表估计行数、更新时间的 CRC32 求和（只返回一行，不传输结构明细）
+        估计行数与更新时间来自 information_schema.TABLES，应用外的写入也会使缓存的行数失效
+        """
+        if not self._connection:
+            self.connect()
         
-        # 获取列信息
-        cursor.execute(f"DESCRIBE `{table_name}`")
-        columns = []
-        for row in cursor.fetchall():
-            columns.append({
-                'name': row['Field'],
-                'type': row['Type'],
-                'nullable': row['Null'] == 'YES',
-                'primary_key': row['Key'] == 'PRI',
-                'default': row['Default'],
-                'extra': row['Extra']
-            })
-        
-        # 获取索引信息
-        cursor.execute(f"SHOW INDEX FROM `{table_name}`")
-        indexes = []
-        for row in cursor.fetchall():
-            indexes.append({
-                'name': row['Key_name'],
-                'column': row['Column_name'],
-                'unique': row['Non_unique'] == 0
-            })
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT COUNT(*) AS column_count,
+                       COALESCE(SUM(CRC32(CONCAT_WS(':', TABLE_NAME, ORDINAL_POSITION, COLUMN_NAME, COLUMN_TYPE,
+                                                    IS_NULLABLE, COLUMN_KEY, IFNULL(COLUMN_DEFAULT, '')))), 0) AS column_checksum,
+                       (SELECT COALESCE(SUM(CRC32(CONCAT_WS(':', TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME, NON_UNIQUE))), 0)
+                        FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE()) AS index_checksum,
+                       (SELECT COALESCE(SUM(CRC32(CONCAT_WS(':', TABLE_NAME, IFNULL(TABLE_ROWS, ''), IFNULL(UPDATE_TIME, '')))), 0)
+                        FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()) AS table_checksum
+                FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE()
+            """)
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        return f"{row['column_count']}:{row['column_checksum']}:{row['index_checksum']}:{row['table_checksum']}"
+    
+    def describe_tables(self, table_names: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        批量获取当前数据库的表结构：表、列、索引各一次 information_schema 查询，在内存中按表分组
+        row_count 为统计信息中的估计行数（视图为 None）
+        """
+        if not self._connection:
+            self.connect()
         
-        # 获取行数估计
-        cursor.execute(f"SELECT COUNT(*) as count FROM `{table_name}`")
-        row_count = cursor.fetchone()['count']
+        condition, params = "TABLE_SCHEMA = DATABASE()", ()
+        if table_names is not None:
+            if not table_names:
+                return []
+            condition += f" AND TABLE_NAME IN ({', '.join(['%s'] * len(table_names))})"
+            params = tuple(table_names)
         
-        cursor.close()
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT TABLE_NAME AS table_name, TABLE_TYPE AS table_type, TABLE_ROWS AS table_rows
+                FROM information_schema.TABLES
+                WHERE {condition}
+                ORDER BY TABLE_NAME
+            """, params)
+            tables = {
+                row['table_name']: {
+                    'name': row['table_name'],
+                    'type': 'view' if row['table_type'] == 'VIEW' else 'table',
+                    'columns': [],
+                    'indexes': [],
+                    'row_count': row['table_rows']  # 统计信息中的估计值
+                }
+                for row in cursor.fetchall()
+            }
+            
+            cursor.execute(f"""
+                SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name, COLUMN_TYPE AS column_type,
+                       IS_NULLABLE AS is_nullable, COLUMN_KEY AS column_key,
+                       COLUMN_DEFAULT AS column_default, EXTRA AS extra
+                FROM information_schema.COLUMNS
+                WHERE {condition}
+                ORDER BY TABLE_NAME, ORDINAL_POSITION
+            """, params)
+            for row in cursor.fetchall():
+                table = tables.get(row['table_name'])
+                if table is not None:
+                    table['columns'].append({
+                        'name': row['column_name'],
+                        'type': row['column_type'],
+                        'nullable': row['is_nullable'] == 'YES',
+                        'primary_key': row['column_key'] == 'PRI',
+                        'default': row['column_default'],
+                        'extra': row['extra']
+                    })
+            
+            cursor.execute(f"""
+                SELECT TABLE_NAME AS table_name, INDEX_NAME AS index_name,
+                       COLUMN_NAME AS column_name, NON_UNIQUE AS non_unique
+                FROM information_schema.STATISTICS
+                WHERE {condition}
+                ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+            """, params)
+            for row in cursor.fetchall():
+                table = tables.get(row['table_name'])
+                if table is not None:
+                    table['indexes'].append({
+                        'name': row['index_name'],
+                        'column': row['column_name'],
+                        'unique': int(row['non_unique']) == 0
+                    })
+        finally:
+            cursor.close()
         
-        return {
-            'name': table_name,
-            'columns': columns,
-            'indexes': indexes,
-            'row_count': row_count
-        }
+        return list(tables.values())
     
     def execute_query(self, query: str, params: tuple = None) -> List[Dict]:
         """执行查询"""
@@ -154,7 +261,7 @@ class MySQLConnector(BaseConnector):
         return results
     
     def insert_data(self, table_name: str, data: List[Dict]) -> Tuple[bool, int, Optional[str]]:
-        """插入数据"""
+        """插入数据（批量写入后一次提交，写入统计见 last_write_stats）"""
         if not data:
             return True, 0, None
         
@@ -162,28 +269,141 @@ class MySQLConnector(BaseConnector):
             self.connect()
         
         try:
-            cursor = self._connection.cursor()
-            
-            # 获取列名
-            columns = list(data[0].keys())
-            placeholders = ', '.join(['%s'] * len(columns))
-            column_names = ', '.join([f'`{col}`' for col in columns])
-            
-            sql = f"INSERT INTO `{table_name}` ({column_names}) VALUES ({placeholders})"
-            
-            # 批量插入
-            values = [tuple(row.get(col) for col in columns) for row in data]
-            cursor.executemany(sql, values)
-            
+            self.last_write_stats = self.bulk_insert(table_name, data)
             self._connection.commit()
-            inserted = cursor.rowcount
-            cursor.close()
-            
-            return True, inserted, None
+            return True, self.last_write_stats['rows'], None
         except Exception as e:
             self._connection.rollback()
             return False, 0, str(e)
     
+    def write_chunk(self, table_name: str, rows: List[Dict]) -> int:
+        """分块写入的一块：走 bulk_insert（不提交）"""
+        stats = self.bulk_insert(table_name, rows)
+        self.write_method = stats['method']
+        return stats['rows']
+    
+    def bulk_insert(
+        self,
+        table_name: str,
+        rows: Iterable[Dict],
+        columns: List[str] = None,
+        method: str = None,
+        batch_rows: int = None
+    ) -> Dict[str, Any]:
+        """
+        批量写入（不提交）
+        客户端与服务器都开启 local_infile 时默认按块编码为 TSV 写入临时文件，经 LOAD DATA LOCAL INFILE 一次导入；
+        否则发送多行 INSERT，每条语句不超过 batch_rows 行，且不超过服务器的 max_allowed_packet
+        rows 可以是生成器，内存占用只与块大小有关
+        :param columns: 列名，默认取第一行的键
+        :param method: load_data / insert，默认自动选择
+        :param batch_rows: 多行 INSERT 每条语句的最大行数，默认 INSERT_BATCH_ROWS
+        :return: 写入统计 {method, rows, seconds, rows_per_second}
+        :raises ValueError: 指定 load_data 但客户端或服务器未开启 local_infile
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return self._write_stats(method or self.METHOD_INSERT, 0, time.perf_counter())
+        rows = itertools.chain([first], rows)
+        columns = columns or list(first.keys())
+        
+        if not self._connection:
+            self.connect()
+        
+        started = time.perf_counter()
+        load_data = self._load_data_enabled()
+        if method == self.METHOD_LOAD_DATA and not load_data:
+            raise ValueError("客户端或服务器未开启 local_infile，无法使用 LOAD DATA LOCAL INFILE")
+        
+        cursor = self._connection.cursor()
+        try:
+            if load_data and method != self.METHOD_INSERT:
+                inserted = self._load_data(cursor, table_name, rows, columns)
+                return self._write_stats(self.METHOD_LOAD_DATA, inserted, started)
+            inserted = self._insert_batches(cursor, table_name, rows, columns, batch_rows or self.INSERT_BATCH_ROWS)
+            return self._write_stats(self.METHOD_INSERT, inserted, started)
+        finally:
+            cursor.close()
+    
+    def _insert_batches(self, cursor, table_name: str, rows: Iterator[Dict], columns: List[str], batch_rows: int) -> int:
+        """多行 INSERT：累积已转义的行，达到行数上限或再加一行会超过语句字节数上限时发送"""
+        prefix = f"INSERT INTO {self._table_ref(table_name)} ({self._column_list(columns)}) VALUES "
+        prefix_bytes = len(prefix.encode('utf-8'))
+        limit = self._statement_limit()
+        escape = self._connection.escape
+        
+        inserted = 0
+        batch, batch_bytes = [], prefix_bytes
+        for row in rows:
+            values = '(' + ','.join(
+                escape(json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value)
+                for value in (row.get(col) for col in columns)
+            ) + ')'
+            size = len(values.encode('utf-8')) + 1
+            if batch and (len(batch) >= batch_rows or batch_bytes + size > limit):
+                cursor.execute(prefix + ','.join(batch))
+                inserted += len(batch)
+                batch, batch_bytes = [], prefix_bytes
+            # 单行超过上限时单独发送，由服务器报告 max_allowed_packet 错误
+            batch.append(values)
+            batch_bytes += size
+        if batch:
+            cursor.execute(prefix + ','.join(batch))
+            inserted += len(batch)
+        return inserted
+    
+    def _load_data(self, cursor, table_name: str, rows: Iterator[Dict], columns: List[str]) -> int:
+        """
+        LOAD DATA LOCAL INFILE：按块编码为 TSV 写入临时文件后一次导入
+        （pymysql 只能按文件名读取本地数据，无法直接传入内存中的流）
+        """
+        from services.export_service import export_service
+        
+        with tempfile.NamedTemporaryFile(prefix='mysql_load_', suffix='.tsv') as f:
+            while True:
+                chunk = list(itertools.islice(rows, self.LOAD_DATA_CHUNK_ROWS))
+                if not chunk:
+                    break
+                f.write(export_service.mysql_tsv_lines(chunk, columns).encode('utf-8'))
+            f.flush()
+            
+            statement = export_service.mysql_load_statement(
+                [{'name': col} for col in columns], table_name, f.name
+            )
+            cursor.execute(statement.rstrip().rstrip(';'))
+            return cursor.rowcount
+    
+    def _load_data_enabled(self) -> bool:
+        """客户端与服务器是否都开启了 local_infile"""
+        return self.local_infile and bool(self._get_server_settings()['local_infile'])
+    
+    def _statement_limit(self) -> int:
+        """多行 INSERT 语句的字节数上限"""
+        max_packet = self._get_server_settings()['max_allowed_packet'] or self.DEFAULT_MAX_ALLOWED_PACKET
+        return min(int(max_packet) - self.PACKET_HEADROOM, self.MAX_STATEMENT_BYTES)
+    
+    def _get_server_settings(self) -> Dict[str, Any]:
+        """读取并缓存服务器的 max_allowed_packet 与 local_infile 设置"""
+        if self._server_settings is None:
+            cursor = self._connection.cursor()
+            try:
+                cursor.execute(
+                    "SELECT @@max_allowed_packet AS max_allowed_packet, @@GLOBAL.local_infile AS local_infile"
+                )
+                self._server_settings = cursor.fetchone()
+            finally:
+                cursor.close()
+        return self._server_settings
+    
+    @staticmethod
+    def _table_ref(table_name: str) -> str:
+        return f"`{table_name}`"
+    
+    @staticmethod
+    def _column_list(columns: List[str]) -> str:
+        return ', '.join(f'`{col}`' for col in columns)
+    
     def create_table(self, table_name: str, columns: List[Dict]) -> Tuple[bool, Optional[str]]:
         """创建表"""
         if not self._connection:
@@ -1,12 +1,25 @@
 """
 PostgreSQL 数据库连接器
 """
-from typing import List, Dict, Any, Optional, Tuple
+import itertools
+import time
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
 from .base_connector import BaseConnector
 
 
 class PostgreSQLConnector(BaseConnector):
     """PostgreSQL 连接器"""
+
+    METHOD_COPY = 'copy'  # COPY ... FROM STDIN 文本格式流式写入
+    METHOD_INSERT = 'insert'  # execute_values 多行 INSERT
+    METHODS = [METHOD_COPY, METHOD_INSERT]
+
+    COPY_CHUNK_ROWS = 5000  # 每次编码为 COPY 文本的行数
+    COPY_BUFFER_SIZE = 1024 * 1024  # 每次向服务器发送的 COPY 数据字节数
+    INSERT_PAGE_SIZE = 1000  # 多行 INSERT 每条语句的行数
+
+    # 不允许 COPY 时退化为多行 INSERT 的错误码：权限不足、不支持的特性（部分代理/托管服务）
+    COPY_FALLBACK_PGCODES = ('42501', '0A000')
     
     def __init__(
         self,
@@ -22,8 +35,9 @@ class PostgreSQLConnector(BaseConnector):
         super().__init__(host, port, database, username, password, **kwargs)
         self.schema = schema
         self.use_ssl = use_ssl
+        self.write_method = self.METHOD_COPY
     
-    def connect(self) -> bool:
+    def create_connection(self):
         """建立连接"""
         try:
             import psycopg2
@@ -31,7 +45,7 @@ class PostgreSQLConnector(BaseConnector):
             
             sslmode = 'require' if self.use_ssl else 'disable'
             
-            self._connection = psycopg2.connect(
+            return psycopg2.connect(
                 host=self.host,
                 port=self.port,
                 user=self.username,
@@ -41,18 +55,29 @@ class PostgreSQLConnector(BaseConnector):
                 sslmode=sslmode,
                 cursor_factory=psycopg2.extras.RealDictCursor
             )
-            return True
+        except ImportError:
+            raise ImportError("未安装 psycopg2 库")
         except Exception as e:
             raise ConnectionError(f"PostgreSQL 连接失败: {str(e)}")
     
-    def disconnect(self) -> None:
-        """断开连接"""
-        if self._connection:
-            try:
-                self._connection.close()
-            except:
-                pass
-            self._connection = None
+    def ping_connection(self, connection) -> bool:
+        """健康检查"""
+        if connection.closed:
+            return False
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+    
+    def reset_connection(self, connection) -> None:
+        """回滚未提交（或已失败）的事务"""
+        if connection.closed:
+            raise ConnectionError("连接已关闭")
+        connection.rollback()
     
     def test_connection(self) -> Tuple[bool, str, Optional[Dict]]:
         """测试连接"""
@@ -79,6 +104,7 @@ class PostgreSQLConnector(BaseConnector):
                 'table_count': table_count
             }
         except Exception as e:
+            self.disconnect(discard=True)
             return False, f"连接失败: {str(e)}", None
     
     def get_tables(self) -> List[Dict[str, Any]]:
@@ -104,81 +130,134 @@ class PostgreSQLConnector(BaseConnector):
         cursor.close()
         return tables
     
-    def get_table_schema(self, table_name: str) -> Dict[str, Any]:
-        """获取表结构"""
+    def get_table_schema(self, table_name: str, exact_count: bool = False) -> Dict[str, Any]:
+        """获取表结构（row_count 默认为 pg_class.reltuples 估计值）"""
+        tables = self.describe_tables([table_name])
+        if not tables:
+            raise ValueError(f"表不存在: {table_name}")
+        schema = tables[0]
+        if exact_count:
+            schema['row_count'] = self.count_rows(table_name)
+        schema['row_count_exact'] = exact_count
+        return schema
+    
+    def count_rows(self, table_name: str) -> int:
+        """精确行数"""
         if not self._connection:
             self.connect()
         
         cursor = self._connection.cursor()
+        try:
+            cursor.execute(f'SELECT COUNT(*) as count FROM {self._table_ref(table_name)}')
+            return cursor.fetchone()['count']
+        finally:
+            cursor.close()
+    
+    def schema_fingerprint(self) -> Optional[str]:
+        """
+        列定义、索引定义与各表估计行数（reltuples）拼接后的 md5（只返回一行，不传输结构明细）
+        估计行数随 ANALYZE / autovacuum 更新，应用外的写入也会使缓存的行数失效
+        """
+        if not self._connection:
+            self.connect()
         
-        # 获取列信息
-        cursor.execute("""
-            SELECT 
-                column_name, data_type, is_nullable, column_default,
-                character_maximum_length, numeric_precision, numeric_scale
-            FROM information_schema.columns 
-            WHERE table_schema = %s AND table_name = %s
-            ORDER BY ordinal_position
-        """, (self.schema, table_name))
-        
-        columns = []
-        for row in cursor.fetchall():
-            col_type = row['data_type']
-            if row['character_maximum_length']:
-                col_type += f"({row['character_maximum_length']})"
-            elif row['numeric_precision']:
-                col_type += f"({row['numeric_precision']}"
-                if row['numeric_scale']:
-                    col_type += f",{row['numeric_scale']}"
-                col_type += ")"
-            
-            columns.append({
-                'name': row['column_name'],
-                'type': col_type,
-                'nullable': row['is_nullable'] == 'YES',
-                'default': row['column_default'],
-                'primary_key': False  # 后面更新
-            })
-        
-        # 获取主键信息
-        cursor.execute("""
-            SELECT column_name 
-            FROM information_schema.key_column_usage 
-            WHERE table_schema = %s AND table_name = %s 
-            AND constraint_name LIKE '%%_pkey'
-        """, (self.schema, table_name))
-        
-        pk_columns = [row['column_name'] for row in cursor.fetchall()]
-        for col in columns:
-            if col['name'] in pk_columns:
-                col['primary_key'] = True
-        
-        # 获取索引信息
-        cursor.execute("""
-            SELECT indexname, indexdef 
-            FROM pg_indexes 
-            WHERE schemaname = %s AND tablename = %s
-        """, (self.schema, table_name))
-        
-        indexes = []
-        for row in cursor.fetchall():
-            indexes.append({
-                'name': row['indexname'],
-                'definition': row['indexdef']
-            })
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT md5(
+                    COALESCE(string_agg(
+                        c.relname || '.' || a.attname || ':' || format_type(a.atttypid, a.atttypmod)
+                        || ':' || a.attnotnull::text,
+                        ',' ORDER BY c.relname, a.attnum
+                    ), '')
+                    || '|' || COALESCE((
+                        SELECT string_agg(indexdef, ',' ORDER BY tablename, indexname)
+                        FROM pg_indexes WHERE schemaname = %s
+                    ), '')
+                    || '|' || COALESCE((
+                        SELECT string_agg(t.relname || ':' || t.reltuples::text, ',' ORDER BY t.relname)
+                        FROM pg_class t JOIN pg_namespace tn ON tn.oid = t.relnamespace
+                        WHERE tn.nspname = %s AND t.relkind IN ('r', 'p', 'm', 'f')
+                    ), '')
+                ) AS fingerprint
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+                WHERE n.nspname = %s AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+            """, (self.schema, self.schema, self.schema))
+            return cursor.fetchone()['fingerprint']
+        finally:
+            cursor.close()
+    
+    def describe_tables(self, table_names: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        批量获取 schema 下的表结构：列与主键一次 pg_catalog 关联查询，索引一次 pg_indexes 查询，
+        在内存中按表分组（information_schema 视图在表多时很慢，且逐表查询是 N+1）
+        row_count 为 pg_class.reltuples 估计行数
+        """
+        if not self._connection:
+            self.connect()
         
-        # 获取行数估计
-        cursor.execute(f'SELECT COUNT(*) as count FROM "{self.schema}"."{table_name}"')
-        row_count = cursor.fetchone()['count']
+        if table_names is not None and not table_names:
+            return []
+        table_filter = '' if table_names is None else 'AND c.relname = ANY(%s)'
+        params = (self.schema,) if table_names is None else (self.schema, list(table_names))
         
-        cursor.close()
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT c.relname AS table_name, c.relkind, c.reltuples,
+                       a.attname AS column_name,
+                       format_type(a.atttypid, a.atttypmod) AS data_type,
+                       NOT a.attnotnull AS nullable,
+                       pg_get_expr(d.adbin, d.adrelid) AS column_default,
+                       COALESCE(a.attnum = ANY(pk.conkey), false) AS primary_key
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                LEFT JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+                LEFT JOIN pg_attrdef d ON d.adrelid = c.oid AND d.adnum = a.attnum
+                LEFT JOIN pg_constraint pk ON pk.conrelid = c.oid AND pk.contype = 'p'
+                WHERE n.nspname = %s AND c.relkind IN ('r', 'p', 'v', 'm', 'f') {table_filter}
+                ORDER BY c.relname, a.attnum
+            """, params)
+            tables = {}
+            for row in cursor.fetchall():
+                table = tables.get(row['table_name'])
+                if table is None:
+                    table = tables[row['table_name']] = {
+                        'name': row['table_name'],
+                        'type': 'view' if row['relkind'] in ('v', 'm') else 'table',
+                        'columns': [],
+                        'indexes': [],
+                        # 统计信息中的估计值，从未 ANALYZE 的表（reltuples 为 -1）与视图为 None
+                        'row_count': int(row['reltuples']) if row['relkind'] != 'v' and row['reltuples'] >= 0 else None
+                    }
+                if row['column_name'] is not None:
+                    table['columns'].append({
+                        'name': row['column_name'],
+                        'type': row['data_type'],
+                        'nullable': row['nullable'],
+                        'default': row['column_default'],
+                        'primary_key': row['primary_key']
+                    })
+            
+            cursor.execute(f"""
+                SELECT tablename, indexname, indexdef
+                FROM pg_indexes
+                WHERE schemaname = %s {table_filter.replace('c.relname', 'tablename')}
+                ORDER BY tablename, indexname
+            """, params)
+            for row in cursor.fetchall():
+                table = tables.get(row['tablename'])
+                if table is not None:
+                    table['indexes'].append({
+                        'name': row['indexname'],
+                        'definition': row['indexdef']
+                    })
+        finally:
+            cursor.close()
         
-        return {
-            'name': table_name,
-            'columns': columns,
-            'indexes': indexes,
-            'row_count': row_count
-        }
+        return list(tables.values())
     
     def execute_query(self, query: str, params: tuple = None) -> List[Dict]:
         """执行查询"""
@@ -193,7 +272,7 @@ class PostgreSQLConnector(BaseConnector):
         return results
     
     def insert_data(self, table_name: str, data: List[Dict]) -> Tuple[bool, int, Optional[str]]:
-        """插入数据"""
+        """插入数据（批量写入后一次提交，写入统计见 last_write_stats）"""
         if not data:
             return True, 0, None
         
@@ -201,30 +280,105 @@ class PostgreSQLConnector(BaseConnector):
             self.connect()
         
         try:
-            cursor = self._connection.cursor()
-            
-            # 获取列名
-            columns = list(data[0].keys())
-            placeholders = ', '.join(['%s'] * len(columns))
-            column_names = ', '.join([f'"{col}"' for col in columns])
-            
-            sql = f'INSERT INTO "{self.schema}"."{table_name}" ({column_names}) VALUES ({placeholders})'
-            
-            # 批量插入
-            inserted = 0
-            for row in data:
-                values = tuple(row.get(col) for col in columns)
-                cursor.execute(sql, values)
-                inserted += 1
-            
+            self.last_write_stats = self.bulk_insert(table_name, data)
             self._connection.commit()
-            cursor.close()
-            
-            return True, inserted, None
+            return True, self.last_write_stats['rows'], None
         except Exception as e:
             self._connection.rollback()
             return False, 0, str(e)
     
+    def write_chunk(self, table_name: str, rows: List[Dict]) -> int:
+        """分块写入的一块：走 bulk_insert（不提交）"""
+        stats = self.bulk_insert(table_name, rows)
+        self.write_method = stats['method']
+        return stats['rows']
+    
+    def bulk_insert(
+        self,
+        table_name: str,
+        rows: Iterable[Dict],
+        columns: List[str] = None,
+        method: str = None
+    ) -> Dict[str, Any]:
+        """
+        批量写入（不提交）
+        默认按块编码为 COPY 文本格式，经 COPY ... FROM STDIN 流式发送，整个写入只有一次往返；
+        没有 COPY 权限或服务端不支持时回退为 execute_values 多行 INSERT
+        rows 可以是生成器，内存占用只与块大小有关
+        :param columns: 列名，默认取第一行的键
+        :param method: copy / insert，默认 copy
+        :return: 写入统计 {method, rows, seconds, rows_per_second}
+        """
+        import psycopg2
+        
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return self._write_stats(method or self.METHOD_COPY, 0, time.perf_counter())
+        rows = itertools.chain([first], rows)
+        columns = columns or list(first.keys())
+        
+        if not self._connection:
+            self.connect()
+        
+        started = time.perf_counter()
+        cursor = self._connection.cursor()
+        try:
+            if method != self.METHOD_INSERT:
+                stream = _CopyStream(rows, columns)
+                # 只有允许回退时才需要保存点；成功后立即释放，
+                # 避免单事务分块写入时子事务层层堆积
+                fallback = method is None
+                try:
+                    if fallback:
+                        cursor.execute('SAVEPOINT bulk_copy')
+                    cursor.copy_expert(
+                        f'COPY {self._table_ref(table_name)} ({self._column_list(columns)}) FROM STDIN',
+                        stream, size=self.COPY_BUFFER_SIZE
+                    )
+                    if fallback:
+                        cursor.execute('RELEASE SAVEPOINT bulk_copy')
+                    return self._write_stats(self.METHOD_COPY, stream.rows, started)
+                except psycopg2.Error as e:
+                    # COPY 在读取数据前即被拒绝时才能回退，已发送的数据无法重放
+                    if not fallback or e.pgcode not in self.COPY_FALLBACK_PGCODES or stream.rows:
+                        raise
+                    cursor.execute('ROLLBACK TO SAVEPOINT bulk_copy')
+                    cursor.execute('RELEASE SAVEPOINT bulk_copy')
+            
+            inserted = self._insert_values(cursor, table_name, rows, columns)
+            return self._write_stats(self.METHOD_INSERT, inserted, started)
+        finally:
+            cursor.close()
+    
+    def _insert_values(self, cursor, table_name: str, rows: Iterator[Dict], columns: List[str]) -> int:
+        """execute_values 多行 INSERT，按 INSERT_PAGE_SIZE 行一条语句"""
+        from psycopg2.extras import execute_values, Json
+        
+        def values():
+            for row in rows:
+                counter[0] += 1
+                yield tuple(
+                    Json(value) if isinstance(value, (dict, list)) else value
+                    for value in (row.get(col) for col in columns)
+                )
+        
+        counter = [0]
+        execute_values(
+            cursor,
+            f'INSERT INTO {self._table_ref(table_name)} ({self._column_list(columns)}) VALUES %s',
+            values(),
+            page_size=self.INSERT_PAGE_SIZE
+        )
+        return counter[0]
+    
+    def _table_ref(self, table_name: str) -> str:
+        return f'"{self.schema}"."{table_name}"'
+    
+    @staticmethod
+    def _column_list(columns: List[str]) -> str:
+        return ', '.join(f'"{col}"' for col in columns)
+    
     def create_table(self, table_name: str, columns: List[Dict]) -> Tuple[bool, Optional[str]]:
         """创建表"""
         if not self._connection:
@@ -246,7 +400,8 @@ class PostgreSQLConnector(BaseConnector):
                 col_defs.append(col_def)
             
             if primary_keys:
-                col_defs.append(f'PRIMARY KEY ({", ".join([f\'"{pk}\'' for pk in primary_keys])})')
+                pk_names = ', '.join(f'"{pk}"' for pk in primary_keys)
+                col_defs.append(f'PRIMARY KEY ({pk_names})')
             
             sql = f'CREATE TABLE IF NOT EXISTS "{self.schema}"."{table_name}" ({", ".join(col_defs)})'
             
@@ -280,3 +435,31 @@ class PostgreSQLConnector(BaseConnector):
             'ip': 'INET',
         }
         return type_mapping.get(field_type.lower(), 'VARCHAR(255)')
+
+
+class _CopyStream:
+    """
+    供 copy_expert 读取的类文件对象：按块把行编码为 COPY 文本格式，
+    每次 read 只返回请求的字节数，不在内存中拼接全部数据
+    """
+
+    def __init__(self, rows: Iterable[Dict], columns: List[str]):
+        from services.export_service import export_service
+        self._encode = export_service.pg_copy_lines
+        self._chunks = iter(rows)
+        self._columns = columns
+        self._buffer = b''
+        self.rows = 0  # 已编码的行数
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = list(itertools.islice(self._chunks, PostgreSQLConnector.COPY_CHUNK_ROWS))
+            if not chunk:
+                break
+            self.rows += len(chunk)
+            self._buffer += self._encode(chunk, self._columns).encode('utf-8')
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
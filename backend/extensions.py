@@ -27,8 +27,29 @@ def init_extensions(app):
     # 在应用上下文中创建所有表
     with app.app_context():
         db.create_all()
+        _ensure_columns()
     
     # 初始化调度器（开发环境也启用）
     if not app.config.get('TESTING'):
         from services.scheduler_service import scheduler_service
         scheduler_service.init_scheduler(app)
+
+
+def _ensure_columns():
+    """
+    为已存在的表补齐新增的可空列
+    create_all 只会创建缺失的表，不会修改已有表结构
+    """
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                conn.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
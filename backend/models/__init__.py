@@ -12,7 +12,7 @@ from .user import User
 from .project import Project, project_members
 from .history import GenerationHistory
 from .template import Template as TemplateModel, Tag, TemplateRating, TemplateFavorite, TemplateDownload
-from .datasource import DataSource
+from .datasource import DataSource, DataSourceWrite, DataSourceSchemaCache
 from .notification import Notification
 from .webhook import Webhook
 from .audit_log import AuditLog
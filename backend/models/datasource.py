@@ -190,3 +190,116 @@ class DataSource(BaseModel):
             return f"{protocol}://{self.host}:{self.port}"
         
         return None
+
+
+class DataSourceWrite(BaseModel):
+    """
+    数据源分块写入记录
+    保存写入进度检查点：每提交一块更新已提交的行数，失败后可从最后提交的块继续写入
+    每块的统计只保留最近 RECENT_CHUNKS 块，其余只累计到计数与耗时中
+    """
+    __tablename__ = 'datasource_writes'
+    
+    RECENT_CHUNKS = 20
+    
+    uuid = db.Column(db.String(36), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    datasource_id = db.Column(db.Integer, db.ForeignKey('datasources.id', ondelete='CASCADE'), nullable=False, index=True)
+    
+    # 写入配置
+    table_name = db.Column(db.String(100), nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    transaction_mode = db.Column(db.String(20), nullable=False, default='chunk')  # chunk: 每块提交, single: 单事务
+    total_rows = db.Column(db.Integer, nullable=True)  # 总行数（未知时为空）
+    seed = db.Column(db.BigInteger, nullable=True)  # 服务端生成数据（seed 操作）的随机种子，续写时重放
+    
+    # 进度检查点
+    committed_rows = db.Column(db.Integer, nullable=False, default=0)
+    committed_chunks = db.Column(db.Integer, nullable=False, default=0)
+    write_seconds = db.Column(db.Float, nullable=True)  # 已提交块的累计写入耗时
+    _chunk_stats = db.Column('chunk_stats', db.Text, nullable=True)  # JSON: 最近若干块的行数与耗时
+    
+    # 状态
+    status = db.Column(db.String(20), nullable=False, default='running')  # running, completed, failed
+    error_message = db.Column(db.Text)
+    run_id = db.Column(db.String(36), nullable=True)  # 每次开始或继续写入时更新，排队中的旧执行发现不一致时放弃
+    
+    datasource = db.relationship('DataSource', backref=db.backref('writes', lazy='dynamic', cascade='all, delete-orphan'))
+    
+    @property
+    def chunk_stats(self):
+        """最近若干块的写入统计列表"""
+        try:
+            return json.loads(self._chunk_stats) if self._chunk_stats else []
+        except Exception:
+            return []
+    
+    @chunk_stats.setter
+    def chunk_stats(self, value):
+        self._chunk_stats = json.dumps(value, ensure_ascii=False)
+    
+    def record_chunk(self, stats, committed):
+        """记录一块的写入统计：已提交的块累计行数、块数与耗时，明细只保留最近 RECENT_CHUNKS 块"""
+        self.chunk_stats = (self.chunk_stats + [dict(stats, committed=committed)])[-self.RECENT_CHUNKS:]
+        if committed:
+            self.committed_rows += stats['rows']
+            self.committed_chunks += 1
+            self.write_seconds = (self.write_seconds or 0) + stats['seconds']
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.uuid,
+            'datasource_id': self.datasource.uuid if self.datasource else None,
+            'table_name': self.table_name,
+            'chunk_size': self.chunk_size,
+            'transaction': self.transaction_mode,
+            'total_rows': self.total_rows,
+            'seed': self.seed,
+            'committed_rows': self.committed_rows,
+            'committed_chunks': self.committed_chunks,
+            'rows_per_second': round(self.committed_rows / self.write_seconds) if self.write_seconds else None,
+            'chunks': self.chunk_stats,
+            'status': self.status,
+            'error': self.error_message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
+    @classmethod
+    def find_by_uuid(cls, uuid_str):
+        """根据 UUID 查找"""
+        return cls.query.filter_by(uuid=uuid_str).first()
+
+
+class DataSourceSchemaCache(BaseModel):
+    """
+    数据源结构元数据缓存
+    每个数据源的表列表（scope 为空）与各表结构（scope 为表名）各一条，
+    记录获取时数据源的结构指纹，过期后比较指纹决定是否重新获取
+    """
+    __tablename__ = 'datasource_schema_caches'
+    __table_args__ = (
+        db.UniqueConstraint('datasource_id', 'scope', name='uq_datasource_schema_cache_scope'),
+    )
+    
+    datasource_id = db.Column(db.Integer, db.ForeignKey('datasources.id', ondelete='CASCADE'), nullable=False, index=True)
+    scope = db.Column(db.String(255), nullable=False, default='')  # 空字符串为表列表，否则为表名
+    fingerprint = db.Column(db.String(64), nullable=True)  # 获取时的结构指纹（连接器不支持时为空，只按过期时间刷新）
+    _schema = db.Column('schema', db.Text, nullable=False)  # JSON
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # 从数据源获取的时间
+    checked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # 最近确认未变化的时间
+    
+    datasource = db.relationship('DataSource', backref=db.backref('schema_caches', lazy='dynamic', cascade='all, delete-orphan'))
+    
+    @property
+    def schema(self):
+        """缓存的表列表或表结构"""
+        try:
+            return json.loads(self._schema)
+        except Exception:
+            return None
+    
+    @schema.setter
+    def schema(self, value):
+        self._schema = json.dumps(value, ensure_ascii=False, default=str)
@@ -28,14 +28,22 @@ class GenerationHistory(BaseModel):
     # 生成配置
     fields_config = db.Column(db.Text, nullable=False)  # JSON: 字段配置
     row_count = db.Column(db.Integer, nullable=False, default=10)
+    seed = db.Column(db.BigInteger, nullable=True)  # 随机种子，存在时可按配置重放
+    engine = db.Column(db.String(20), nullable=True)  # 生成引擎: row, columnar
     
     # 导出信息
-    export_format = db.Column(db.String(20), default='json')  # json, csv, sql
+    export_format = db.Column(db.String(20), default='json')  # json, ndjson, csv, sql, parquet, arrow 等
     table_name = db.Column(db.String(100))  # SQL 导出时的表名
     
     # 状态
     status = db.Column(db.String(20), default='completed')  # pending, completed, failed
     error_message = db.Column(db.Text)
+    kind = db.Column(db.String(20), nullable=True)  # job: 异步生成任务（结果落盘供下载），普通生成记录为空
+    
+    # 异步任务进度：由执行任务的进程定期写入，任一进程都可查询与取消
+    rows_done = db.Column(db.Integer, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    cancel_requested = db.Column(db.Boolean, nullable=True)
     
     # 统计
     execution_time_ms = db.Column(db.Integer)  # 执行耗时（毫秒）
@@ -58,6 +66,11 @@ class GenerationHistory(BaseModel):
         """设置字段配置"""
         self.fields_config = json.dumps(value, ensure_ascii=False)
     
+    @property
+    def replayable(self) -> bool:
+        """是否可通过 配置 + 种子 重新生成"""
+        return self.seed is not None
+    
     def to_dict(self, include_fields: bool = True) -> dict:
         """转换为字典"""
         data = {
@@ -68,10 +81,14 @@ class GenerationHistory(BaseModel):
             'project_id': self.project_id,
             'template_id': self.template_id,
             'row_count': self.row_count,
+            'seed': self.seed,
+            'engine': self.engine,
+            'replayable': self.replayable,
             'export_format': self.export_format,
             'table_name': self.table_name,
             'status': self.status,
             'error_message': self.error_message,
+            'kind': self.kind,
             'execution_time_ms': self.execution_time_ms,
             'data_size_bytes': self.data_size_bytes,
             'created_at': self.created_at.isoformat() if self.created_at else None,
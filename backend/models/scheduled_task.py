@@ -34,7 +34,8 @@ class ScheduledTask(BaseModel):
     # 生成配置
     fields_config = db.Column(db.Text, nullable=False)  # JSON: 字段配置
     row_count = db.Column(db.Integer, nullable=False, default=100)
-    export_format = db.Column(db.String(20), default='json')  # json, csv, sql
+    seed = db.Column(db.BigInteger, nullable=True)  # 随机种子，设置后每次执行生成相同数据
+    export_format = db.Column(db.String(20), default='json')  # json, jsonl, csv, sql, parquet, arrow 等
     table_name = db.Column(db.String(100))  # SQL 导出时的表名
     
     # 输出配置
@@ -113,6 +114,7 @@ class ScheduledTask(BaseModel):
             'cron_expression': self.cron_expression,
             'timezone': self.timezone,
             'row_count': self.row_count,
+            'seed': self.seed,
             'export_format': self.export_format,
             'table_name': self.table_name,
             'output_type': self.output_type,
@@ -21,6 +21,7 @@ from .validation_routes import validation_bp
 from .import_routes import import_bp
 from .audit_routes import audit_bp
 from .settings_routes import settings_bp
+from .job_routes import job_bp
 
 __all__ = [
     "types_bp",
@@ -42,4 +43,5 @@ __all__ = [
     "import_bp",
     "audit_bp",
     "settings_bp",
+    "job_bp",
 ]
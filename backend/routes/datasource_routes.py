@@ -9,6 +9,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from flask import Blueprint, request, jsonify, g
 from middleware.auth import login_required
 from services.datasource_service import datasource_service
+from services.datasource_write_service import datasource_write_service
 
 datasource_bp = Blueprint('datasource', __name__, url_prefix='/api/datasources')
 
@@ -504,9 +505,14 @@ def get_datasource_tables(datasource_id):
         type: string
         required: true
         description: 数据源ID
+      - name: refresh
+        in: query
+        type: boolean
+        default: false
+        description: 忽略缓存，重新从数据源获取
     responses:
       200:
-        description: 表列表
+        description: 表列表，每个表包含 type（table / view）、columns、indexes 与估计行数 row_count
         schema:
           type: object
           properties:
@@ -514,19 +520,24 @@ def get_datasource_tables(datasource_id):
               type: array
               items:
                 type: object
+            cached:
+              type: boolean
+              description: 是否来自结构缓存
+            fetched_at:
+              type: string
+              description: 从数据源获取的时间
       400:
         description: 获取失败
     """
     user_id = g.current_user.id
+    refresh = request.args.get('refresh', 'false').lower() == 'true'
     
-    tables, error = datasource_service.get_tables(datasource_id, user_id)
+    tables, meta, error = datasource_service.get_tables(datasource_id, user_id, refresh=refresh)
     
     if error:
         return jsonify({'error': error}), 400
     
-    return jsonify({
-        'data': tables
-    })
+    return jsonify(dict({'data': tables}, **meta))
 
 
 @datasource_bp.route('/<datasource_id>/tables/<table_name>', methods=['GET'])
@@ -549,6 +560,16 @@ def get_table_schema(datasource_id, table_name):
         type: string
         required: true
         description: 表名
+      - name: refresh
+        in: query
+        type: boolean
+        default: false
+        description: 忽略缓存，重新从数据源获取
+      - name: exact_count
+        in: query
+        type: boolean
+        default: false
+        description: 返回精确行数（全表计数，大表较慢），默认为系统目录中的估计值
     responses:
       200:
         description: 表结构
@@ -557,6 +578,13 @@ def get_table_schema(datasource_id, table_name):
           properties:
             data:
               type: object
+              description: 表结构，row_count_exact 表示 row_count 是否为精确值
+            cached:
+              type: boolean
+              description: 表结构是否来自缓存
+            fetched_at:
+              type: string
+              description: 从数据源获取的时间
       404:
         description: 数据源不存在
       500:
@@ -570,48 +598,17 @@ def get_table_schema(datasource_id, table_name):
     if not datasource or datasource.user_id != user_id:
         return jsonify({'error': '数据源不存在'}), 404
     
-    # 根据类型选择连接器
+    if datasource.type not in ['mysql', 'postgresql', 'mongodb']:
+        return jsonify({'error': f'不支持的数据源类型: {datasource.type}'}), 400
+    
+    refresh = request.args.get('refresh', 'false').lower() == 'true'
+    exact_count = request.args.get('exact_count', 'false').lower() == 'true'
+    
     try:
-        if datasource.type == 'mysql':
-            from connectors.mysql_connector import MySQLConnector
-            connector = MySQLConnector(
-                host=datasource.host,
-                port=datasource.port,
-                database=datasource.database,
-                username=datasource.username,
-                password=datasource.get_password(),
-                use_ssl=datasource.use_ssl
-            )
-        elif datasource.type == 'postgresql':
-            from connectors.postgres_connector import PostgreSQLConnector
-            connector = PostgreSQLConnector(
-                host=datasource.host,
-                port=datasource.port,
-                database=datasource.database,
-                username=datasource.username,
-                password=datasource.get_password(),
-                use_ssl=datasource.use_ssl
-            )
-        elif datasource.type == 'mongodb':
-            from connectors.mongo_connector import MongoDBConnector
-            connector = MongoDBConnector(
-                host=datasource.host,
-                port=datasource.port,
-                database=datasource.database,
-                username=datasource.username,
-                password=datasource.get_password()
-            )
-        else:
-            return jsonify({'error': f'不支持的数据源类型: {datasource.type}'}), 400
-        
-        with connector:
-            schema = connector.get_table_schema(table_name)
-        
-        datasource.record_query()
-        
-        return jsonify({
-            'data': schema
-        })
+        schema, meta = datasource_service.get_table_schema(
+            datasource, table_name, refresh=refresh, exact_count=exact_count
+        )
+        return jsonify(dict({'data': schema}, **meta))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -656,6 +653,22 @@ def write_to_datasource(datasource_id):
               items:
                 type: object
               description: 列定义
+            chunk_size:
+              type: integer
+              default: 5000
+              description: 每块写入的行数（100-100000）
+            transaction:
+              type: string
+              enum: [chunk, single]
+              default: chunk
+              description: chunk 每块提交一次，失败只回滚当前块；single 全部数据一个事务（MongoDB 不支持）
+            resume_id:
+              type: string
+              description: 继续之前失败的写入（重新提交相同的数据，跳过已提交的块）
+            write_concern:
+              type: string
+              enum: [majority, acknowledged, journaled, unacknowledged]
+              description: MongoDB 写关注（仅 MongoDB），一次性测试数据可用 unacknowledged 提高吞吐
     responses:
       200:
         description: 写入成功
@@ -666,12 +679,18 @@ def write_to_datasource(datasource_id):
               type: string
             inserted:
               type: integer
+            stats:
+              type: object
+              description: 写入统计 {method, rows, seconds, rows_per_second, chunk_count, chunks}，chunks 为最近若干块的行数与耗时
+            write:
+              type: object
+              description: 写入记录与检查点 {id, status, committed_rows, committed_chunks, rows_per_second, chunks}
       400:
         description: 请求参数错误
       404:
         description: 数据源不存在
       500:
-        description: 写入失败
+        description: 写入失败，响应中的 write 为检查点，可用其 id 作为 resume_id 继续写入
     """
     user_id = g.current_user.id
     data = request.get_json()
@@ -683,6 +702,10 @@ def write_to_datasource(datasource_id):
     records = data.get('data', [])
     create_table = data.get('create_table', False)
     columns = data.get('columns', [])
+    chunk_size = data.get('chunk_size', datasource_write_service.DEFAULT_CHUNK_SIZE)
+    transaction = data.get('transaction', datasource_write_service.MODE_CHUNK)
+    resume_id = data.get('resume_id')
+    write_concern = data.get('write_concern')
     
     if not table_name:
         return jsonify({'error': '缺少表名'}), 400
@@ -696,61 +719,202 @@ def write_to_datasource(datasource_id):
     if not datasource or datasource.user_id != user_id:
         return jsonify({'error': '数据源不存在'}), 404
     
-    try:
-        # 根据类型选择连接器
-        if datasource.type == 'mysql':
-            from connectors.mysql_connector import MySQLConnector
-            connector = MySQLConnector(
-                host=datasource.host,
-                port=datasource.port,
-                database=datasource.database,
-                username=datasource.username,
-                password=datasource.get_password(),
-                use_ssl=datasource.use_ssl
-            )
-        elif datasource.type == 'postgresql':
-            from connectors.postgres_connector import PostgreSQLConnector
-            connector = PostgreSQLConnector(
-                host=datasource.host,
-                port=datasource.port,
-                database=datasource.database,
-                username=datasource.username,
-                password=datasource.get_password(),
-                use_ssl=datasource.use_ssl
-            )
-        elif datasource.type == 'mongodb':
-            from connectors.mongo_connector import MongoDBConnector
-            connector = MongoDBConnector(
-                host=datasource.host,
-                port=datasource.port,
-                database=datasource.database,
-                username=datasource.username,
-                password=datasource.get_password()
-            )
-        else:
-            return jsonify({'error': f'不支持的数据源类型: {datasource.type}'}), 400
-        
-        with connector:
-            # 如果需要创建表
-            if create_table and columns:
-                if datasource.type in ['mysql', 'postgresql']:
-                    success, error = connector.create_table(table_name, columns)
-                    if not success:
-                        return jsonify({'error': f'创建表失败: {error}'}), 500
-                elif datasource.type == 'mongodb':
-                    connector.create_collection(table_name)
-            
-            # 插入数据
-            success, inserted, error = connector.insert_data(table_name, records)
-        
-        if not success:
-            return jsonify({'error': f'写入失败: {error}'}), 500
-        
-        datasource.record_query()
-        
+    if datasource.type not in ['mysql', 'postgresql', 'mongodb']:
+        return jsonify({'error': f'不支持的数据源类型: {datasource.type}'}), 400
+    
+    error = datasource_write_service.validate_options(chunk_size, transaction, datasource.type, write_concern)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    write, error = datasource_write_service.start_write(
+        datasource, user_id, table_name, len(records),
+        chunk_size=chunk_size, mode=transaction, resume_id=resume_id
+    )
+    if error:
+        return jsonify({'error': error}), 400
+    
+    success, stats, error = datasource_write_service.run_write(
+        write, records, create_table=create_table, columns=columns, write_concern=write_concern
+    )
+    
+    if not success:
+        # 返回检查点，客户端可带上 resume_id 重新提交，从最后提交的块继续
         return jsonify({
-            'message': '数据写入成功',
-            'inserted': inserted
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+            'error': f'写入失败: {error}',
+            'write': write.to_dict()
+        }), 500
+    
+    return jsonify({
+        'message': '数据写入成功',
+        'inserted': stats['rows'],
+        'stats': stats,
+        'write': write.to_dict()
+    })
+
+
+@datasource_bp.route('/<datasource_id>/seed', methods=['POST'])
+@login_required
+def seed_datasource(datasource_id):
+    """在服务端生成模拟数据并直接写入数据源
+    ---
+    tags:
+      - 数据源管理
+    security:
+      - BearerAuth: []
+    description: 按字段配置分块生成并通过批量写入路径（COPY / 多行 INSERT / insert_many）写入，数据不经过客户端，内存占用只与块大小有关。后台执行，进度通过 /writes/{write_id} 查询
+    parameters:
+      - name: datasource_id
+        in: path
+        type: string
+        required: true
+        description: 数据源ID
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - table_name
+            - count
+          properties:
+            table_name:
+              type: string
+              description: 表名
+            fields:
+              type: array
+              items:
+                type: object
+              description: 字段配置（与 template_id 二选一）
+            template_id:
+              type: string
+              description: 模板ID（内置模板或模板市场中的模板）
+            count:
+              type: integer
+              description: 生成行数
+            seed:
+              type: integer
+              description: 随机种子（可选，不提供时自动生成并记录在写入记录中，继续写入时沿用）
+            create_table:
+              type: boolean
+              description: 是否创建表（未提供 columns 时按字段配置建表）
+            columns:
+              type: array
+              items:
+                type: object
+              description: 列定义
+            chunk_size:
+              type: integer
+              default: 5000
+              description: 每块生成并写入的行数（100-100000）
+            transaction:
+              type: string
+              enum: [chunk, single]
+              default: chunk
+              description: chunk 每块提交一次；single 全部数据一个事务（MongoDB 不支持）
+            resume_id:
+              type: string
+              description: 继续之前失败的 seed（只生成并写入剩余的行，需提交相同的字段配置）
+            write_concern:
+              type: string
+              enum: [majority, acknowledged, journaled, unacknowledged]
+              description: MongoDB 写关注（仅 MongoDB），一次性测试数据可用 unacknowledged 提高吞吐
+    responses:
+      202:
+        description: 已提交，返回写入记录 {id, status, seed, total_rows, committed_rows}
+      400:
+        description: 请求参数错误
+      404:
+        description: 数据源不存在
+    """
+    from models.datasource import DataSource
+    from services.data_generator_service import data_generator_service
+    
+    user_id = g.current_user.id
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({'error': '请求数据不能为空'}), 400
+    
+    table_name = data.get('table_name')
+    count = data.get('count')
+    seed = data.get('seed')
+    chunk_size = data.get('chunk_size', datasource_write_service.DEFAULT_CHUNK_SIZE)
+    transaction = data.get('transaction', datasource_write_service.MODE_CHUNK)
+    resume_id = data.get('resume_id')
+    write_concern = data.get('write_concern')
+    max_rows = datasource_write_service.MAX_SEED_ROWS
+    
+    if not table_name:
+        return jsonify({'error': '缺少表名'}), 400
+    
+    if not isinstance(count, int) or isinstance(count, bool) or count < 1 or count > max_rows:
+        return jsonify({'error': f'count must be between 1 and {max_rows}'}), 400
+    
+    seed_error = data_generator_service.validate_seed(seed)
+    if seed_error:
+        return jsonify({'error': seed_error}), 400
+    
+    fields, error = datasource_write_service.resolve_fields(data.get('fields'), data.get('template_id'), user_id)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    datasource = DataSource.find_by_uuid(datasource_id)
+    if not datasource or datasource.user_id != user_id:
+        return jsonify({'error': '数据源不存在'}), 404
+    
+    if datasource.type not in ['mysql', 'postgresql', 'mongodb']:
+        return jsonify({'error': f'不支持的数据源类型: {datasource.type}'}), 400
+    
+    error = datasource_write_service.validate_options(chunk_size, transaction, datasource.type, write_concern)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    write, error = datasource_write_service.start_write(
+        datasource, user_id, table_name, count,
+        chunk_size=chunk_size, mode=transaction, resume_id=resume_id,
+        seed=seed, seeded=True
+    )
+    if error:
+        return jsonify({'error': error}), 400
+    
+    error = datasource_write_service.submit_seed(
+        write, fields, create_table=data.get('create_table', False), columns=data.get('columns'),
+        write_concern=write_concern
+    )
+    if error:
+        return jsonify({'error': error}), 400
+    
+    return jsonify({'data': write.to_dict()}), 202
+
+
+@datasource_bp.route('/<datasource_id>/writes/<write_id>', methods=['GET'])
+@login_required
+def get_datasource_write(datasource_id, write_id):
+    """获取分块写入的进度检查点
+    ---
+    tags:
+      - 数据源管理
+    security:
+      - BearerAuth: []
+    parameters:
+      - name: datasource_id
+        in: path
+        type: string
+        required: true
+        description: 数据源ID
+      - name: write_id
+        in: path
+        type: string
+        required: true
+        description: 写入ID（/write 响应中的 write.id）
+    responses:
+      200:
+        description: 写入进度 {status, total_rows, committed_rows, committed_chunks, rows_per_second, chunks}，chunks 只包含最近若干块
+      404:
+        description: 写入记录不存在
+    """
+    write = datasource_write_service.get_write(write_id, g.current_user.id)
+    if not write or not write.datasource or write.datasource.uuid != datasource_id:
+        return jsonify({'error': '写入记录不存在'}), 404
+    
+    return jsonify({'data': write.to_dict()})
@@ -1,12 +1,188 @@
 """
 导出路由
 """
-from flask import Blueprint, jsonify, request, Response
+from itertools import chain
 
-from services import export_service
+from flask import Blueprint, jsonify, request, Response, current_app
+
+from services import export_service, data_generator_service
+from services.compression_service import compression_service
 
 export_bp = Blueprint('export', __name__, url_prefix='/api')
 
+EXPORT_MAX_COUNT = 1000000  # 按配置生成并导出时的最大行数
+SQL_MODES = ["insert", "copy", "load_data", "load_data_control"]  # SQL 导出方式
+
+
+def _resolve_rows(payload: dict):
+    """
+    解析导出的数据来源
+    - data: 直接导出请求中的数据
+    - count (+ engine / seed): 按 fields 配置边生成边导出，不在内存中保留全部数据
+    返回: (行迭代器, 错误信息)
+    """
+    records = payload.get("data") or []
+    if records:
+        return records, None
+
+    count = payload.get("count")
+    fields = payload.get("fields") or []
+    if count is None or not fields:
+        return None, "No data to export"
+
+    if not isinstance(count, int) or isinstance(count, bool) or count < 1 or count > EXPORT_MAX_COUNT:
+        return None, f"count must be between 1 and {EXPORT_MAX_COUNT}"
+
+    engine = payload.get("engine")
+    if engine and engine not in data_generator_service.ENGINES:
+        return None, f"engine must be one of {data_generator_service.ENGINES}"
+
+    seed = payload.get("seed")
+    seed_error = data_generator_service.validate_seed(seed)
+    if seed_error:
+        return None, seed_error
+
+    chunks = data_generator_service.iter_chunks(
+        fields, count,
+        engine=data_generator_service.resolve_engine(engine),
+        seed=seed,
+        workers=current_app.config.get('GENERATION_WORKERS')
+    )
+    return chain.from_iterable(chunks), None
+
+
+def _validate_sql_options(dialect, batch_size):
+    """校验 SQL 导出的方言与批大小，合法返回 None，否则返回错误信息"""
+    if dialect and dialect not in export_service.DIALECTS:
+        return f"dialect must be one of {export_service.DIALECTS}"
+    if batch_size is not None and (not isinstance(batch_size, int) or isinstance(batch_size, bool) or batch_size < 1):
+        return "batchSize must be a positive integer"
+    return None
+
+
+def _export_response(chunks, mimetype: str, filename: str) -> Response:
+    """
+    以流式响应返回导出文件
+    - 请求体或查询参数 compress=gzip|zstd：边生成边压缩，下载 .gz / .zst 压缩文件
+    - 否则按 Accept-Encoding 协商传输压缩（Content-Encoding）；列式格式本身已压缩，不再协商
+    """
+    payload = request.get_json(silent=True) or {}
+    encoding, as_file, error = compression_service.resolve(
+        payload.get("compress") or request.args.get("compress"),
+        request.headers.get("Accept-Encoding"),
+        negotiable=not mimetype.startswith('application/vnd.')
+    )
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    headers = {}
+    if encoding:
+        chunks = compression_service.compress_stream(chunks, encoding)
+        if as_file:
+            mimetype, _ = compression_service.FILE_INFO[encoding]
+            filename = compression_service.file_name(filename, encoding)
+        else:
+            headers['Content-Encoding'] = encoding
+    if not as_file:
+        headers['Vary'] = 'Accept-Encoding'
+
+    content_type = mimetype if mimetype.startswith(('application/vnd.', 'application/gzip', 'application/zstd')) \
+        else f'{mimetype}; charset=utf-8'
+    headers.update({
+        'Content-Disposition': f'attachment; filename={filename}',
+        'Content-Type': content_type
+    })
+    return Response(chunks, mimetype=mimetype, headers=headers)
+
+
+@export_bp.route('/export', methods=['POST'])
+def export_data():
+    """
+    按指定格式导出（含 Parquet / Arrow 列式格式）
+    ---
+    tags:
+      - 导出
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - format
+          properties:
+            format:
+              type: string
+              enum: [json, jsonl, csv, sql, pg_copy, mysql_tsv, parquet, arrow]
+              description: 导出格式；parquet / arrow 按字段类型写出强类型列（需安装 pyarrow）
+            data:
+              type: array
+              description: 要导出的数据（与 count 二选一）
+            fields:
+              type: array
+              description: 字段配置
+            count:
+              type: integer
+              description: 不传 data 时按 fields 生成并导出的行数（1-1000000）
+            engine:
+              type: string
+              enum: [row, columnar]
+            seed:
+              type: integer
+            compression:
+              type: string
+              description: 列式格式的压缩方式（parquet 支持 zstd/snappy/gzip/none，arrow 支持 zstd/lz4/none），默认 zstd
+            compact:
+              type: boolean
+              description: json 格式是否输出紧凑 JSON
+            tableName:
+              type: string
+              description: sql / pg_copy 格式的表名
+            dialect:
+              type: string
+              enum: [mysql, postgresql, sqlite]
+              description: sql 格式的方言
+            batchSize:
+              type: integer
+              description: sql 格式每条 INSERT 语句的行数
+            compress:
+              type: string
+              enum: [gzip, zstd]
+              description: 下载压缩文件（.gz / .zst）；不传时按 Accept-Encoding 协商传输压缩
+    responses:
+      200:
+        description: 返回导出文件（流式）
+      400:
+        description: 参数错误或无数据可导出
+    """
+    data = request.get_json()
+    export_format = data.get("format")
+    fields = data.get("fields", [])
+    compression = data.get("compression")
+
+    format_error = export_service.validate_format(export_format, compression) or \
+        _validate_sql_options(data.get("dialect"), data.get("batchSize"))
+    if format_error:
+        return jsonify({"success": False, "error": format_error}), 400
+
+    if export_format in export_service.COLUMNAR_FORMATS and not fields:
+        return jsonify({"success": False, "error": "fields is required"}), 400
+
+    rows, error = _resolve_rows(data)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    chunks = export_service.iter_export(
+        export_format, rows, fields,
+        compact=bool(data.get("compact")),
+        table_name=data.get("tableName"),
+        dialect=data.get("dialect"),
+        batch_size=data.get("batchSize"),
+        compression=compression
+    )
+    mimetype, extension = export_service.FORMAT_INFO[export_format]
+    return _export_response(chunks, mimetype, f'generated_data.{extension}')
+
 
 @export_bp.route('/export/json', methods=['POST'])
 def export_json():
@@ -21,12 +197,10 @@ def export_json():
         required: true
         schema:
           type: object
-          required:
-            - data
           properties:
             data:
               type: array
-              description: 要导出的数据
+              description: 要导出的数据（与 count 二选一）
               items:
                 type: object
             fields:
@@ -34,9 +208,27 @@ def export_json():
               description: 字段配置
               items:
                 type: object
+            count:
+              type: integer
+              description: 不传 data 时按 fields 生成并导出的行数（1-1000000）
+            engine:
+              type: string
+              enum: [row, columnar]
+              description: 按配置生成时使用的引擎
+            seed:
+              type: integer
+              description: 按配置生成时使用的随机种子
+            compact:
+              type: boolean
+              default: false
+              description: 输出紧凑 JSON（不缩进）
+            compress:
+              type: string
+              enum: [gzip, zstd]
+              description: 下载压缩文件（.gz / .zst）；不传时按 Accept-Encoding 协商传输压缩
     responses:
       200:
-        description: 返回JSON文件
+        description: 返回JSON文件（流式）
         content:
           application/json:
             schema:
@@ -46,21 +238,67 @@ def export_json():
         description: 无数据可导出
     """
     data = request.get_json()
-    records = data.get("data", [])
     fields = data.get("fields", [])
-    
-    if not records:
-        return jsonify({"success": False, "error": "No data to export"}), 400
-    
-    content = export_service.to_json(records, fields)
-    
-    return Response(
-        content,
-        mimetype='application/json',
-        headers={
-            'Content-Disposition': 'attachment; filename=generated_data.json'
-        }
-    )
+
+    rows, error = _resolve_rows(data)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    chunks = export_service.iter_json(rows, fields, compact=bool(data.get("compact")))
+    return _export_response(chunks, 'application/json', 'generated_data.json')
+
+
+@export_bp.route('/export/jsonl', methods=['POST'])
+def export_jsonl():
+    """
+    导出为JSON Lines格式（每行一个 JSON 对象）
+    ---
+    tags:
+      - 导出
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            data:
+              type: array
+              description: 要导出的数据（与 count 二选一）
+            fields:
+              type: array
+              description: 字段配置
+            count:
+              type: integer
+              description: 不传 data 时按 fields 生成并导出的行数（1-1000000）
+            engine:
+              type: string
+              enum: [row, columnar]
+            seed:
+              type: integer
+            compress:
+              type: string
+              enum: [gzip, zstd]
+              description: 下载压缩文件（.gz / .zst）；不传时按 Accept-Encoding 协商传输压缩
+    responses:
+      200:
+        description: 返回JSON Lines文件（流式）
+        content:
+          application/x-ndjson:
+            schema:
+              type: string
+              format: binary
+      400:
+        description: 无数据可导出
+    """
+    data = request.get_json()
+    fields = data.get("fields", [])
+
+    rows, error = _resolve_rows(data)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    return _export_response(export_service.iter_jsonl(rows, fields), 'application/x-ndjson', 'generated_data.jsonl')
 
 
 @export_bp.route('/export/csv', methods=['POST'])
@@ -76,18 +314,28 @@ def export_csv():
         required: true
         schema:
           type: object
-          required:
-            - data
           properties:
             data:
               type: array
-              description: 要导出的数据
+              description: 要导出的数据（与 count 二选一）
             fields:
               type: array
               description: 字段配置
+            count:
+              type: integer
+              description: 不传 data 时按 fields 生成并导出的行数（1-1000000）
+            engine:
+              type: string
+              enum: [row, columnar]
+            seed:
+              type: integer
+            compress:
+              type: string
+              enum: [gzip, zstd]
+              description: 下载压缩文件（.gz / .zst）；不传时按 Accept-Encoding 协商传输压缩
     responses:
       200:
-        description: 返回CSV文件
+        description: 返回CSV文件（流式）
         content:
           text/csv:
             schema:
@@ -97,22 +345,13 @@ def export_csv():
         description: 无数据可导出
     """
     data = request.get_json()
-    records = data.get("data", [])
     fields = data.get("fields", [])
-    
-    if not records:
-        return jsonify({"success": False, "error": "No data to export"}), 400
-    
-    content = export_service.to_csv(records, fields)
-    
-    return Response(
-        content,
-        mimetype='text/csv',
-        headers={
-            'Content-Disposition': 'attachment; filename=generated_data.csv',
-            'Content-Type': 'text/csv; charset=utf-8'
-        }
-    )
+
+    rows, error = _resolve_rows(data)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    return _export_response(export_service.iter_csv(rows, fields), 'text/csv', 'generated_data.csv')
 
 
 @export_bp.route('/export/sql', methods=['POST'])
@@ -128,45 +367,91 @@ def export_sql():
         required: true
         schema:
           type: object
-          required:
-            - data
           properties:
             data:
               type: array
-              description: 要导出的数据
+              description: 要导出的数据（与 count 二选一）
             fields:
               type: array
               description: 字段配置
+            count:
+              type: integer
+              description: 不传 data 时按 fields 生成并导出的行数（1-1000000）
+            engine:
+              type: string
+              enum: [row, columnar]
+            seed:
+              type: integer
             tableName:
               type: string
-              description: 表名
+              description: 表名（支持 schema.table）
               default: test_data
+            dialect:
+              type: string
+              enum: [mysql, postgresql, sqlite]
+              description: SQL 方言，决定标识符引用与字面量写法；不传时使用通用写法
+            batchSize:
+              type: integer
+              default: 1000
+              description: 每条 INSERT 语句包含的行数
+            mode:
+              type: string
+              enum: [insert, copy, load_data, load_data_control]
+              default: insert
+              description: >
+                insert 为分批多行 INSERT；copy 为 PostgreSQL COPY FROM STDIN 脚本；
+                load_data 为 MySQL LOAD DATA 使用的 TSV 数据文件；load_data_control 为对应的 LOAD DATA 控制语句
+            compress:
+              type: string
+              enum: [gzip, zstd]
+              description: 下载压缩文件（.gz / .zst）；不传时按 Accept-Encoding 协商传输压缩
     responses:
       200:
-        description: 返回SQL文件
+        description: 返回SQL文件（流式）
         content:
           text/plain:
             schema:
               type: string
               format: binary
       400:
-        description: 无数据可导出
+        description: 无数据可导出或参数错误
     """
     data = request.get_json()
-    records = data.get("data", [])
     fields = data.get("fields", [])
-    table_name = data.get("tableName", "test_data")
-    
-    if not records:
-        return jsonify({"success": False, "error": "No data to export"}), 400
-    
-    content = export_service.to_sql(records, fields, table_name)
-    
-    return Response(
-        content,
-        mimetype='text/plain',
-        headers={
-            'Content-Disposition': 'attachment; filename=generated_data.sql',
-            'Content-Type': 'text/plain; charset=utf-8'
-        }
-    )
+    table_name = data.get("tableName") or "test_data"
+    dialect = data.get("dialect")
+    batch_size = data.get("batchSize")
+    mode = data.get("mode") or "insert"
+
+    if mode not in SQL_MODES:
+        return jsonify({"success": False, "error": f"mode must be one of {SQL_MODES}"}), 400
+
+    options_error = _validate_sql_options(dialect, batch_size)
+    if options_error:
+        return jsonify({"success": False, "error": options_error}), 400
+
+    if mode == "copy" and dialect not in (None, export_service.DIALECT_POSTGRESQL):
+        return jsonify({"success": False, "error": "copy mode requires dialect postgresql"}), 400
+
+    if mode in ("load_data", "load_data_control") and dialect not in (None, export_service.DIALECT_MYSQL):
+        return jsonify({"success": False, "error": "load_data mode requires dialect mysql"}), 400
+
+    if mode == "load_data_control":
+        if not fields:
+            return jsonify({"success": False, "error": "fields is required"}), 400
+        statement = export_service.mysql_load_statement(fields, table_name)
+        return _export_response([statement.encode("utf-8")], 'text/plain', 'load_data.sql')
+
+    rows, error = _resolve_rows(data)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    if mode == "copy":
+        chunks = export_service.iter_pg_copy(rows, fields, table_name)
+        return _export_response(chunks, 'text/plain', 'generated_data.copy.sql')
+
+    if mode == "load_data":
+        return _export_response(export_service.iter_mysql_tsv(rows, fields), 'text/tab-separated-values', 'generated_data.tsv')
+
+    chunks = export_service.iter_sql(rows, fields, table_name, dialect=dialect, batch_size=batch_size)
+    return _export_response(chunks, 'text/plain', 'generated_data.sql')
@@ -3,14 +3,35 @@
 """
 import time
 import json
-from flask import Blueprint, jsonify, request, g
+from flask import Blueprint, jsonify, request, g, Response, stream_with_context, current_app
 
 from services import data_generator_service
 from services.history_service import history_service
-from middleware import optional_auth
+from services.compression_service import compression_service
+from middleware import optional_auth, login_required
 
 generate_bp = Blueprint('generate', __name__, url_prefix='/api')
 
+NDJSON_MIMETYPE = 'application/x-ndjson'
+MAX_COUNT = 10000  # 一次性返回时的最大生成数量
+MAX_STREAM_COUNT = 1000000  # 流式返回时的最大生成数量
+
+
+def _wants_stream() -> bool:
+    """是否使用流式 NDJSON 返回（?stream=1、?compress=... 或 Accept: application/x-ndjson）"""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes') or request.args.get('compress'):
+        return True
+    return any(mimetype == NDJSON_MIMETYPE for mimetype, _ in request.accept_mimetypes)
+
+
+def _record_history(**kwargs):
+    """记录生成历史，失败不影响数据生成"""
+    try:
+        return history_service.create_history(**kwargs)
+    except Exception as e:
+        print(f"Failed to create history: {e}")
+        return None
+
 
 @generate_bp.route('/generate', methods=['POST'])
 @optional_auth
@@ -21,6 +42,17 @@ def generate():
     tags:
       - 数据生成
     parameters:
+      - in: query
+        name: stream
+        type: string
+        required: false
+        description: 为 1 时以 NDJSON 流式返回（等同于请求头 Accept 为 application/x-ndjson）
+      - in: query
+        name: compress
+        type: string
+        enum: [gzip, zstd]
+        required: false
+        description: 以流式方式下载压缩的 NDJSON 文件（.ndjson.gz / .ndjson.zst）；不传时按 Accept-Encoding 协商传输压缩
       - in: body
         name: body
         required: true
@@ -52,7 +84,7 @@ def generate():
                   type: "chineseName"
             count:
               type: integer
-              description: 生成数量（1-10000）
+              description: 生成数量（1-10000，流式返回时最多 1000000）
               default: 10
               example: 100
             name:
@@ -64,9 +96,20 @@ def generate():
             template_id:
               type: string
               description: 模板ID（可选）
+            engine:
+              type: string
+              enum: [row, columnar]
+              default: row
+              description: 生成引擎（columnar 为按列向量化生成，需安装 numpy）
+            seed:
+              type: integer
+              description: 随机种子（可选），相同配置与种子生成相同数据，并可从历史记录重放
+    produces:
+      - application/json
+      - application/x-ndjson
     responses:
       200:
-        description: 生成成功
+        description: 生成成功。流式模式下每行一个 JSON 对象，引擎与种子通过 X-Generate-Engine / X-Generate-Seed 响应头返回；请求头 Accept-Encoding 含 gzip 或 zstd 时响应体按 Content-Encoding 压缩
         schema:
           type: object
           properties:
@@ -80,6 +123,12 @@ def generate():
               type: integer
             execution_time_ms:
               type: integer
+            engine:
+              type: string
+              description: 实际使用的生成引擎
+            seed:
+              type: integer
+              description: 使用的随机种子
       400:
         description: 参数错误
     """
@@ -91,12 +140,17 @@ def generate():
     name = data.get("name")  # 可选的生成名称
     project_id = data.get("project_id")  # 可选的项目 ID
     template_id = data.get("template_id")  # 可选的模板 ID
+    engine = data.get("engine")  # 可选的生成引擎: row / columnar
+    seed = data.get("seed")  # 可选的随机种子
+    
+    stream = _wants_stream()
+    max_count = MAX_STREAM_COUNT if stream else MAX_COUNT
     
     # 参数验证
-    if count < 1 or count > 10000:
+    if count < 1 or count > max_count:
         return jsonify({
             "success": False, 
-            "error": "count must be between 1 and 10000"
+            "error": f"count must be between 1 and {max_count}"
         }), 400
     
     if not fields:
@@ -105,8 +159,46 @@ def generate():
             "error": "fields is required"
         }), 400
     
+    if engine and engine not in data_generator_service.ENGINES:
+        return jsonify({
+            "success": False,
+            "error": f"engine must be one of {data_generator_service.ENGINES}"
+        }), 400
+    
+    seed_error = data_generator_service.validate_seed(seed)
+    if seed_error:
+        return jsonify({
+            "success": False,
+            "error": seed_error
+        }), 400
+    
+    encoding, as_file, compress_error = compression_service.resolve(
+        request.args.get('compress'), request.headers.get('Accept-Encoding')
+    )
+    if compress_error:
+        return jsonify({
+            "success": False,
+            "error": compress_error
+        }), 400
+    
+    engine = data_generator_service.resolve_engine(engine)
+    user_id = g.current_user.id if hasattr(g, 'current_user') and g.current_user else None
+    history_kwargs = dict(
+        user_id=user_id,
+        fields=fields,
+        row_count=count,
+        name=name,
+        project_id=project_id,
+        template_id=template_id,
+        seed=seed,
+        engine=engine
+    )
+    
+    if stream:
+        return _stream_generate(fields, count, engine, seed, start_time, history_kwargs, encoding, as_file)
+    
     # 生成数据
-    result = data_generator_service.generate_data(fields, count)
+    result = data_generator_service.generate_data(fields, count, engine=engine, seed=seed)
     
     # 计算执行时间和数据大小
     execution_time_ms = int((time.time() - start_time) * 1000)
@@ -114,29 +206,100 @@ def generate():
     
     # 如果用户已登录，记录历史
     history_uuid = None
-    if hasattr(g, 'current_user') and g.current_user:
-        try:
-            history = history_service.create_history(
-                user_id=g.current_user.id,
-                fields=fields,
-                row_count=count,
-                name=name,
-                project_id=project_id,
-                template_id=template_id,
-                export_format='json',
-                execution_time_ms=execution_time_ms,
-                data_size_bytes=data_size_bytes
-            )
-            history_uuid = history.uuid
-        except Exception as e:
-            # 记录历史失败不影响数据生成
-            print(f"Failed to create history: {e}")
+    if user_id:
+        history = _record_history(
+            export_format='json',
+            execution_time_ms=execution_time_ms,
+            data_size_bytes=data_size_bytes,
+            **history_kwargs
+        )
+        history_uuid = history.uuid if history else None
     
-    return jsonify({
+    response = jsonify({
         "success": True, 
         "data": result, 
         "count": len(result),
         "fields": fields,
         "history_uuid": history_uuid,
-        "execution_time_ms": execution_time_ms
+        "execution_time_ms": execution_time_ms,
+        "engine": engine,
+        "seed": seed
     })
+    response.headers['Vary'] = 'Accept-Encoding'
+    if encoding:
+        # 一次性返回的数据量有上限（MAX_COUNT），直接整体压缩
+        body = response.get_data()
+        response.set_data(b"".join(compression_service.compress_stream([body], encoding)))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+@generate_bp.route('/generate/plans', methods=['GET'])
+@login_required
+def get_plan_cache_stats():
+    """
+    获取生成计划缓存统计
+    ---
+    tags:
+      - 数据生成
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: 缓存整体命中率，以及每个计划的命中/未命中次数与编译耗时
+    """
+    return jsonify({
+        "success": True,
+        "data": data_generator_service.plan_cache_stats()
+    })
+
+
+def _stream_generate(fields, count, engine, seed, start_time, history_kwargs, encoding=None, as_file=False):
+    """
+    以 NDJSON 流式返回生成结果：分块生成、逐块序列化输出
+    首字节延迟与内存占用只取决于块大小；行数较多时使用多进程分片生成
+    数据大小（未压缩）与耗时在输出过程中累计，结束时写入历史
+    encoding 不为空时逐块压缩：as_file 为 True 时作为压缩文件下载，否则设置 Content-Encoding
+    """
+    workers = current_app.config.get('GENERATION_WORKERS')
+    # 多进程生成未指定种子时使用的种子写入历史，以便重放
+    seed = data_generator_service.resolve_seed(count, workers, seed)
+    history_kwargs['seed'] = seed
+    
+    def generate_lines():
+        data_size_bytes = 0
+        for payload in data_generator_service.iter_chunks(
+            fields, count, engine=engine, seed=seed, workers=workers, serialize=True
+        ):
+            data_size_bytes += len(payload)
+            yield payload
+        
+        if history_kwargs['user_id']:
+            _record_history(
+                export_format='ndjson',
+                execution_time_ms=int((time.time() - start_time) * 1000),
+                data_size_bytes=data_size_bytes,
+                **history_kwargs
+            )
+    
+    headers = {
+        'X-Generate-Engine': engine,
+        'X-Accel-Buffering': 'no'  # 禁用反向代理缓冲，保证逐块下发
+    }
+    if seed is not None:
+        headers['X-Generate-Seed'] = str(seed)
+    
+    body = generate_lines()
+    mimetype = NDJSON_MIMETYPE
+    if encoding:
+        # 每块同步刷新，客户端可以边接收边解压
+        body = compression_service.compress_stream(body, encoding, flush_each=True)
+        if as_file:
+            mimetype, _ = compression_service.FILE_INFO[encoding]
+            headers['Content-Disposition'] = \
+                f'attachment; filename={compression_service.file_name("generated_data.ndjson", encoding)}'
+        else:
+            headers['Content-Encoding'] = encoding
+    if not as_file:
+        headers['Vary'] = 'Accept-Encoding'
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
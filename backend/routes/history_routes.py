@@ -185,6 +185,41 @@ def get_history_by_uuid(uuid):
     return jsonify({'data': history.to_dict()})
 
 
+@history_bp.route('/<int:history_id>/replay', methods=['POST'])
+@login_required
+def replay_history(history_id):
+    """
+    按 配置 + 种子 重放历史记录，重新生成相同数据
+    ---
+    tags:
+      - 历史记录
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: history_id
+        type: integer
+        required: true
+        description: 历史记录ID
+    responses:
+      200:
+        description: 返回重新生成的数据
+      400:
+        description: 记录不可重放，或行数超过重放上限（10000）
+    """
+    user = g.current_user
+    
+    data, error = history_service.replay_history(history_id, user.id)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    return jsonify({
+        'success': True,
+        'data': data,
+        'count': len(data)
+    })
+
+
 @history_bp.route('/<int:history_id>', methods=['DELETE'])
 @login_required
 def delete_history(history_id):
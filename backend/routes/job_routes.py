@@ -0,0 +1,289 @@
+"""
+异步生成任务路由
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import time
+from flask import Blueprint, jsonify, request, g, Response, stream_with_context, send_file
+
+from middleware import login_required
+from services.data_generator_service import data_generator_service
+from services.job_service import generation_job_service
+from services.compression_service import compression_service
+
+job_bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+SSE_INTERVAL_SECONDS = 0.5  # 进度推送间隔
+
+
+@job_bp.route('', methods=['POST'])
+@login_required
+def submit_job():
+    """
+    提交异步生成任务
+    ---
+    tags:
+      - 生成任务
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - fields
+            - count
+          properties:
+            fields:
+              type: array
+              description: 字段配置列表（同 /api/generate）
+              items:
+                type: object
+            count:
+              type: integer
+              description: 生成数量（1-10000000）
+              example: 1000000
+            name:
+              type: string
+              description: 任务名称（可选）
+            project_id:
+              type: integer
+              description: 项目ID（可选）
+            template_id:
+              type: string
+              description: 模板ID（可选）
+            engine:
+              type: string
+              enum: [row, columnar]
+              default: row
+              description: 生成引擎
+            seed:
+              type: integer
+              description: 随机种子（可选）
+    responses:
+      202:
+        description: 任务已提交，返回任务状态
+      400:
+        description: 参数错误
+    """
+    data = request.get_json() or {}
+    fields = data.get('fields', [])
+    count = data.get('count')
+    engine = data.get('engine')
+    seed = data.get('seed')
+    max_rows = generation_job_service.MAX_ROWS
+
+    if not fields:
+        return jsonify({'error': 'fields is required'}), 400
+
+    if not isinstance(count, int) or isinstance(count, bool) or count < 1 or count > max_rows:
+        return jsonify({'error': f'count must be between 1 and {max_rows}'}), 400
+
+    if engine and engine not in data_generator_service.ENGINES:
+        return jsonify({'error': f'engine must be one of {data_generator_service.ENGINES}'}), 400
+
+    seed_error = data_generator_service.validate_seed(seed)
+    if seed_error:
+        return jsonify({'error': seed_error}), 400
+
+    job, error = generation_job_service.submit_job(
+        user_id=g.current_user.id,
+        fields=fields,
+        count=count,
+        engine=data_generator_service.resolve_engine(engine),
+        seed=seed,
+        name=data.get('name'),
+        project_id=data.get('project_id'),
+        template_id=data.get('template_id')
+    )
+    if error:
+        return jsonify({'error': error}), 400
+
+    return jsonify({
+        'success': True,
+        'data': generation_job_service.get_job_state(job)
+    }), 202
+
+
+@job_bp.route('/<job_uuid>', methods=['GET'])
+@login_required
+def get_job(job_uuid):
+    """
+    查询任务状态与进度
+    ---
+    tags:
+      - 生成任务
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: job_uuid
+        type: string
+        required: true
+        description: 任务UUID
+    responses:
+      200:
+        description: 返回任务状态（status 为 pending / completed / failed，rows_done 为已生成行数）
+      404:
+        description: 任务不存在
+    """
+    job = generation_job_service.get_job(job_uuid, g.current_user.id)
+    if not job:
+        return jsonify({'error': '任务不存在或无权访问'}), 404
+
+    return jsonify({'data': generation_job_service.get_job_state(job)})
+
+
+@job_bp.route('/<job_uuid>/events', methods=['GET'])
+@login_required
+def job_events(job_uuid):
+    """
+    订阅任务进度（Server-Sent Events）
+    ---
+    tags:
+      - 生成任务
+    security:
+      - Bearer: []
+    produces:
+      - text/event-stream
+    parameters:
+      - in: path
+        name: job_uuid
+        type: string
+        required: true
+        description: 任务UUID
+    responses:
+      200:
+        description: 周期推送 progress 事件，任务结束时推送 done 事件后关闭
+      404:
+        description: 任务不存在
+    """
+    job = generation_job_service.get_job(job_uuid, g.current_user.id)
+    if not job:
+        return jsonify({'error': '任务不存在或无权访问'}), 404
+
+    def events():
+        while True:
+            state = generation_job_service.get_job_state(job, refresh=True)
+            finished = state['status'] != generation_job_service.STATUS_PENDING
+            event = 'done' if finished else 'progress'
+            yield f"event: {event}\ndata: {json.dumps(state, ensure_ascii=False)}\n\n"
+            if finished:
+                break
+            time.sleep(SSE_INTERVAL_SECONDS)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@job_bp.route('/<job_uuid>/download', methods=['GET'])
+@login_required
+def download_job(job_uuid):
+    """
+    下载任务结果（NDJSON，每行一个 JSON 对象）
+    ---
+    tags:
+      - 生成任务
+    security:
+      - Bearer: []
+    produces:
+      - application/x-ndjson
+    parameters:
+      - in: path
+        name: job_uuid
+        type: string
+        required: true
+        description: 任务UUID
+      - in: query
+        name: compress
+        type: string
+        enum: [gzip, zstd]
+        required: false
+        description: 下载压缩文件（.ndjson.gz / .ndjson.zst）；不传时按 Accept-Encoding 协商传输压缩
+    responses:
+      200:
+        description: 结果文件
+      400:
+        description: 任务未完成或已失败
+      404:
+        description: 任务不存在
+    """
+    job = generation_job_service.get_job(job_uuid, g.current_user.id)
+    if not job:
+        return jsonify({'error': '任务不存在或无权访问'}), 404
+
+    path, error = generation_job_service.get_result_path(job)
+    if error:
+        return jsonify({'error': error}), 400
+
+    encoding, as_file, error = compression_service.resolve(
+        request.args.get('compress'), request.headers.get('Accept-Encoding')
+    )
+    if error:
+        return jsonify({'error': error}), 400
+
+    if encoding:
+        # 读取结果文件边读边压缩，不生成压缩副本
+        chunks = compression_service.compress_stream(compression_service.iter_file(path), encoding)
+        file_name = f'{job.uuid}.ndjson'
+        if as_file:
+            mimetype, _ = compression_service.FILE_INFO[encoding]
+            headers = {'Content-Disposition': f'attachment; filename={compression_service.file_name(file_name, encoding)}'}
+        else:
+            mimetype = 'application/x-ndjson'
+            headers = {
+                'Content-Disposition': f'attachment; filename={file_name}',
+                'Content-Encoding': encoding,
+                'Vary': 'Accept-Encoding'
+            }
+        return Response(chunks, mimetype=mimetype, headers=headers)
+
+    return send_file(
+        path,
+        mimetype='application/x-ndjson',
+        as_attachment=True,
+        download_name=f'{job.uuid}.ndjson'
+    )
+
+
+@job_bp.route('/<job_uuid>', methods=['DELETE'])
+@login_required
+def cancel_job(job_uuid):
+    """
+    取消运行中的任务，或删除已完成任务的结果文件
+    ---
+    tags:
+      - 生成任务
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: job_uuid
+        type: string
+        required: true
+        description: 任务UUID
+    responses:
+      200:
+        description: 操作成功
+      400:
+        description: 操作失败
+      404:
+        description: 任务不存在
+    """
+    job = generation_job_service.get_job(job_uuid, g.current_user.id)
+    if not job:
+        return jsonify({'error': '任务不存在或无权访问'}), 404
+
+    success, error = generation_job_service.cancel_job(job)
+    if not success:
+        return jsonify({'error': error}), 400
+
+    return jsonify({'message': '操作成功'})
@@ -5,9 +5,12 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Blueprint, request, jsonify, g
+import itertools
+from flask import Blueprint, request, jsonify, g, current_app, Response
 from middleware.auth import login_required
 from services.relation_generator_service import relation_generator_service
+from services.data_generator_service import data_generator_service
+from services.export_service import export_service
 
 relation_bp = Blueprint('relation', __name__, url_prefix='/api/relation')
 
@@ -55,18 +58,85 @@ def generate_relation_data():
                   sourceTable:
                     type: string
                     description: 源表名
-                  sourceField:
+                  sourceColumn:
                     type: string
                     description: 源字段
                   targetTable:
                     type: string
-                    description: 目标表名
-                  targetField:
+                    description: 目标表名（外键所在的表，在源表之后生成）
+                  targetColumn:
                     type: string
-                    description: 目标字段
-                  type:
+                    description: 目标字段（外键列，生成目标表时由源表的键填充）
+                  relationType:
                     type: string
-                    description: 关联类型 (one-to-one/one-to-many/many-to-many)
+                    description: >
+                      关联类型 (one-to-one/one-to-many/many-to-many/self-referencing)；
+                      多对多时 targetColumn 为目标表的键，结果中额外返回一张关联表；
+                      自引用时源表与目标表相同，sourceColumn 为节点键，targetColumn 为父节点键（根节点为空），
+                      表按树形结构生成
+                  distribution:
+                    type: object
+                    description: >
+                      一对多的分布（也可直接传类型名）。uniform 均匀抽取父行（默认）；
+                      zipf 按 {s} 的 Zipf 分布集中到少数热点父行；
+                      normal 为每个父行按 {mean, stddev} 的正态分布决定子行数；
+                      fixed 为每个父行在 {min, max} 内决定子行数。
+                      normal / fixed 时目标表行数等于子行数之和，忽略 count
+                  junctionTable:
+                    type: string
+                    description: 多对多关联表名，默认为 源表_目标表
+                  junctionSourceColumn:
+                    type: string
+                    description: 关联表中引用源表的列名，默认为 源表_源字段
+                  junctionTargetColumn:
+                    type: string
+                    description: 关联表中引用目标表的列名，默认为 目标表_目标字段
+                  minPerSource:
+                    type: integer
+                    default: 1
+                    description: 多对多时每个源行至少关联的目标行数
+                  maxPerSource:
+                    type: integer
+                    default: 3
+                    description: 多对多时每个源行最多关联的目标行数（不超过目标表行数）
+                  maxPerTarget:
+                    type: integer
+                    description: 多对多时每个目标行最多被关联的次数（可选）
+                  shape:
+                    type: string
+                    enum: [balanced, skewed]
+                    default: balanced
+                    description: 自引用时树的形状。balanced 每个节点恰好 fanout 个子节点；skewed 子节点数在 0..fanout 内偏斜分布
+                  fanout:
+                    type: integer
+                    default: 3
+                    description: 自引用时每个节点的子节点数（skewed 时为上限）
+                  depth:
+                    type: integer
+                    description: 自引用时树的最大层数（可选）；skewed 树可能因此少于 count 行
+                  skew:
+                    type: number
+                    default: 1.0
+                    description: 自引用 skewed 时子节点数分布的偏斜程度，越大叶子节点越多
+                  levelColumn:
+                    type: string
+                    description: 自引用时输出层级（根为 0）的列名（可选）
+                  pathColumn:
+                    type: string
+                    description: 自引用时输出物化路径（祖先键以 pathSeparator 连接）的列名（可选）
+                  pathSeparator:
+                    type: string
+                    default: /
+                    description: 物化路径分隔符
+                  leftColumn:
+                    type: string
+                    description: 自引用时输出嵌套集合左值的列名（可选，需与 rightColumn 同时指定）
+                  rightColumn:
+                    type: string
+                    description: 自引用时输出嵌套集合右值的列名（可选）
+            seed:
+              type: integer
+              description: 随机种子（可选），相同配置与种子生成相同数据
     responses:
       200:
         description: 生成成功
@@ -79,7 +149,7 @@ def generate_relation_data():
               type: object
               description: 生成的关联数据
       400:
-        description: 请求参数错误
+        description: 请求参数错误、关系引用的表或列不存在、表之间存在循环依赖
       500:
         description: 生成失败
     """
@@ -89,16 +159,123 @@ def generate_relation_data():
         
     tables = data.get('tables', [])
     relations = data.get('relations', [])
+    seed = data.get('seed')
     
     if not tables:
         return jsonify({'error': 'Tables definition is required'}), 400
+    
+    seed_error = data_generator_service.validate_seed(seed)
+    if seed_error:
+        return jsonify({'error': seed_error}), 400
         
     try:
-        result = relation_generator_service.generate_relation_data(tables, relations)
+        result = relation_generator_service.generate_relation_data(
+            tables, relations, seed=seed, workers=current_app.config.get('GENERATION_WORKERS')
+        )
         return jsonify({
             'success': True,
             'data': result
         })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Relation generation error: {e}")
         return jsonify({'error': str(e)}), 500
+
+
+@relation_bp.route('/export', methods=['POST'])
+@login_required
+def export_relation_data():
+    """流式生成关联数据并打包下载（每张表一个文件的 ZIP）
+    按依赖顺序逐表分块生成并直接写入 ZIP，内存中只保留被引用的键列，适合总行数很大的场景
+    ---
+    tags:
+      - 关联数据生成
+    security:
+      - BearerAuth: []
+    produces:
+      - application/zip
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          required:
+            - tables
+          properties:
+            tables:
+              type: array
+              description: 表定义列表（同 /api/relation/generate）
+              items:
+                type: object
+            relations:
+              type: array
+              description: 关联关系定义（同 /api/relation/generate）
+              items:
+                type: object
+            seed:
+              type: integer
+              description: 随机种子（可选），相同配置与种子生成的数据与 /api/relation/generate 一致
+            format:
+              type: string
+              enum: [json, jsonl, csv, sql, pg_copy, mysql_tsv, parquet, arrow]
+              default: jsonl
+              description: 每张表的文件格式
+            dialect:
+              type: string
+              enum: [mysql, postgresql, sqlite]
+              description: sql 格式的方言
+            compression:
+              type: string
+              description: parquet / arrow 格式的压缩方式
+    responses:
+      200:
+        description: ZIP 文件，包含每张表的数据文件和 manifest.json（生成顺序与行数）
+      400:
+        description: 请求参数错误、关系引用的表或列不存在、表之间存在循环依赖
+      500:
+        description: 生成失败
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+
+    tables = data.get('tables', [])
+    relations = data.get('relations', [])
+    seed = data.get('seed')
+    export_format = data.get('format') or export_service.FORMAT_JSONL
+
+    if not tables:
+        return jsonify({'error': 'Tables definition is required'}), 400
+
+    seed_error = data_generator_service.validate_seed(seed)
+    if seed_error:
+        return jsonify({'error': seed_error}), 400
+
+    format_error = export_service.validate_format(export_format, data.get('compression'))
+    if format_error:
+        return jsonify({'error': format_error}), 400
+
+    try:
+        chunks = relation_generator_service.iter_relation_archive(
+            tables, relations,
+            export_format=export_format,
+            seed=seed,
+            workers=current_app.config.get('GENERATION_WORKERS'),
+            dialect=data.get('dialect'),
+            compression=data.get('compression')
+        )
+        # 先生成第一块，导出参数错误仍可返回 400；之后边生成边发送
+        first = next(chunks)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Relation export error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+    return Response(
+        itertools.chain([first], chunks),
+        mimetype='application/zip',
+        headers={'Content-Disposition': 'attachment; filename=relation_data.zip'}
+    )
@@ -101,6 +101,21 @@ def create_task():
               type: array
             row_count:
               type: integer
+            seed:
+              type: integer
+              description: 随机种子（可选），设置后每次执行生成相同数据
+            export_format:
+              type: string
+              enum: [json, jsonl, csv, sql, pg_copy, mysql_tsv, parquet, arrow]
+              default: json
+              description: 导出格式（output_type 为 storage 时按此格式写出文件）
+            output_type:
+              type: string
+              enum: [none, webhook, storage, datasource]
+              default: none
+            output_config:
+              type: object
+              description: 输出配置；storage 输出可指定 compression（列式格式的压缩方式）与 compress（gzip / zstd，写出 .gz / .zst 压缩文件）；datasource 输出在服务端边生成边写入数据源，需指定 datasource_id，可选 table_name（默认取任务的表名）、chunk_size、transaction、create_table、columns、write_concern（MongoDB）
     responses:
       201:
         description: 创建成功
@@ -115,7 +130,7 @@ def create_task():
             expires_at = datetime.fromisoformat(data['expires_at'].replace('Z', '+00:00'))
         except:
             pass
-    task, error = scheduler_service.create_task(user_id=user.id, name=data['name'], cron_expression=data['cron_expression'], fields=data['fields'], row_count=data.get('row_count', 100), description=data.get('description'), project_id=data.get('project_id'), template_id=data.get('template_id'), export_format=data.get('export_format', 'json'), table_name=data.get('table_name'), output_type=data.get('output_type', 'none'), output_config=data.get('output_config'), timezone=data.get('timezone', 'Asia/Shanghai'), max_runs=data.get('max_runs'), expires_at=expires_at)
+    task, error = scheduler_service.create_task(user_id=user.id, name=data['name'], cron_expression=data['cron_expression'], fields=data['fields'], row_count=data.get('row_count', 100), description=data.get('description'), project_id=data.get('project_id'), template_id=data.get('template_id'), export_format=data.get('export_format', 'json'), table_name=data.get('table_name'), output_type=data.get('output_type', 'none'), output_config=data.get('output_config'), timezone=data.get('timezone', 'Asia/Shanghai'), max_runs=data.get('max_runs'), expires_at=expires_at, seed=data.get('seed'))
     if error:
         return jsonify({'error': error}), 400
     return jsonify({'message': '任务创建成功', 'data': task.to_dict()}), 201
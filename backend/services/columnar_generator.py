@@ -0,0 +1,288 @@
+"""
+列式数据生成引擎
+按字段整列生成数据（NumPy 向量化），最后一次性组装为行
+"""
+import itertools
+import re
+import time
+from typing import List, Dict, Any, Callable, Tuple
+
+import numpy as np
+
+
+def _codes(text: str) -> np.ndarray:
+    """文本转字符码数组（UCS4）"""
+    return np.array([ord(ch) for ch in text], dtype=np.uint32)
+
+
+# 字符表
+_ALNUM = _codes('abcdefghijklmnopqrstuvwxyz0123456789')
+_HEX_LOWER = _codes('0123456789abcdef')
+_HEX_UPPER = _codes('0123456789ABCDEF')
+
+
+def _ascii(text: str, n: int) -> np.ndarray:
+    """将固定文本广播为 (n, len) 的字符码矩阵（不限于 ASCII）"""
+    return np.broadcast_to(_codes(text), (n, len(text)))
+
+
+def _digits(values: np.ndarray, width: int) -> np.ndarray:
+    """将非负整数转换为定宽（左侧补零）的数字字符码矩阵"""
+    out = np.empty((len(values), width), dtype=np.uint32)
+    rest = values.astype(np.uint64 if width > 9 else np.uint32)
+    for k in range(width - 1, -1, -1):
+        rest, out[:, k] = np.divmod(rest, 10)
+    out += 48
+    return out
+
+
+def _fill_pattern(values: np.ndarray, pattern: str) -> np.ndarray:
+    """按模板填充：模板中的 'x' 依次替换为 values 的各列，其余字符原样保留"""
+    out = np.empty((len(values), len(pattern)), dtype=np.uint32)
+    out[:] = _codes(pattern)
+    col = 0
+    for run in re.finditer('x+', pattern):
+        width = run.end() - run.start()
+        out[:, run.start():run.end()] = values[:, col:col + width]
+        col += width
+    return out
+
+
+def _random_nibbles(rng: np.random.Generator, n: int, width: int) -> np.ndarray:
+    """生成 (n, width) 的随机 4 位整数矩阵（由随机字节拆分，比有界整数抽样快）"""
+    raw = np.frombuffer(rng.bytes(n * ((width + 1) // 2)), dtype=np.uint8).reshape(n, -1)
+    nibbles = np.empty((n, raw.shape[1] * 2), dtype=np.uint8)
+    nibbles[:, 0::2] = raw >> 4
+    nibbles[:, 1::2] = raw & 0x0F
+    return nibbles[:, :width]
+
+
+def _to_strings(matrix: np.ndarray) -> List[str]:
+    """将 (n, w) 的字符码矩阵转换为字符串列表（按 UCS4 直接视图，避免逐字符解码）"""
+    n, width = matrix.shape
+    if n == 0:
+        return []
+    return np.ascontiguousarray(matrix, dtype=np.uint32).view(f'U{width}').ravel().tolist()
+
+
+def _concat(*parts: np.ndarray) -> List[str]:
+    """拼接多个定宽字符码矩阵并转换为字符串列表"""
+    return _to_strings(np.hstack(parts))
+
+
+class ColumnarGenerator:
+    """
+    列式生成引擎
+
+    每个字段通过一次向量化调用生成整列：整数走批量随机数，
+    姓名/城市/公司等通过索引预计算池，手机号/银行卡/身份证等走批量数字矩阵。
+    数据源（姓名、省份等词库）复用 DataGeneratorService 的类属性，保证与逐行引擎分布一致。
+    """
+
+    def __init__(self, source):
+        self._source = source
+        self._pools: Dict[str, np.ndarray] = {}
+        self._columns = self._init_columns()
+
+    # ------------------------------------------------------------------
+    # 预计算池
+    # ------------------------------------------------------------------
+
+    def _pool(self, key: str, values: List[str]) -> np.ndarray:
+        """获取（并缓存）对象数组形式的词库"""
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = np.array(values, dtype=object)
+            self._pools[key] = pool
+        return pool
+
+    def _product_pool(self, key: str, *sources: List[str]) -> np.ndarray:
+        """多个词库的笛卡尔积拼接池，一次索引即可得到组合结果"""
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = np.array([''.join(p) for p in itertools.product(*sources)], dtype=object)
+            self._pools[key] = pool
+        return pool
+
+    def _fixed_pool(self, values: List[str], n: int, rng: np.random.Generator) -> np.ndarray:
+        """从等长词库中抽样，返回 (n, w) 字符码矩阵"""
+        table = np.array([_codes(v) for v in values], dtype=np.uint32)
+        return table[rng.integers(0, len(values), n)]
+
+    @staticmethod
+    def _choice(pool: np.ndarray, n: int, rng: np.random.Generator) -> List[Any]:
+        return pool[rng.integers(0, len(pool), n)].tolist()
+
+    # ------------------------------------------------------------------
+    # 列生成器
+    # ------------------------------------------------------------------
+
+    def _init_columns(self) -> Dict[str, Callable[[np.random.Generator, int], List[Any]]]:
+        """初始化列生成器映射，签名为 (rng, n) -> list"""
+        s = self._source
+        return {
+            "uuid": self._uuid,
+            "chineseName": lambda rng, n: self._choice(self._product_pool("chineseName", s.SURNAMES, s.GIVEN_NAMES), n, rng),
+            "englishName": lambda rng, n: self._choice(self._product_pool("englishName", s.ENGLISH_FIRST_NAMES, [" "], s.ENGLISH_LAST_NAMES), n, rng),
+            "email": self._email,
+            "chinesePhone": lambda rng, n: _concat(self._fixed_pool(s.PHONE_PREFIXES, n, rng), _digits(rng.integers(10000000, 100000000, n), 8)),
+            "phone": lambda rng, n: _concat(
+                _ascii("+1 ", n), _digits(rng.integers(200, 1000, n), 3),
+                _ascii("-", n), _digits(rng.integers(100, 1000, n), 3),
+                _ascii("-", n), _digits(rng.integers(1000, 10000, n), 4),
+            ),
+            "chineseIdCard": lambda rng, n: _concat(
+                self._fixed_pool(s.AREA_CODES, n, rng),
+                _digits(rng.integers(1970, 2006, n), 4),
+                _digits(rng.integers(1, 13, n), 2),
+                _digits(rng.integers(1, 29, n), 2),
+                _digits(rng.integers(100, 1000, n), 3),
+                _digits(rng.integers(0, 10, n), 1),
+            ),
+            "age": lambda rng, n: rng.integers(18, 66, n).tolist(),
+            "gender": lambda rng, n: self._choice(self._pool("gender", s.GENDERS), n, rng),
+            "number": lambda rng, n: rng.integers(1, 100001, n).tolist(),
+            "string": lambda rng, n: _to_strings(_ALNUM[rng.integers(0, len(_ALNUM), (n, 10))]),
+            "boolean": lambda rng, n: (rng.integers(0, 2, n) == 1).tolist(),
+            "date": lambda rng, n: _concat(
+                _digits(rng.integers(2020, 2025, n), 4), _ascii("-", n),
+                _digits(rng.integers(1, 13, n), 2), _ascii("-", n),
+                _digits(rng.integers(1, 29, n), 2),
+            ),
+            "datetime": lambda rng, n: _concat(
+                _digits(rng.integers(2020, 2025, n), 4), _ascii("-", n),
+                _digits(rng.integers(1, 13, n), 2), _ascii("-", n),
+                _digits(rng.integers(1, 29, n), 2), _ascii(" ", n),
+                _digits(rng.integers(0, 24, n), 2), _ascii(":", n),
+                _digits(rng.integers(0, 60, n), 2), _ascii(":", n),
+                _digits(rng.integers(0, 60, n), 2),
+            ),
+            "chineseAddress": self._chinese_address,
+            "province": lambda rng, n: self._choice(self._pool("province", s.PROVINCES), n, rng),
+            "city": lambda rng, n: self._choice(self._pool("city", s.CITIES), n, rng),
+            "zipcode": lambda rng, n: _to_strings(_digits(rng.integers(100000, 1000000, n), 6)),
+            "url": lambda rng, n: self._choice(self._product_pool(
+                "url", ["https://"], ['example', 'test', 'demo'], ["."], ['com', 'net', 'org'], ["/"], ['api', 'user', 'data']
+            ), n, rng),
+            "ip": self._ip,
+            "ipv6": self._ipv6,
+            "mac": self._mac,
+            "domain": lambda rng, n: self._choice(self._product_pool(
+                "domain", ['example', 'test', 'demo', 'sample'], ["."], ['com', 'net', 'org', 'io', 'cn']
+            ), n, rng),
+            "bankCard": lambda rng, n: _concat(
+                self._fixed_pool(["6222", "6227", "6228", "9558", "6216"], n, rng),
+                rng.integers(48, 58, (n, 12), dtype=np.uint32),
+            ),
+            "amount": self._amount,
+            "company": lambda rng, n: self._choice(self._product_pool(
+                "company", s.COMPANY_PREFIXES, s.COMPANY_PREFIXES, s.COMPANY_SUFFIXES
+            ), n, rng),
+            "jobTitle": lambda rng, n: self._choice(self._pool("jobTitle", s.JOB_TITLES), n, rng),
+            "paragraph": self._paragraph,
+            "sentence": lambda rng, n: self._choice(self._pool("sentence", s.SENTENCES), n, rng),
+            "word": lambda rng, n: self._choice(self._pool("word", s.WORDS), n, rng),
+        }
+
+    def _uuid(self, rng: np.random.Generator, n: int) -> List[str]:
+        """批量生成 UUID v4 字符串"""
+        nibbles = _random_nibbles(rng, n, 32)
+        nibbles[:, 12] = 4  # version 4
+        nibbles[:, 16] = (nibbles[:, 16] & 0x3) | 0x8  # RFC 4122 variant
+        return _to_strings(_fill_pattern(_HEX_LOWER[nibbles], "xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx"))
+
+    def _email(self, rng: np.random.Generator, n: int) -> List[str]:
+        local = _to_strings(_ALNUM[rng.integers(0, len(_ALNUM), (n, 8))])
+        domains = self._choice(self._pool("email_domain", ["@" + d for d in self._source.EMAIL_DOMAINS]), n, rng)
+        return list(map(str.__add__, local, domains))
+
+    def _timestamp(self, rng: np.random.Generator, n: int, reference_ms: int = None) -> List[str]:
+        now_ms = reference_ms or int(time.time() * 1000)
+        values = now_ms - rng.integers(0, 366, n) * 86400000
+        return _to_strings(_digits(values, len(str(now_ms))))
+
+    def _chinese_address(self, rng: np.random.Generator, n: int) -> List[str]:
+        s = self._source
+        prefix = self._choice(self._product_pool("address_prefix", s.PROVINCES, s.CITIES, s.DISTRICTS, s.STREETS), n, rng)
+        suffix = self._choice(self._pool("address_suffix", [f"{i}号" for i in range(1, 1000)]), n, rng)
+        return list(map(str.__add__, prefix, suffix))
+
+    def _ip(self, rng: np.random.Generator, n: int) -> List[str]:
+        octets = self._pool("octet", [str(i) for i in range(256)])
+        parts = (
+            octets[rng.integers(1, 256, n)].tolist(),
+            octets[rng.integers(0, 256, n)].tolist(),
+            octets[rng.integers(0, 256, n)].tolist(),
+            octets[rng.integers(1, 255, n)].tolist(),
+        )
+        return list(map('.'.join, zip(*parts)))
+
+    def _ipv6(self, rng: np.random.Generator, n: int) -> List[str]:
+        hexed = _HEX_LOWER[_random_nibbles(rng, n, 32)]
+        return _to_strings(_fill_pattern(hexed, ":".join(["xxxx"] * 8)))
+
+    def _mac(self, rng: np.random.Generator, n: int) -> List[str]:
+        hexed = _HEX_UPPER[_random_nibbles(rng, n, 12)]
+        return _to_strings(_fill_pattern(hexed, ":".join(["xx"] * 6)))
+
+    def _amount(self, rng: np.random.Generator, n: int) -> List[str]:
+        """金额：按整数部分位数分组，每组走定宽字符码矩阵"""
+        cents = np.rint((rng.integers(100, 100000, n) + rng.random(n)) * 100).astype(np.int64)
+        yuan, fen = np.divmod(cents, 100)
+        result = np.empty(n, dtype=object)
+        for width in range(3, 7):
+            mask = (yuan >= 10 ** (width - 1)) & (yuan < 10 ** width)
+            size = int(mask.sum())
+            if size:
+                result[mask] = _concat(
+                    _ascii("¥", size), _digits(yuan[mask], width), _ascii(".", size), _digits(fen[mask], 2)
+                )
+        return result.tolist()
+
+    def _paragraph(self, rng: np.random.Generator, n: int) -> List[str]:
+        """段落：3-5 个句子，按句子数分段的笛卡尔积池中均匀抽样"""
+        sentences = self._source.SENTENCES
+        pool = self._pools.get("paragraph")
+        if pool is None:
+            pool = np.array(
+                [''.join(p) for k in (3, 4, 5) for p in itertools.product(sentences, repeat=k)],
+                dtype=object,
+            )
+            self._pools["paragraph"] = pool
+        base = len(sentences)
+        k = rng.integers(3, 6, n)
+        offsets = np.select([k == 3, k == 4], [0, base ** 3], base ** 3 + base ** 4)
+        index = offsets + (rng.random(n) * base ** k).astype(np.int64)
+        return pool[index].tolist()
+
+    # ------------------------------------------------------------------
+    # 生成入口
+    # ------------------------------------------------------------------
+
+    def generate_column(
+        self,
+        data_type: str,
+        count: int,
+        rng: np.random.Generator,
+        reference_ms: int = None
+    ) -> List[Any]:
+        """生成一整列数据，未知类型返回空字符串列；reference_ms 为时间类字段的参考时间"""
+        if data_type == "timestamp":
+            return self._timestamp(rng, count, reference_ms)
+        column = self._columns.get(data_type)
+        if column is None:
+            return [""] * count
+        return column(rng, count)
+
+    def prepare(self, data_type: str):
+        """预先构建该类型用到的取值池，避免首次生成时再分配"""
+        if data_type in self._columns or data_type == "timestamp":
+            self.generate_column(data_type, 1, np.random.default_rng(0))
+
+    def generate_rows(self, plan, count: int, rng: np.random.Generator = None) -> List[Dict[str, Any]]:
+        """按生成计划逐列生成后一次性组装为行，字段顺序与配置一致"""
+        if count <= 0:
+            return []
+        rng = rng or np.random.default_rng()
+        columns = [self.generate_column(data_type, count, rng) for data_type in plan.types]
+        return plan.assemble_rows(columns, count)
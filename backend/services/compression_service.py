@@ -0,0 +1,154 @@
+"""
+压缩服务
+对流式输出的字节块进行边生成边压缩（gzip / zstd），不在内存中保留完整的压缩结果；
+支持按 Accept-Encoding 协商（Content-Encoding 传输压缩）和显式指定（.gz / .zst 压缩文件下载）
+"""
+import zlib
+from typing import Iterable, Iterator, Optional, List, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class CompressionService:
+    """流式压缩服务"""
+
+    GZIP = "gzip"
+    ZSTD = "zstd"
+    ENCODINGS = [GZIP, ZSTD]
+
+    # 编码 -> (压缩文件 MIME 类型, 文件扩展名)
+    FILE_INFO = {
+        GZIP: ("application/gzip", "gz"),
+        ZSTD: ("application/zstd", "zst"),
+    }
+
+    GZIP_LEVEL = 6
+    ZSTD_LEVEL = 3
+    FILE_READ_SIZE = 1024 * 1024  # 压缩已有文件时每次读取的字节数
+
+    def is_available(self, encoding: str) -> bool:
+        """编码是否可用（zstd 需要安装 zstandard）"""
+        if encoding == self.GZIP:
+            return True
+        if encoding == self.ZSTD:
+            return zstandard is not None
+        return False
+
+    def validate_encoding(self, encoding: Optional[str]) -> Optional[str]:
+        """校验显式指定的压缩方式，合法（或未指定）返回 None，否则返回错误信息"""
+        if not encoding:
+            return None
+        if encoding not in self.ENCODINGS:
+            return f"compress must be one of {self.ENCODINGS}"
+        if not self.is_available(encoding):
+            return "未安装 zstandard 库"
+        return None
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """
+        按 Accept-Encoding 选择传输压缩方式：权重最高者优先，同权重时 zstd 优先于 gzip
+        未声明或不支持任何可用编码时返回 None（不压缩）
+        """
+        if not accept_encoding:
+            return None
+
+        weights = {}
+        for item in accept_encoding.split(","):
+            parts = [p.strip() for p in item.split(";")]
+            coding = parts[0].lower()
+            quality = 1.0
+            for param in parts[1:]:
+                if param.startswith("q="):
+                    try:
+                        quality = float(param[2:])
+                    except ValueError:
+                        quality = 0.0
+            if coding == "*":
+                for encoding in self.ENCODINGS:
+                    weights.setdefault(encoding, quality)
+            elif coding in self.ENCODINGS:
+                weights[coding] = quality
+
+        candidates = [
+            (quality, encoding == self.ZSTD, encoding)
+            for encoding, quality in weights.items()
+            if quality > 0 and self.is_available(encoding)
+        ]
+        if not candidates:
+            return None
+        return max(candidates)[2]
+
+    def resolve(
+        self,
+        explicit: Optional[str],
+        accept_encoding: Optional[str],
+        negotiable: bool = True
+    ) -> Tuple[Optional[str], bool, Optional[str]]:
+        """
+        确定响应的压缩方式
+        - explicit: 显式指定时下载压缩文件（.gz / .zst），不设置 Content-Encoding
+        - 否则按 Accept-Encoding 协商传输压缩；negotiable 为 False（如本身已压缩的列式格式）时不协商
+        返回: (压缩方式, 是否作为压缩文件下载, 错误信息)
+        """
+        if explicit:
+            error = self.validate_encoding(explicit)
+            if error:
+                return None, False, error
+            return explicit, True, None
+        if not negotiable:
+            return None, False, None
+        return self.negotiate(accept_encoding), False, None
+
+    def compress_stream(
+        self,
+        chunks: Iterable[bytes],
+        encoding: str,
+        flush_each: bool = False
+    ) -> Iterator[bytes]:
+        """
+        流式压缩字节块
+        flush_each 为 True 时每个输入块后做一次同步刷新，客户端可以逐块解压（适合 NDJSON 流），
+        否则由压缩器自行缓冲，压缩率更高
+        """
+        if encoding == self.GZIP:
+            compressor = zlib.compressobj(self.GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            sync_flush, finish = zlib.Z_SYNC_FLUSH, zlib.Z_FINISH
+        elif encoding == self.ZSTD:
+            if zstandard is None:
+                raise ImportError("未安装 zstandard 库")
+            compressor = zstandard.ZstdCompressor(level=self.ZSTD_LEVEL).compressobj()
+            sync_flush, finish = zstandard.COMPRESSOBJ_FLUSH_BLOCK, zstandard.COMPRESSOBJ_FLUSH_FINISH
+        else:
+            raise ValueError(f"不支持的压缩方式: {encoding}")
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+            data = compressor.compress(chunk)
+            if flush_each:
+                data += compressor.flush(sync_flush)
+            if data:
+                yield data
+        yield compressor.flush(finish)
+
+    def iter_file(self, path: str) -> Iterator[bytes]:
+        """分块读取文件，供 compress_stream 压缩已落盘的结果"""
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(self.FILE_READ_SIZE)
+                if not block:
+                    break
+                yield block
+
+    def file_name(self, file_name: str, encoding: Optional[str]) -> str:
+        """压缩文件名：generated_data.csv -> generated_data.csv.gz"""
+        if not encoding:
+            return file_name
+        return f"{file_name}.{self.FILE_INFO[encoding][1]}"
+
+
+# 单例实例
+compression_service = CompressionService()
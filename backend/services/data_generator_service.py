@@ -3,10 +3,32 @@
 负责根据字段配置生成模拟数据
 """
 import random
+import secrets
+import json
+import hashlib
+import threading
 import uuid as uuid_lib
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
-from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .generation_plan import GenerationPlan, PlanCache
+
+try:
+    import numpy as np
+    from .columnar_generator import ColumnarGenerator
+except ImportError:  # 未安装 numpy 时仅支持逐行引擎
+    np = None
+    ColumnarGenerator = None
+
+# 种子取值上限（63 位，便于存入数据库 BIGINT）
+MAX_SEED = 2 ** 63 - 1
+
+
+def rows_to_ndjson(rows: List[Dict[str, Any]]) -> bytes:
+    """将行数据序列化为 NDJSON 字节（每行一个 JSON 对象）"""
+    return ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows).encode('utf-8')
 
 
 class DataGeneratorService:
@@ -31,67 +53,318 @@ class DataGeneratorService:
     PHONE_PREFIXES = ["138", "139", "150", "151", "152", "158", "159", "186", "187", "188"]
     AREA_CODES = ["110101", "310101", "440106", "330102", "320102"]
 
+    # 生成引擎
+    ENGINE_ROW = "row"  # 逐行逐字段调用生成器
+    ENGINE_COLUMNAR = "columnar"  # 按列向量化生成（需要 numpy）
+    ENGINES = [ENGINE_ROW, ENGINE_COLUMNAR]
+
+    # 带种子生成时的分片块大小：每个字段、每个块使用独立随机数流
+    SHARD_BLOCK_SIZE = 4096
+    # 带种子生成时时间类字段的固定参考时间（2025-01-01T00:00:00Z）
+    SEED_REFERENCE_MS = 1735689600000
+
+    # 多进程分片生成：每个分片包含若干个完整的分片块
+    PARALLEL_SHARD_BLOCKS = 16
+    # 低于该行数时进程间传输开销大于并行收益，仍在当前进程生成
+    PARALLEL_MIN_ROWS = 50000
+
+    # 生成计划缓存容量（按字段配置哈希）
+    PLAN_CACHE_SIZE = 128
+
     def __init__(self):
         self._generators = self._init_generators()
+        self._columnar = ColumnarGenerator(self) if ColumnarGenerator else None
+        self._plans = PlanCache(self._compile_plan, max_size=self.PLAN_CACHE_SIZE)
+        self._process_pools: Dict[int, ProcessPoolExecutor] = {}
+        self._process_pool_lock = threading.Lock()
+
+    @property
+    def columnar_available(self) -> bool:
+        """列式引擎是否可用"""
+        return self._columnar is not None
+
+    def resolve_engine(self, engine: str = None) -> str:
+        """解析实际使用的引擎，列式引擎不可用时回退为逐行引擎"""
+        if engine == self.ENGINE_COLUMNAR and self.columnar_available:
+            return self.ENGINE_COLUMNAR
+        return self.ENGINE_ROW
 
     def _init_generators(self) -> Dict[str, callable]:
-        """初始化生成器映射"""
+        """初始化生成器映射，生成器签名为 (r) -> value，r 为 random 模块或 random.Random 实例"""
         return {
-            "uuid": lambda: str(uuid_lib.uuid4()),
-            "chineseName": lambda: random.choice(self.SURNAMES) + random.choice(self.GIVEN_NAMES),
-            "englishName": lambda: f"{random.choice(self.ENGLISH_FIRST_NAMES)} {random.choice(self.ENGLISH_LAST_NAMES)}",
-            "email": lambda: f"{''.join(random.choices('abcdefghijklmnopqrstuvwxyz0123456789', k=8))}@{random.choice(self.EMAIL_DOMAINS)}",
-            "chinesePhone": lambda: random.choice(self.PHONE_PREFIXES) + str(random.randint(10000000, 99999999)),
-            "phone": lambda: f"+1 {random.randint(200, 999)}-{random.randint(100, 999)}-{random.randint(1000, 9999)}",
-            "chineseIdCard": lambda: f"{random.choice(self.AREA_CODES)}{random.randint(1970, 2005)}{str(random.randint(1, 12)).zfill(2)}{str(random.randint(1, 28)).zfill(2)}{random.randint(100, 999)}{random.randint(0, 9)}",
-            "age": lambda: random.randint(18, 65),
-            "gender": lambda: random.choice(self.GENDERS),
-            "number": lambda: random.randint(1, 100000),
-            "string": lambda: ''.join(random.choices('abcdefghijklmnopqrstuvwxyz0123456789', k=10)),
-            "boolean": lambda: random.choice([True, False]),
-            "date": lambda: f"{random.randint(2020, 2024)}-{str(random.randint(1, 12)).zfill(2)}-{str(random.randint(1, 28)).zfill(2)}",
-            "datetime": lambda: f"{random.randint(2020, 2024)}-{str(random.randint(1, 12)).zfill(2)}-{str(random.randint(1, 28)).zfill(2)} {str(random.randint(0, 23)).zfill(2)}:{str(random.randint(0, 59)).zfill(2)}:{str(random.randint(0, 59)).zfill(2)}",
-            "timestamp": lambda: str(int((datetime.now() - timedelta(days=random.randint(0, 365))).timestamp() * 1000)),
-            "chineseAddress": lambda: f"{random.choice(self.PROVINCES)}{random.choice(self.CITIES)}{random.choice(self.DISTRICTS)}{random.choice(self.STREETS)}{random.randint(1, 999)}号",
-            "province": lambda: random.choice(self.PROVINCES),
-            "city": lambda: random.choice(self.CITIES),
-            "zipcode": lambda: str(random.randint(100000, 999999)),
-            "url": lambda: f"https://{random.choice(['example', 'test', 'demo'])}.{random.choice(['com', 'net', 'org'])}/{random.choice(['api', 'user', 'data'])}",
-            "ip": lambda: f"{random.randint(1, 255)}.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}",
-            "ipv6": lambda: ":".join([f"{random.randint(0, 65535):04x}" for _ in range(8)]),
-            "mac": lambda: ":".join([f"{random.randint(0, 255):02X}" for _ in range(6)]),
-            "domain": lambda: f"{random.choice(['example', 'test', 'demo', 'sample'])}.{random.choice(['com', 'net', 'org', 'io', 'cn'])}",
-            "bankCard": lambda: random.choice(["6222", "6227", "6228", "9558", "6216"]) + ''.join([str(random.randint(0, 9)) for _ in range(12)]),
-            "amount": lambda: f"¥{random.randint(100, 99999) + random.random():.2f}",
-            "company": lambda: random.choice(self.COMPANY_PREFIXES) + random.choice(self.COMPANY_PREFIXES) + random.choice(self.COMPANY_SUFFIXES),
-            "jobTitle": lambda: random.choice(self.JOB_TITLES),
-            "paragraph": lambda: "".join([random.choice(self.SENTENCES) for _ in range(random.randint(3, 5))]),
-            "sentence": lambda: random.choice(self.SENTENCES),
-            "word": lambda: random.choice(self.WORDS),
+            "uuid": lambda r: str(uuid_lib.uuid4()) if r is random else str(uuid_lib.UUID(int=r.getrandbits(128), version=4)),
+            "chineseName": lambda r: r.choice(self.SURNAMES) + r.choice(self.GIVEN_NAMES),
+            "englishName": lambda r: f"{r.choice(self.ENGLISH_FIRST_NAMES)} {r.choice(self.ENGLISH_LAST_NAMES)}",
+            "email": lambda r: f"{''.join(r.choices('abcdefghijklmnopqrstuvwxyz0123456789', k=8))}@{r.choice(self.EMAIL_DOMAINS)}",
+            "chinesePhone": lambda r: r.choice(self.PHONE_PREFIXES) + str(r.randint(10000000, 99999999)),
+            "phone": lambda r: f"+1 {r.randint(200, 999)}-{r.randint(100, 999)}-{r.randint(1000, 9999)}",
+            "chineseIdCard": lambda r: f"{r.choice(self.AREA_CODES)}{r.randint(1970, 2005)}{str(r.randint(1, 12)).zfill(2)}{str(r.randint(1, 28)).zfill(2)}{r.randint(100, 999)}{r.randint(0, 9)}",
+            "age": lambda r: r.randint(18, 65),
+            "gender": lambda r: r.choice(self.GENDERS),
+            "number": lambda r: r.randint(1, 100000),
+            "string": lambda r: ''.join(r.choices('abcdefghijklmnopqrstuvwxyz0123456789', k=10)),
+            "boolean": lambda r: r.choice([True, False]),
+            "date": lambda r: f"{r.randint(2020, 2024)}-{str(r.randint(1, 12)).zfill(2)}-{str(r.randint(1, 28)).zfill(2)}",
+            "datetime": lambda r: f"{r.randint(2020, 2024)}-{str(r.randint(1, 12)).zfill(2)}-{str(r.randint(1, 28)).zfill(2)} {str(r.randint(0, 23)).zfill(2)}:{str(r.randint(0, 59)).zfill(2)}:{str(r.randint(0, 59)).zfill(2)}",
+            "timestamp": lambda r: str(int((datetime.now() - timedelta(days=r.randint(0, 365))).timestamp() * 1000)) if r is random else str(self.SEED_REFERENCE_MS - r.randint(0, 365) * 86400000),
+            "chineseAddress": lambda r: f"{r.choice(self.PROVINCES)}{r.choice(self.CITIES)}{r.choice(self.DISTRICTS)}{r.choice(self.STREETS)}{r.randint(1, 999)}号",
+            "province": lambda r: r.choice(self.PROVINCES),
+            "city": lambda r: r.choice(self.CITIES),
+            "zipcode": lambda r: str(r.randint(100000, 999999)),
+            "url": lambda r: f"https://{r.choice(['example', 'test', 'demo'])}.{r.choice(['com', 'net', 'org'])}/{r.choice(['api', 'user', 'data'])}",
+            "ip": lambda r: f"{r.randint(1, 255)}.{r.randint(0, 255)}.{r.randint(0, 255)}.{r.randint(1, 254)}",
+            "ipv6": lambda r: ":".join([f"{r.randint(0, 65535):04x}" for _ in range(8)]),
+            "mac": lambda r: ":".join([f"{r.randint(0, 255):02X}" for _ in range(6)]),
+            "domain": lambda r: f"{r.choice(['example', 'test', 'demo', 'sample'])}.{r.choice(['com', 'net', 'org', 'io', 'cn'])}",
+            "bankCard": lambda r: r.choice(["6222", "6227", "6228", "9558", "6216"]) + ''.join([str(r.randint(0, 9)) for _ in range(12)]),
+            "amount": lambda r: f"¥{r.randint(100, 99999) + r.random():.2f}",
+            "company": lambda r: r.choice(self.COMPANY_PREFIXES) + r.choice(self.COMPANY_PREFIXES) + r.choice(self.COMPANY_SUFFIXES),
+            "jobTitle": lambda r: r.choice(self.JOB_TITLES),
+            "paragraph": lambda r: "".join([r.choice(self.SENTENCES) for _ in range(r.randint(3, 5))]),
+            "sentence": lambda r: r.choice(self.SENTENCES),
+            "word": lambda r: r.choice(self.WORDS),
         }
 
-    def generate_value(self, data_type: str) -> Any:
-        """根据类型生成单个随机值"""
+    def generate_value(self, data_type: str, rng=None) -> Any:
+        """根据类型生成单个随机值，rng 为空时使用全局 random"""
         generator = self._generators.get(data_type)
-        return generator() if generator else ""
+        return generator(rng or random) if generator else ""
+
+    # ------------------------------------------------------------------
+    # 种子与分片
+    # ------------------------------------------------------------------
+
+    def new_seed(self) -> int:
+        """生成一个新的随机种子"""
+        return secrets.randbits(63)
 
-    def generate_data(self, fields: List[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    @staticmethod
+    def validate_seed(seed: Any) -> Optional[str]:
+        """校验种子，合法返回 None，否则返回错误信息"""
+        if seed is None:
+            return None
+        if isinstance(seed, bool) or not isinstance(seed, int) or not (0 <= seed <= MAX_SEED):
+            return f"seed must be an integer between 0 and {MAX_SEED}"
+        return None
+
+    @staticmethod
+    def derive_seed(seed: int, *keys: Any) -> int:
+        """由主种子和任意键派生独立的子种子（跨进程稳定）"""
+        material = ":".join(str(k) for k in (seed,) + keys).encode("utf-8")
+        return int.from_bytes(hashlib.blake2b(material, digest_size=8).digest(), "big") & MAX_SEED
+
+    def _iter_blocks(self, start: int, count: int):
+        """将行区间 [start, start+count) 切分为固定分片块，返回 (块号, 块内起始, 块内结束)"""
+        size = self.SHARD_BLOCK_SIZE
+        end = start + count
+        block = start // size
+        while block * size < end:
+            block_start = block * size
+            yield block, max(start - block_start, 0), min(end - block_start, size)
+            block += 1
+
+    # ------------------------------------------------------------------
+    # 生成计划
+    # ------------------------------------------------------------------
+
+    def _compile_plan(self, key: str, field_specs: List[Tuple[str, str]]) -> GenerationPlan:
+        """将字段配置编译为生成计划：解析生成器、构造融合行函数、预分配列式取值池"""
+        empty = lambda r: ""
+        generators = [self._generators.get(data_type) or empty for _, data_type in field_specs]
+        if self._columnar:
+            for data_type in {data_type for _, data_type in field_specs}:
+                self._columnar.prepare(data_type)
+        return GenerationPlan(key, field_specs, generators)
+
+    def get_plan(self, fields: List[Dict[str, Any]]) -> GenerationPlan:
+        """获取字段配置对应的生成计划（命中缓存时直接复用）"""
+        return self._plans.get(fields)
+
+    def plan_cache_stats(self) -> Dict[str, Any]:
+        """生成计划缓存的命中统计"""
+        return self._plans.stats()
+
+    def _generate_seeded(
+        self,
+        plan: GenerationPlan,
+        start: int,
+        count: int,
+        engine: str,
+        seed: int
+    ) -> List[Dict[str, Any]]:
+        """
+        带种子生成：每个字段、每个分片块使用独立的随机数流
+        第 N 行的值只取决于 (seed, 字段序号, N 所在块)，与一次生成还是分段生成无关
+        """
+        columns = [[] for _ in plan.field_specs]
+        for block, lo, hi in self._iter_blocks(start, count):
+            for index, data_type in enumerate(plan.types):
+                stream_seed = self.derive_seed(seed, engine, index, block)
+                if engine == self.ENGINE_COLUMNAR:
+                    # 列式生成每次调用会消耗多段随机数，必须整块生成才能保证可复现
+                    values = self._columnar.generate_column(
+                        data_type, self.SHARD_BLOCK_SIZE, np.random.default_rng(stream_seed),
+                        reference_ms=self.SEED_REFERENCE_MS
+                    )
+                    columns[index].extend(values[lo:hi])
+                else:
+                    # 逐行生成顺序消耗随机数流，只需生成到块内结束位置
+                    r = random.Random(stream_seed)
+                    generator = plan.generators[index]
+                    columns[index].extend([generator(r) for _ in range(hi)][lo:])
+        return plan.assemble_rows(columns, count)
+
+    def generate_data(
+        self,
+        fields: List[Dict[str, Any]],
+        count: int,
+        engine: str = None,
+        seed: int = None,
+        start: int = 0
+    ) -> List[Dict[str, Any]]:
         """
         生成模拟数据
         确保字段顺序与输入顺序一致
+        engine: row（默认）或 columnar
+        seed: 随机种子，指定后结果可复现；start 为起始行号，用于分段生成同一数据集
+        相同字段配置复用缓存的生成计划
         """
-        result = []
-        # 提取字段名和类型的有序列表
-        field_specs = [(f.get("name", ""), f.get("type", "string")) for f in fields]
+        plan = self._plans.get(fields)
+        engine = self.resolve_engine(engine)
+        
+        if seed is not None:
+            return self._generate_seeded(plan, start, count, engine, seed)
         
-        for _ in range(count):
-            # 按顺序生成每个字段的值
-            record = {}
-            for field_name, field_type in field_specs:
-                record[field_name] = self.generate_value(field_type)
-            result.append(record)
+        if engine == self.ENGINE_COLUMNAR:
+            return self._columnar.generate_rows(plan, count)
+        
+        return plan.generate_rows(count, random)
+
+    def iter_chunks(
+        self,
+        fields: List[Dict[str, Any]],
+        count: int,
+        engine: str = None,
+        seed: int = None,
+        chunk_size: int = None,
+        workers: int = None,
+        serialize: bool = False,
+        start: int = 0
+    ) -> Iterator[Any]:
+        """
+        分块生成模拟数据，按行顺序逐块产出
+        内存占用只与块大小有关；带种子时结果与一次性生成完全一致
+        workers > 1 且行数足够多时使用多进程分片生成
+        serialize 为 True 时产出 NDJSON 字节而非行列表
+        start 为起始行号：只生成 [start, count) 的行，带种子时与完整结果的对应部分一致（用于断点续写）
+        """
+        if self._use_processes(count - start, workers):
+            yield from self._iter_shards(fields, count, engine, seed, workers, serialize, start)
+            return
+        
+        chunk_size = chunk_size or self.SHARD_BLOCK_SIZE
+        while start < count:
+            size = min(chunk_size, count - start)
+            rows = self.generate_data(fields, size, engine=engine, seed=seed, start=start)
+            yield rows_to_ndjson(rows) if serialize else rows
+            start += size
+
+    def generate_parallel(
+        self,
+        fields: List[Dict[str, Any]],
+        count: int,
+        engine: str = None,
+        seed: int = None,
+        workers: int = None
+    ) -> List[Dict[str, Any]]:
+        """
+        多进程分片生成并按顺序合并结果
+        行数不足 PARALLEL_MIN_ROWS 或 workers <= 1 时等同于 generate_data
+        """
+        if not self._use_processes(count, workers):
+            return self.generate_data(fields, count, engine=engine, seed=seed)
+        
+        result = []
+        for rows in self._iter_shards(fields, count, engine, seed, workers, False):
+            result.extend(rows)
         return result
 
+    # ------------------------------------------------------------------
+    # 多进程分片
+    # ------------------------------------------------------------------
+
+    def _use_processes(self, count: int, workers: Optional[int]) -> bool:
+        """是否使用多进程生成"""
+        return bool(workers) and workers > 1 and count >= self.PARALLEL_MIN_ROWS
+
+    def resolve_seed(self, count: int, workers: Optional[int], seed: Optional[int] = None) -> Optional[int]:
+        """
+        实际使用的种子：多进程分片生成时各分片的随机数流由种子派生，未指定种子时在此生成一个，
+        调用方将其记录到历史，结果仍可重放；单进程生成时原样返回
+        """
+        if seed is None and self._use_processes(count, workers):
+            return self.new_seed()
+        return seed
+
+    def _get_process_pool(self, workers: int) -> ProcessPoolExecutor:
+        """
+        获取（按需创建）常驻进程池，避免每次生成都重新启动进程
+        每种进程数各保留一个池，不关闭可能仍有其他请求在使用的池
+        """
+        with self._process_pool_lock:
+            pool = self._process_pools.get(workers)
+            if pool is None:
+                pool = self._process_pools[workers] = ProcessPoolExecutor(max_workers=workers)
+            return pool
+
+    def _iter_shards(
+        self,
+        fields: List[Dict[str, Any]],
+        count: int,
+        engine: str,
+        seed: Optional[int],
+        workers: int,
+        serialize: bool,
+        first_row: int = 0
+    ) -> Iterator[Any]:
+        """
+        将行区间切分为对齐分片块的分片，由进程池并行生成，按顺序产出
+        每个分片只依赖 (seed, 起始行)，因此结果与单进程带种子生成完全一致；
+        未指定种子时使用一次性随机种子（需要重放的调用方应先通过 resolve_seed 取得并记录种子）。同时在途的分片数有上限，内存占用与总行数无关
+        """
+        engine = self.resolve_engine(engine)
+        if seed is None:
+            seed = self.new_seed()
+        
+        pool = self._get_process_pool(workers)
+        shard_size = self.SHARD_BLOCK_SIZE * self.PARALLEL_SHARD_BLOCKS
+        pending = deque()
+        try:
+            for start in range(first_row, count, shard_size):
+                size = min(shard_size, count - start)
+                pending.append(pool.submit(_generate_shard, fields, start, size, engine, seed, serialize))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # 消费方提前结束（如任务取消、客户端断开）时丢弃未开始的分片
+            for future in pending:
+                future.cancel()
+
 
 # 单例实例
 data_generator_service = DataGeneratorService()
+
+
+def _generate_shard(
+    fields: List[Dict[str, Any]],
+    start: int,
+    count: int,
+    engine: str,
+    seed: int,
+    serialize: bool
+) -> Any:
+    """进程池工作函数：生成 [start, start+count) 分片，serialize 为 True 时在子进程内完成序列化"""
+    rows = data_generator_service.generate_data(fields, count, engine=engine, seed=seed, start=start)
+    return rows_to_ndjson(rows) if serialize else rows
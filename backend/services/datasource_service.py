@@ -11,6 +11,8 @@ from datetime import datetime
 
 from extensions import db
 from models.datasource import DataSource
+from connectors.connection_pool import pool_manager
+from services.schema_cache_service import schema_cache_service
 
 
 class DataSourceService:
@@ -111,6 +113,9 @@ class DataSourceService:
             datasource.api_config = kwargs['api_config']
         
         datasource.save()
+        # 连接配置可能已变化，丢弃旧连接与缓存的结构
+        pool_manager.invalidate(datasource.uuid)
+        schema_cache_service.invalidate(datasource)
         return datasource, None
     
     def delete_datasource(self, datasource_id: str, user_id: int) -> Tuple[bool, Optional[str]]:
@@ -122,6 +127,7 @@ class DataSourceService:
         if datasource.user_id != user_id:
             return False, "无权删除此数据源"
         
+        pool_manager.invalidate(datasource.uuid)
         datasource.delete()
         return True, None
     
@@ -212,15 +218,8 @@ class DataSourceService:
             return False, str(e), None
     
     def _test_mysql(self, datasource: DataSource) -> Tuple[bool, str, Optional[Dict]]:
-        """测试 MySQL 连接"""
-        return self._test_mysql_params(
-            datasource.host,
-            datasource.port,
-            datasource.database,
-            datasource.username,
-            datasource.get_password(),
-            datasource.use_ssl
-        )
+        """测试 MySQL 连接（使用连接池）"""
+        return self._probe_mysql(pool_manager.connector_for(datasource))
     
     def _test_mysql_params(
         self,
@@ -232,49 +231,38 @@ class DataSourceService:
         use_ssl: bool
     ) -> Tuple[bool, str, Optional[Dict]]:
         """测试 MySQL 连接参数"""
+        from connectors.mysql_connector import MySQLConnector
+        return self._probe_mysql(MySQLConnector(
+            host=host,
+            port=port,
+            database=database,
+            username=username,
+            password=password,
+            use_ssl=use_ssl
+        ))
+    
+    def _probe_mysql(self, connector) -> Tuple[bool, str, Optional[Dict]]:
+        """通过连接器查询 MySQL 版本与表列表"""
         try:
-            import pymysql
-            
-            conn = pymysql.connect(
-                host=host,
-                port=port,
-                user=username,
-                password=password or '',
-                database=database,
-                connect_timeout=10,
-                ssl={'ssl': {}} if use_ssl else None
-            )
-            
-            cursor = conn.cursor()
-            cursor.execute("SELECT VERSION()")
-            version = cursor.fetchone()[0]
-            
-            # 获取表列表
-            cursor.execute("SHOW TABLES")
-            tables = [row[0] for row in cursor.fetchall()]
-            
-            cursor.close()
-            conn.close()
+            with connector:
+                rows = connector.execute_query("SELECT VERSION() AS version")
+                version = rows[0]['version'] if rows else 'unknown'
+                
+                # 获取表列表
+                tables = [list(row.values())[0] for row in connector.execute_query("SHOW TABLES")]
             
             return True, f"连接成功 (MySQL {version})", {
                 'version': version,
                 'tables': tables[:20]  # 最多返回 20 个表
             }
-        except ImportError:
-            return False, "未安装 pymysql 库", None
+        except ImportError as e:
+            return False, str(e), None
         except Exception as e:
             return False, f"连接失败: {str(e)}", None
     
     def _test_postgresql(self, datasource: DataSource) -> Tuple[bool, str, Optional[Dict]]:
-        """测试 PostgreSQL 连接"""
-        return self._test_postgresql_params(
-            datasource.host,
-            datasource.port,
-            datasource.database,
-            datasource.username,
-            datasource.get_password(),
-            datasource.use_ssl
-        )
+        """测试 PostgreSQL 连接（使用连接池）"""
+        return self._probe_postgresql(pool_manager.connector_for(datasource))
     
     def _test_postgresql_params(
         self,
@@ -286,53 +274,41 @@ class DataSourceService:
         use_ssl: bool
     ) -> Tuple[bool, str, Optional[Dict]]:
         """测试 PostgreSQL 连接参数"""
+        from connectors.postgres_connector import PostgreSQLConnector
+        return self._probe_postgresql(PostgreSQLConnector(
+            host=host,
+            port=port,
+            database=database,
+            username=username,
+            password=password,
+            use_ssl=use_ssl
+        ))
+    
+    def _probe_postgresql(self, connector) -> Tuple[bool, str, Optional[Dict]]:
+        """通过连接器查询 PostgreSQL 版本与表列表"""
         try:
-            import psycopg2
-            
-            sslmode = 'require' if use_ssl else 'disable'
-            
-            conn = psycopg2.connect(
-                host=host,
-                port=port,
-                user=username,
-                password=password or '',
-                dbname=database,
-                connect_timeout=10,
-                sslmode=sslmode
-            )
-            
-            cursor = conn.cursor()
-            cursor.execute("SELECT version()")
-            version = cursor.fetchone()[0]
-            
-            # 获取表列表
-            cursor.execute("""
-                SELECT table_name FROM information_schema.tables 
-                WHERE table_schema = 'public' LIMIT 20
-            """)
-            tables = [row[0] for row in cursor.fetchall()]
-            
-            cursor.close()
-            conn.close()
+            with connector:
+                rows = connector.execute_query("SELECT version()")
+                version = rows[0]['version'] if rows else 'unknown'
+                
+                # 获取表列表
+                tables = [row['table_name'] for row in connector.execute_query("""
+                    SELECT table_name FROM information_schema.tables 
+                    WHERE table_schema = 'public' LIMIT 20
+                """)]
             
             return True, f"连接成功", {
                 'version': version,
                 'tables': tables
             }
-        except ImportError:
-            return False, "未安装 psycopg2 库", None
+        except ImportError as e:
+            return False, str(e), None
         except Exception as e:
             return False, f"连接失败: {str(e)}", None
     
     def _test_mongodb(self, datasource: DataSource) -> Tuple[bool, str, Optional[Dict]]:
-        """测试 MongoDB 连接"""
-        return self._test_mongodb_params(
-            datasource.host,
-            datasource.port,
-            datasource.database,
-            datasource.username,
-            datasource.get_password()
-        )
+        """测试 MongoDB 连接（使用连接池）"""
+        return self._probe_mongodb(pool_manager.connector_for(datasource))
     
     def _test_mongodb_params(
         self,
@@ -343,35 +319,31 @@ class DataSourceService:
         password: str
     ) -> Tuple[bool, str, Optional[Dict]]:
         """测试 MongoDB 连接参数"""
+        from connectors.mongo_connector import MongoDBConnector
+        return self._probe_mongodb(MongoDBConnector(
+            host=host,
+            port=port,
+            database=database,
+            username=username,
+            password=password
+        ))
+    
+    def _probe_mongodb(self, connector) -> Tuple[bool, str, Optional[Dict]]:
+        """通过连接器查询 MongoDB 版本与集合列表"""
         try:
-            from pymongo import MongoClient
-            
-            if username and password:
-                uri = f"mongodb://{username}:{password}@{host}:{port}/"
-            else:
-                uri = f"mongodb://{host}:{port}/"
-            
-            client = MongoClient(uri, serverSelectionTimeoutMS=10000)
-            
-            # 测试连接
-            server_info = client.server_info()
-            version = server_info.get('version', 'unknown')
-            
-            # 获取集合列表
-            if database:
-                db = client[database]
-                collections = db.list_collection_names()[:20]
-            else:
-                collections = []
-            
-            client.close()
+            with connector:
+                server_info = connector.client.server_info()
+                version = server_info.get('version', 'unknown')
+                
+                # 获取集合列表
+                collections = connector.db.list_collection_names()[:20] if connector.db is not None else []
             
             return True, f"连接成功 (MongoDB {version})", {
                 'version': version,
                 'collections': collections
             }
-        except ImportError:
-            return False, "未安装 pymongo 库", None
+        except ImportError as e:
+            return False, str(e), None
         except Exception as e:
             return False, f"连接失败: {str(e)}", None
     
@@ -421,168 +393,74 @@ class DataSourceService:
         except Exception as e:
             return False, f"连接失败: {str(e)}", None
     
-    def get_tables(self, datasource_id: str, user_id: int) -> Tuple[Optional[List[Dict]], Optional[str]]:
-        """获取数据源的表/集合列表"""
+    def get_tables(
+        self,
+        datasource_id: str,
+        user_id: int,
+        refresh: bool = False
+    ) -> Tuple[Optional[List[Dict]], Optional[Dict], Optional[str]]:
+        """
+        获取数据源的表/集合列表（经结构缓存）
+        :param refresh: 忽略缓存，重新从数据源获取
+        :return: (表列表, 缓存信息, 错误信息)
+        """
         datasource = DataSource.find_by_uuid(datasource_id)
         if not datasource:
-            return None, "数据源不存在"
+            return None, None, "数据源不存在"
         
         if datasource.user_id != user_id:
-            return None, "无权操作此数据源"
+            return None, None, "无权操作此数据源"
         
-        ds_type = datasource.type
+        loaders = {
+            'mysql': self._get_mysql_tables,
+            'postgresql': self._get_postgresql_tables,
+            'mongodb': self._get_mongodb_collections,
+        }
+        loader = loaders.get(datasource.type)
+        if loader is None:
+            return None, None, f"不支持获取表列表: {datasource.type}"
         
         try:
-            if ds_type == 'mysql':
-                return self._get_mysql_tables(datasource)
-            elif ds_type == 'postgresql':
-                return self._get_postgresql_tables(datasource)
-            elif ds_type == 'mongodb':
-                return self._get_mongodb_collections(datasource)
-            else:
-                return None, f"不支持获取表列表: {ds_type}"
-        except Exception as e:
-            return None, str(e)
-    
-    def _get_mysql_tables(self, datasource: DataSource) -> Tuple[Optional[List[Dict]], Optional[str]]:
-        """获取 MySQL 表列表"""
-        try:
-            import pymysql
-            
-            conn = pymysql.connect(
-                host=datasource.host,
-                port=datasource.port,
-                user=datasource.username,
-                password=datasource.get_password() or '',
-                database=datasource.database,
-                connect_timeout=10
+            tables, meta = schema_cache_service.get(
+                datasource, schema_cache_service.SCOPE_TABLES, loader, refresh=refresh
             )
-            
-            cursor = conn.cursor()
-            cursor.execute("SHOW TABLES")
-            tables = []
-            
-            for row in cursor.fetchall():
-                table_name = row[0]
-                # 获取列信息
-                cursor.execute(f"DESCRIBE `{table_name}`")
-                columns = []
-                for col in cursor.fetchall():
-                    columns.append({
-                        'name': col[0],
-                        'type': col[1],
-                        'nullable': col[2] == 'YES',
-                        'primary_key': col[3] == 'PRI'
-                    })
-                tables.append({
-                    'name': table_name,
-                    'columns': columns
-                })
-            
-            cursor.close()
-            conn.close()
-            
-            datasource.record_query()
-            return tables, None
+            return tables, meta, None
         except Exception as e:
-            return None, str(e)
+            return None, None, str(e)
     
-    def _get_postgresql_tables(self, datasource: DataSource) -> Tuple[Optional[List[Dict]], Optional[str]]:
-        """获取 PostgreSQL 表列表"""
-        try:
-            import psycopg2
-            
-            conn = psycopg2.connect(
-                host=datasource.host,
-                port=datasource.port,
-                user=datasource.username,
-                password=datasource.get_password() or '',
-                dbname=datasource.database,
-                connect_timeout=10
-            )
-            
-            cursor = conn.cursor()
-            
-            # 获取表列表
-            cursor.execute("""
-                SELECT table_name FROM information_schema.tables 
-                WHERE table_schema = 'public'
-            """)
-            
-            tables = []
-            for row in cursor.fetchall():
-                table_name = row[0]
-                # 获取列信息
-                cursor.execute("""
-                    SELECT column_name, data_type, is_nullable, 
-                           (SELECT COUNT(*) FROM information_schema.key_column_usage 
-                            WHERE table_name = c.table_name AND column_name = c.column_name) as is_pk
-                    FROM information_schema.columns c
-                    WHERE table_schema = 'public' AND table_name = %s
-                """, (table_name,))
-                
-                columns = []
-                for col in cursor.fetchall():
-                    columns.append({
-                        'name': col[0],
-                        'type': col[1],
-                        'nullable': col[2] == 'YES',
-                        'primary_key': col[3] > 0
-                    })
-                tables.append({
-                    'name': table_name,
-                    'columns': columns
-                })
-            
-            cursor.close()
-            conn.close()
-            
-            datasource.record_query()
-            return tables, None
-        except Exception as e:
-            return None, str(e)
+    def get_table_schema(
+        self,
+        datasource: DataSource,
+        table_name: str,
+        refresh: bool = False,
+        exact_count: bool = False
+    ) -> Tuple[Dict, Dict]:
+        """
+        获取表结构（经结构缓存，row_count 为估计值）
+        :param exact_count: 额外查询精确行数（不缓存）
+        :return: (表结构, 缓存信息)
+        """
+        schema, meta = schema_cache_service.get(
+            datasource, table_name,
+            lambda connector: connector.get_table_schema(table_name),
+            refresh=refresh
+        )
+        if exact_count:
+            with pool_manager.connector_for(datasource) as connector:
+                schema = dict(schema, row_count=connector.count_rows(table_name), row_count_exact=True)
+        return schema, meta
     
-    def _get_mongodb_collections(self, datasource: DataSource) -> Tuple[Optional[List[Dict]], Optional[str]]:
-        """获取 MongoDB 集合列表"""
-        try:
-            from pymongo import MongoClient
-            
-            username = datasource.username
-            password = datasource.get_password()
-            
-            if username and password:
-                uri = f"mongodb://{username}:{password}@{datasource.host}:{datasource.port}/"
-            else:
-                uri = f"mongodb://{datasource.host}:{datasource.port}/"
-            
-            client = MongoClient(uri, serverSelectionTimeoutMS=10000)
-            db = client[datasource.database]
-            
-            collections = []
-            for coll_name in db.list_collection_names():
-                # 获取一个示例文档来推断字段
-                sample = db[coll_name].find_one()
-                columns = []
-                if sample:
-                    for key, value in sample.items():
-                        columns.append({
-                            'name': key,
-                            'type': type(value).__name__,
-                            'nullable': True,
-                            'primary_key': key == '_id'
-                        })
-                collections.append({
-                    'name': coll_name,
-                    'columns': columns
-                })
-            
-            client.close()
-            
-            datasource.record_query()
-            return collections, None
-        except Exception as e:
-            return None, str(e)
-
+    def _get_mysql_tables(self, connector) -> List[Dict]:
+        """获取 MySQL 表列表（含列与索引，固定次数的批量查询）"""
+        return connector.describe_tables()
+    
+    def _get_postgresql_tables(self, connector) -> List[Dict]:
+        """获取 PostgreSQL 表列表（含列与索引，固定次数的批量查询）"""
+        return connector.describe_tables()
+    
+    def _get_mongodb_collections(self, connector) -> List[Dict]:
+        """获取 MongoDB 集合列表（服务端 $sample 采样推断字段，多个集合并发处理）"""
+        return connector.describe_tables()
 
 # 单例实例
 datasource_service = DataSourceService()
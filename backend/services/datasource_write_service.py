@@ -0,0 +1,328 @@
+"""
+数据源写入服务
+分块写入数据源并在服务端保存进度检查点：每提交一块记录已提交的行数，
+写入失败后可带上写入 ID 重新提交，从最后提交的块继续；
+seed 操作在服务端边生成边写入，数据不经过客户端
+运行中的写入每提交一块即更新 updated_at，长时间没有进度的写入视为已中断（进程重启或退出）
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, Tuple, Dict, Any, Iterable, List
+
+from extensions import db
+from models.datasource import DataSource, DataSourceWrite
+from connectors.connection_pool import pool_manager
+from services.schema_cache_service import schema_cache_service
+
+
+class DataSourceWriteService:
+    """数据源分块写入服务"""
+
+    MODE_CHUNK = 'chunk'  # 每块一个事务
+    MODE_SINGLE = 'single'  # 全部数据一个事务
+    MODES = [MODE_CHUNK, MODE_SINGLE]
+
+    DEFAULT_CHUNK_SIZE = 5000
+    MIN_CHUNK_SIZE = 100  # 块过小时每块一次提交与检查点更新的开销远大于写入本身
+    MAX_CHUNK_SIZE = 100000
+
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    MAX_SEED_ROWS = 10000000  # 单次 seed 最大生成行数
+
+    DEFAULT_STALE_SECONDS = 600  # 运行中的写入超过该秒数没有进度即视为已中断
+
+    def __init__(self):
+        self._app = None
+        self._executor = None
+        self._stale_seconds = self.DEFAULT_STALE_SECONDS
+
+    def init_app(self, app):
+        """初始化后台 seed 的工作线程池，并将上次运行中断的写入标记为失败"""
+        if self._executor:
+            return
+        self._app = app
+        self._stale_seconds = app.config.get('DATASOURCE_WRITE_STALE_SECONDS', self.DEFAULT_STALE_SECONDS)
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config.get('GENERATION_JOB_WORKERS', 2),
+            thread_name_prefix='datasource-seed'
+        )
+
+        with app.app_context():
+            self._fail_interrupted_writes()
+
+    def _stale_before(self) -> datetime:
+        """早于该时间没有进度的运行中写入视为已中断"""
+        return datetime.utcnow() - timedelta(seconds=self._stale_seconds)
+
+    def _fail_interrupted_writes(self, write_id: int = None):
+        """
+        将长时间没有进度的 running 写入标记为失败
+        只按进度时间判断，其他进程中仍在进行的写入每块都会更新进度，不受影响
+        :param write_id: 只检查这一条写入，默认全部
+        """
+        try:
+            query = DataSourceWrite.query.filter(
+                DataSourceWrite.status == self.STATUS_RUNNING,
+                DataSourceWrite.updated_at < self._stale_before()
+            )
+            if write_id is not None:
+                query = query.filter(DataSourceWrite.id == write_id)
+            if query.update({'status': self.STATUS_FAILED, 'error_message': '写入已中断（服务重启或长时间没有进度）'},
+                            synchronize_session=False):
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Failed to clean up interrupted writes: {e}")
+
+    def validate_options(self, chunk_size: Any, mode: Any, ds_type: str = None, write_concern: Any = None) -> Optional[str]:
+        """校验分块写入参数，合法返回 None，否则返回错误信息"""
+        if not isinstance(chunk_size, int) or isinstance(chunk_size, bool) \
+                or not (self.MIN_CHUNK_SIZE <= chunk_size <= self.MAX_CHUNK_SIZE):
+            return f"chunk_size 必须为 {self.MIN_CHUNK_SIZE}-{self.MAX_CHUNK_SIZE} 之间的整数"
+        if mode not in self.MODES:
+            return f"transaction must be one of {self.MODES}"
+        if mode == self.MODE_SINGLE and ds_type == 'mongodb':
+            return "MongoDB 数据源不支持单事务写入"
+        if write_concern is not None:
+            if ds_type != 'mongodb':
+                return "write_concern 只适用于 MongoDB 数据源"
+            from connectors.mongo_connector import MongoDBConnector
+            if write_concern not in MongoDBConnector.WRITE_CONCERNS:
+                return f"write_concern must be one of {list(MongoDBConnector.WRITE_CONCERNS)}"
+        return None
+
+    def get_write(self, write_id: str, user_id: int) -> Optional[DataSourceWrite]:
+        """获取写入记录（只能查看自己的），已中断的运行中写入先标记为失败"""
+        write = DataSourceWrite.find_by_uuid(write_id)
+        if not write or write.user_id != user_id:
+            return None
+        if write.status == self.STATUS_RUNNING:
+            self._fail_interrupted_writes(write.id)
+            db.session.refresh(write)
+        return write
+
+    def start_write(
+        self,
+        datasource: DataSource,
+        user_id: int,
+        table_name: str,
+        total_rows: Optional[int],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        mode: str = MODE_CHUNK,
+        resume_id: str = None,
+        seed: int = None,
+        seeded: bool = False
+    ) -> Tuple[Optional[DataSourceWrite], Optional[str]]:
+        """
+        创建写入记录，或取出要继续的写入记录
+        继续写入时沿用原记录的表名、块大小和事务模式，总行数必须一致（需要重新提交相同的数据）
+        只能继续已失败的写入：以按状态的条件更新认领，同一写入的并发继续只有一个成功
+        :param seeded: 服务端生成数据（seed 操作）：新建时 seed 为空则自动生成种子；
+                       继续写入时沿用原种子，提供的 seed 必须与原种子一致
+        """
+        if not resume_id:
+            if seeded and seed is None:
+                from services.data_generator_service import data_generator_service
+                seed = data_generator_service.new_seed()
+            write = DataSourceWrite(
+                user_id=user_id,
+                datasource_id=datasource.id,
+                table_name=table_name,
+                chunk_size=chunk_size,
+                transaction_mode=mode,
+                total_rows=total_rows,
+                seed=seed,
+                status=self.STATUS_RUNNING,
+                run_id=str(uuid.uuid4())
+            )
+            write.save()
+            return write, None
+
+        write = self.get_write(resume_id, user_id)
+        if not write or write.datasource_id != datasource.id:
+            return None, "写入记录不存在"
+        if write.status == self.STATUS_COMPLETED:
+            return None, "该写入已完成，无需继续"
+        if write.status == self.STATUS_RUNNING:
+            return None, "该写入正在进行中，请等待完成或失败后再继续"
+        if seeded != (write.seed is not None):
+            return None, "继续写入的方式必须与原写入一致（/write 或 /seed）"
+        if seed is not None and seed != write.seed:
+            return None, f"继续写入的种子必须与原写入一致: {write.seed}"
+        if write.table_name != table_name:
+            return None, f"继续写入的表名必须与原写入一致: {write.table_name}"
+        if write.total_rows is not None and total_rows is not None and write.total_rows != total_rows:
+            return None, f"继续写入的数据行数必须与原写入一致: {write.total_rows}"
+
+        claimed = DataSourceWrite.query.filter_by(id=write.id, status=self.STATUS_FAILED).update(
+            {'status': self.STATUS_RUNNING, 'error_message': None, 'run_id': str(uuid.uuid4())},
+            synchronize_session=False
+        )
+        db.session.commit()
+        if not claimed:
+            return None, "该写入正在进行中，请等待完成或失败后再继续"
+        db.session.refresh(write)
+        return write, None
+
+    def run_write(
+        self,
+        write: DataSourceWrite,
+        rows: Iterable[Dict[str, Any]],
+        create_table: bool = False,
+        columns: List[Dict] = None,
+        rows_offset: int = 0,
+        write_concern: str = None
+    ) -> Tuple[bool, Dict[str, Any], Optional[str]]:
+        """
+        执行写入：跳过已提交的行后分块写入，每提交一块更新检查点
+        :param rows: 数据行（可以是生成器），从第 rows_offset 行开始提供；
+                     客户端提交的数据继续写入时同样从第一行开始提供，由此处跳过已提交的行
+        :param write_concern: MongoDB 写关注名称
+        :return: (是否成功, 写入统计, 错误信息)
+        """
+        datasource = write.datasource
+        connector = pool_manager.connector_for(datasource)
+        if connector is None:
+            return False, {}, f"不支持的数据源类型: {datasource.type}"
+        if write_concern:
+            connector.write_concern = write_concern
+        if datasource.type == 'mongodb':
+            # 文档 _id 由写入 ID 和行号确定：失败块中已写入的文档在续写时因重复键被跳过，不会重复写入
+            connector.row_id_namespace = write.uuid
+            rows = connector.with_row_ids(rows, start=rows_offset)
+
+        single = write.transaction_mode == self.MODE_SINGLE
+
+        def on_chunk(stats, committed):
+            write.record_chunk(stats, committed)
+            db.session.commit()
+
+        try:
+            with connector:
+                if create_table and columns and not write.committed_rows:
+                    if datasource.type in ['mysql', 'postgresql']:
+                        success, error = connector.create_table(write.table_name, columns)
+                        if not success:
+                            raise RuntimeError(f"创建表失败: {error}")
+                    elif datasource.type == 'mongodb':
+                        connector.create_collection(write.table_name)
+
+                summary = connector.write_chunks(
+                    write.table_name, rows, write.chunk_size,
+                    single_transaction=single,
+                    skip_rows=write.committed_rows - rows_offset,
+                    on_chunk=on_chunk,
+                    first_chunk=write.committed_chunks
+                )
+
+            if single:
+                write.committed_rows += summary['rows']
+                write.committed_chunks += summary['chunk_count']
+                write.write_seconds = (write.write_seconds or 0) + summary['seconds']
+            write.status = self.STATUS_COMPLETED
+            db.session.commit()
+            datasource.record_query()
+            return True, summary, None
+        except Exception as e:
+            db.session.rollback()
+            write.status = self.STATUS_FAILED
+            write.error_message = str(e)
+            db.session.commit()
+            return False, {}, str(e)
+        finally:
+            # 表列表与缓存的行数估计已变化（分块提交时失败前的块也已写入）
+            schema_cache_service.invalidate(datasource)
+
+    # ------------------------------------------------------------------
+    # seed：服务端生成并写入
+    # ------------------------------------------------------------------
+
+    def resolve_fields(self, fields: Optional[list], template_id: Optional[str], user_id: int) -> Tuple[Optional[list], Optional[str]]:
+        """字段配置：直接提供的 fields 优先，否则取模板（模板市场中自己的或公开的模板，以及内置模板）的字段"""
+        if fields:
+            return fields, None
+        if not template_id:
+            return None, "fields 或 template_id 必须提供一个"
+
+        from models.template import Template
+        template = Template.find_by_uuid(template_id)
+        if template and (template.is_public or template.author_id == user_id):
+            return template.fields, None
+
+        from services.template_service import template_service
+        builtin = template_service.get_by_id(template_id)
+        if builtin:
+            return builtin.get('fields', []), None
+        return None, "模板不存在"
+
+    def submit_seed(
+        self,
+        write: DataSourceWrite,
+        fields: list,
+        create_table: bool = False,
+        columns: List[Dict] = None,
+        write_concern: str = None
+    ) -> Optional[str]:
+        """提交后台 seed：在工作线程中生成并写入，进度通过写入记录查询"""
+        if not self._executor:
+            return "写入服务未初始化"
+        self._executor.submit(
+            self._run_seed_in_context, write.uuid, write.run_id, fields, create_table, columns, write_concern
+        )
+        return None
+
+    def _run_seed_in_context(self, write_uuid: str, run_id: str, fields: list, create_table: bool,
+                             columns: List[Dict], write_concern: str = None):
+        with self._app.app_context():
+            write = DataSourceWrite.find_by_uuid(write_uuid)
+            # 排队期间写入已被判定中断并由其他请求继续时，放弃本次执行
+            if not write or write.run_id != run_id or write.status != self.STATUS_RUNNING:
+                return
+            try:
+                self.run_seed(write, fields, create_table, columns, write_concern)
+            except Exception as e:
+                # 后台线程中的异常不会传给调用方，记录到写入记录
+                db.session.rollback()
+                write.status = self.STATUS_FAILED
+                write.error_message = str(e)
+                db.session.commit()
+
+    def run_seed(
+        self,
+        write: DataSourceWrite,
+        fields: list,
+        create_table: bool = False,
+        columns: List[Dict] = None,
+        write_concern: str = None
+    ) -> Tuple[bool, Dict[str, Any], Optional[str]]:
+        """
+        按字段配置分块生成并直接写入数据源（COPY / 多行 INSERT / insert_many），
+        内存占用只与块大小有关；从检查点继续时只生成剩余的行，带种子时与一次写完的数据一致
+        """
+        from services.data_generator_service import data_generator_service
+
+        workers = self._app.config.get('GENERATION_WORKERS') if self._app else None
+        start = write.committed_rows
+        chunks = data_generator_service.iter_chunks(
+            fields, write.total_rows, seed=write.seed,
+            chunk_size=write.chunk_size, workers=workers, start=start
+        )
+        rows = (row for chunk in chunks for row in chunk)
+        if create_table and not columns:
+            columns = [{'name': field['name'], 'type': field.get('type', 'string')} for field in fields]
+        return self.run_write(
+            write, rows, create_table=create_table, columns=columns,
+            rows_offset=start, write_concern=write_concern
+        )
+
+
+# 单例实例
+datasource_write_service = DataSourceWriteService()
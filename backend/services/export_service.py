@@ -1,84 +1,406 @@
 """
 导出服务
 负责将生成的数据导出为不同格式
+各格式均提供按块产出编码后字节的流式写出器（iter_*），内存占用与数据量无关
 """
-from typing import List, Dict, Any
-from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Iterator, Callable, Optional
 import json
 import csv
 import io
 
+try:
+    from .columnar_export import ColumnarExporter
+except ImportError:  # 未安装 pyarrow 时不支持 Parquet / Arrow 导出
+    ColumnarExporter = None
+
 
 class ExportService:
     """导出服务"""
 
-    def to_json(self, data: List[Dict[str, Any]], fields: List[Dict[str, Any]]) -> str:
+    # 每次产出的行数
+    CHUNK_ROWS = 1000
+
+    FORMAT_JSON = "json"
+    FORMAT_JSONL = "jsonl"
+    FORMAT_CSV = "csv"
+    FORMAT_SQL = "sql"
+    FORMAT_PG_COPY = "pg_copy"  # PostgreSQL COPY FROM STDIN 脚本
+    FORMAT_MYSQL_TSV = "mysql_tsv"  # MySQL LOAD DATA 数据文件
+    FORMAT_PARQUET = "parquet"
+    FORMAT_ARROW = "arrow"  # Arrow IPC 文件（Feather v2）
+    COLUMNAR_FORMATS = [FORMAT_PARQUET, FORMAT_ARROW]
+
+    # 格式 -> (MIME 类型, 文件扩展名)
+    FORMAT_INFO = {
+        FORMAT_JSON: ("application/json", "json"),
+        FORMAT_JSONL: ("application/x-ndjson", "jsonl"),
+        FORMAT_CSV: ("text/csv", "csv"),
+        FORMAT_SQL: ("text/plain", "sql"),
+        FORMAT_PG_COPY: ("text/plain", "copy.sql"),
+        FORMAT_MYSQL_TSV: ("text/tab-separated-values", "tsv"),
+        FORMAT_PARQUET: ("application/vnd.apache.parquet", "parquet"),
+        FORMAT_ARROW: ("application/vnd.apache.arrow.file", "arrow"),
+    }
+    FORMATS = list(FORMAT_INFO)
+
+    # 列式格式每个 row group / record batch 的行数
+    COLUMNAR_BATCH_ROWS = 65536
+
+    def __init__(self):
+        self._columnar = ColumnarExporter() if ColumnarExporter else None
+
+    # SQL 方言
+    DIALECT_MYSQL = "mysql"
+    DIALECT_POSTGRESQL = "postgresql"
+    DIALECT_SQLITE = "sqlite"
+    DIALECTS = [DIALECT_MYSQL, DIALECT_POSTGRESQL, DIALECT_SQLITE]
+
+    # 每条 INSERT 语句包含的行数，避免超出 max_allowed_packet 或解析器限制
+    SQL_BATCH_SIZE = 1000
+
+    # ------------------------------------------------------------------
+    # 流式写出
+    # ------------------------------------------------------------------
+
+    def iter_json(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        fields: List[Dict[str, Any]],
+        compact: bool = False
+    ) -> Iterator[bytes]:
+        """流式导出为 JSON 数组；compact 为 False 时与 indent=2 的输出一致"""
+        if compact:
+            dump = lambda row: json.dumps(row, ensure_ascii=False, separators=(",", ":"))
+            separator, opening, closing = ",", "[", "]"
+        else:
+            # 数组元素整体缩进两格，与 json.dumps(list, indent=2) 的结果相同
+            dump = lambda row: "  " + json.dumps(row, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            separator, opening, closing = ",\n", "[\n", "\n]"
+
+        first = True
+        for chunk in self._iter_row_chunks(rows, fields):
+            body = separator.join(dump(row) for row in chunk)
+            if first:
+                yield (opening + body).encode("utf-8")
+                first = False
+            else:
+                yield (separator + body).encode("utf-8")
+        yield b"[]" if first else closing.encode("utf-8")
+
+    def iter_jsonl(self, rows: Iterable[Dict[str, Any]], fields: List[Dict[str, Any]]) -> Iterator[bytes]:
+        """流式导出为 JSON Lines（每行一个 JSON 对象）"""
+        for chunk in self._iter_row_chunks(rows, fields):
+            yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk).encode("utf-8")
+
+    def iter_csv(self, rows: Iterable[Dict[str, Any]], fields: List[Dict[str, Any]]) -> Iterator[bytes]:
+        """流式导出为 CSV（首行为表头）"""
+        if not fields:
+            return
+
+        field_names = [f["name"] for f in fields]
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(field_names)
+
+        for chunk in self._iter_chunks(rows):
+            # 按字段顺序写入
+            writer.writerows([row.get(name, "") for name in field_names] for row in chunk)
+            yield output.getvalue().encode("utf-8")
+            output.seek(0)
+            output.truncate(0)
+
+        # 没有数据行时仍输出表头
+        if output.tell():
+            yield output.getvalue().encode("utf-8")
+
+    def iter_sql(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        fields: List[Dict[str, Any]],
+        table_name: str = "test_data",
+        dialect: str = None,
+        batch_size: int = None
+    ) -> Iterator[bytes]:
+        """
+        流式导出为分批的多行 INSERT 语句
+        dialect 为 mysql / postgresql / sqlite 时按方言引用标识符和转换字面量，为空时保持通用写法
+        """
+        if not fields:
+            return
+
+        field_names = [f["name"] for f in fields]
+        columns = ", ".join(self.quote_identifier(name, dialect) for name in field_names)
+        header = f"INSERT INTO {self.quote_table(table_name, dialect)} ({columns}) VALUES\n"
+        to_literal = self._literal_converter(dialect)
+
+        for chunk in self._iter_chunks(rows, batch_size or self.SQL_BATCH_SIZE):
+            body = ",\n".join(
+                f"({', '.join([to_literal(row.get(name, '')) for name in field_names])})"
+                for row in chunk
+            )
+            yield (header + body + ";\n").encode("utf-8")
+
+    def iter_pg_copy(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        fields: List[Dict[str, Any]],
+        table_name: str = "test_data"
+    ) -> Iterator[bytes]:
+        """流式导出为 PostgreSQL COPY ... FROM STDIN 文本格式脚本（可直接用 psql 执行）"""
+        if not fields:
+            return
+
+        field_names = [f["name"] for f in fields]
+        columns = ", ".join(self.quote_identifier(name, self.DIALECT_POSTGRESQL) for name in field_names)
+        yield f"COPY {self.quote_table(table_name, self.DIALECT_POSTGRESQL)} ({columns}) FROM STDIN;\n".encode("utf-8")
+        for chunk in self._iter_chunks(rows):
+            yield self.pg_copy_lines(chunk, field_names).encode("utf-8")
+        yield b"\\.\n"
+
+    def pg_copy_lines(self, chunk: List[Dict[str, Any]], field_names: List[str]) -> str:
+        """一块行的 PostgreSQL COPY 文本格式数据（不含 COPY 语句与结束标记），供连接器直接 COPY 入库"""
+        return self._tsv_lines(chunk, field_names, "t", "f")
+
+    def iter_mysql_tsv(self, rows: Iterable[Dict[str, Any]], fields: List[Dict[str, Any]]) -> Iterator[bytes]:
+        """流式导出为可供 MySQL LOAD DATA 导入的 TSV（无表头，配合 mysql_load_statement 使用）"""
+        if not fields:
+            return
+
+        field_names = [f["name"] for f in fields]
+        for chunk in self._iter_chunks(rows):
+            yield self.mysql_tsv_lines(chunk, field_names).encode("utf-8")
+
+    def mysql_tsv_lines(self, chunk: List[Dict[str, Any]], field_names: List[str]) -> str:
+        """一块行的 MySQL LOAD DATA 默认格式 TSV（无表头），供连接器直接 LOAD DATA 入库"""
+        return self._tsv_lines(chunk, field_names, "1", "0")
+
+    def mysql_load_statement(
+        self,
+        fields: List[Dict[str, Any]],
+        table_name: str = "test_data",
+        file_name: str = "generated_data.tsv"
+    ) -> str:
+        """与 iter_mysql_tsv 输出格式对应的 LOAD DATA 控制语句"""
+        columns = ", ".join(self.quote_identifier(f["name"], self.DIALECT_MYSQL) for f in fields)
+        file_literal = self._mysql_literal(file_name)
+        return (
+            f"LOAD DATA LOCAL INFILE {file_literal}\n"
+            f"INTO TABLE {self.quote_table(table_name, self.DIALECT_MYSQL)}\n"
+            f"CHARACTER SET utf8mb4\n"
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'\n"
+            f"LINES TERMINATED BY '\\n'\n"
+            f"({columns});\n"
+        )
+
+    def iter_parquet(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        fields: List[Dict[str, Any]],
+        compression: str = "zstd"
+    ) -> Iterator[bytes]:
+        """流式导出为 Parquet（强类型列，需要 pyarrow）"""
+        return self._columnar_exporter().iter_parquet(
+            self._iter_chunks(rows, self.COLUMNAR_BATCH_ROWS), fields, compression or "zstd"
+        )
+
+    def iter_arrow(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        fields: List[Dict[str, Any]],
+        compression: str = "zstd"
+    ) -> Iterator[bytes]:
+        """流式导出为 Arrow IPC / Feather（强类型列，需要 pyarrow）"""
+        return self._columnar_exporter().iter_arrow(
+            self._iter_chunks(rows, self.COLUMNAR_BATCH_ROWS), fields, compression or "zstd"
+        )
+
+    def validate_format(self, export_format: str, compression: str = None) -> Optional[str]:
+        """校验导出格式与压缩方式，合法返回 None，否则返回错误信息"""
+        if export_format not in self.FORMATS:
+            return f"format must be one of {self.FORMATS}"
+        if export_format not in self.COLUMNAR_FORMATS:
+            return None
+        if ColumnarExporter is None:
+            return "未安装 pyarrow 库"
+        allowed = (ColumnarExporter.PARQUET_COMPRESSIONS if export_format == self.FORMAT_PARQUET
+                   else ColumnarExporter.ARROW_COMPRESSIONS)
+        if compression and compression not in allowed:
+            return f"compression must be one of {allowed}"
+        return None
+
+    def iter_export(
+        self,
+        export_format: str,
+        rows: Iterable[Dict[str, Any]],
+        fields: List[Dict[str, Any]],
+        **options
+    ) -> Iterator[bytes]:
+        """按格式名选择流式写出器"""
+        if export_format == self.FORMAT_JSON:
+            return self.iter_json(rows, fields, compact=options.get("compact", False))
+        if export_format == self.FORMAT_JSONL:
+            return self.iter_jsonl(rows, fields)
+        if export_format == self.FORMAT_CSV:
+            return self.iter_csv(rows, fields)
+        if export_format == self.FORMAT_SQL:
+            return self.iter_sql(
+                rows, fields, options.get("table_name") or "test_data",
+                dialect=options.get("dialect"), batch_size=options.get("batch_size")
+            )
+        if export_format == self.FORMAT_PG_COPY:
+            return self.iter_pg_copy(rows, fields, options.get("table_name") or "test_data")
+        if export_format == self.FORMAT_MYSQL_TSV:
+            return self.iter_mysql_tsv(rows, fields)
+        if export_format == self.FORMAT_PARQUET:
+            return self.iter_parquet(rows, fields, options.get("compression"))
+        if export_format == self.FORMAT_ARROW:
+            return self.iter_arrow(rows, fields, options.get("compression"))
+        raise ValueError(f"不支持的导出格式: {export_format}")
+
+    # ------------------------------------------------------------------
+    # 一次性导出（兼容旧接口）
+    # ------------------------------------------------------------------
+
+    def to_json(self, data: List[Dict[str, Any]], fields: List[Dict[str, Any]], compact: bool = False) -> str:
         """导出为JSON格式"""
-        # 确保字段顺序
-        ordered_data = self._ensure_field_order(data, fields)
-        return json.dumps(ordered_data, ensure_ascii=False, indent=2)
+        return b"".join(self.iter_json(data, fields, compact=compact)).decode("utf-8")
+
+    def to_jsonl(self, data: List[Dict[str, Any]], fields: List[Dict[str, Any]]) -> str:
+        """导出为JSON Lines格式"""
+        return b"".join(self.iter_jsonl(data, fields)).decode("utf-8")
 
     def to_csv(self, data: List[Dict[str, Any]], fields: List[Dict[str, Any]]) -> str:
         """导出为CSV格式"""
         if not data or not fields:
             return ""
-        
-        output = io.StringIO()
-        field_names = [f["name"] for f in fields]
-        
-        writer = csv.DictWriter(output, fieldnames=field_names, extrasaction='ignore')
-        writer.writeheader()
-        
-        for row in data:
-            # 按字段顺序写入
-            ordered_row = {name: row.get(name, "") for name in field_names}
-            writer.writerow(ordered_row)
-        
-        return output.getvalue()
+        return b"".join(self.iter_csv(data, fields)).decode("utf-8")
 
-    def to_sql(self, data: List[Dict[str, Any]], fields: List[Dict[str, Any]], table_name: str = "test_data") -> str:
-        """导出为SQL INSERT语句"""
-        if not data or not fields:
-            return ""
-        
-        field_names = [f["name"] for f in fields]
-        columns = ", ".join(field_names)
-        
-        values_list = []
-        for row in data:
-            values = []
-            for name in field_names:
-                val = row.get(name, "")
-                # 转义单引号
-                if isinstance(val, str):
-                    val = val.replace("'", "''")
-                    values.append(f"'{val}'")
-                elif isinstance(val, bool):
-                    values.append("1" if val else "0")
-                elif val is None:
-                    values.append("NULL")
-                else:
-                    values.append(str(val))
-            values_list.append(f"({', '.join(values)})")
-        
-        return f"INSERT INTO {table_name} ({columns}) VALUES\n" + ",\n".join(values_list) + ";"
-
-    def _ensure_field_order(self, data: List[Dict[str, Any]], fields: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """确保数据字段顺序与配置一致"""
+    def to_sql(
+        self,
+        data: List[Dict[str, Any]],
+        fields: List[Dict[str, Any]],
+        table_name: str = "test_data",
+        dialect: str = None,
+        batch_size: int = None
+    ) -> str:
+        """导出为SQL INSERT语句（按 batch_size 分批）"""
+        return b"".join(self.iter_sql(data, fields, table_name, dialect, batch_size)).decode("utf-8")
+
+    # ------------------------------------------------------------------
+    # 内部工具
+    # ------------------------------------------------------------------
+
+    def _columnar_exporter(self) -> "ColumnarExporter":
+        """获取列式写出器，未安装 pyarrow 时抛出 ValueError"""
+        if self._columnar is None:
+            raise ValueError("未安装 pyarrow 库")
+        return self._columnar
+
+    def _iter_chunks(self, rows: Iterable[Dict[str, Any]], size: int = None) -> Iterator[List[Dict[str, Any]]]:
+        """将行迭代器按 size（默认 CHUNK_ROWS）分块"""
+        size = size or self.CHUNK_ROWS
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _iter_row_chunks(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        fields: List[Dict[str, Any]]
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """分块并确保数据字段顺序与配置一致（配置中不存在于行内的字段被跳过）"""
         if not fields:
-            return data
-        
+            yield from self._iter_chunks(rows)
+            return
+
         field_names = [f["name"] for f in fields]
-        ordered_data = []
-        
-        for row in data:
-            ordered_row = OrderedDict()
-            for name in field_names:
-                if name in row:
-                    ordered_row[name] = row[name]
-            ordered_data.append(dict(ordered_row))
-        
-        return ordered_data
+        for chunk in self._iter_chunks(rows):
+            yield [{name: row[name] for name in field_names if name in row} for row in chunk]
+
+    def quote_identifier(self, name: str, dialect: str = None) -> str:
+        """按方言引用标识符（MySQL 使用反引号，PostgreSQL / SQLite 使用双引号）"""
+        if dialect == self.DIALECT_MYSQL:
+            return "`" + name.replace("`", "``") + "`"
+        if dialect in (self.DIALECT_POSTGRESQL, self.DIALECT_SQLITE):
+            return '"' + name.replace('"', '""') + '"'
+        return name
+
+    def quote_table(self, table_name: str, dialect: str = None) -> str:
+        """引用表名，支持 schema.table 形式"""
+        return ".".join(self.quote_identifier(part, dialect) for part in table_name.split("."))
+
+    def _literal_converter(self, dialect: str = None) -> Callable[[Any], str]:
+        """按方言选择值到 SQL 字面量的转换函数"""
+        if dialect == self.DIALECT_MYSQL:
+            return self._mysql_literal
+        if dialect == self.DIALECT_POSTGRESQL:
+            return self._postgresql_literal
+        return self._sql_value
+
+    @staticmethod
+    def _sql_value(val: Any) -> str:
+        """将单个值转换为 SQL 字面量（通用 / SQLite）"""
+        if isinstance(val, str):
+            # 转义单引号
+            return "'" + val.replace("'", "''") + "'"
+        if isinstance(val, bool):
+            return "1" if val else "0"
+        if val is None:
+            return "NULL"
+        return str(val)
+
+    @staticmethod
+    def _mysql_literal(val: Any) -> str:
+        """MySQL 字面量：反斜杠在字符串中是转义符，需要额外转义"""
+        if isinstance(val, str):
+            return "'" + val.replace("\\", "\\\\").replace("'", "''") + "'"
+        if isinstance(val, bool):
+            return "1" if val else "0"
+        if val is None:
+            return "NULL"
+        return str(val)
+
+    @staticmethod
+    def _postgresql_literal(val: Any) -> str:
+        """PostgreSQL 字面量：布尔值使用 TRUE / FALSE"""
+        if isinstance(val, str):
+            return "'" + val.replace("'", "''") + "'"
+        if isinstance(val, bool):
+            return "TRUE" if val else "FALSE"
+        if val is None:
+            return "NULL"
+        return str(val)
+
+    @staticmethod
+    def _tsv_lines(chunk: List[Dict[str, Any]], field_names: List[str], true_value: str, false_value: str) -> str:
+        """
+        按 PostgreSQL COPY 文本格式 / MySQL LOAD DATA 默认格式写出 TSV 行
+        反斜杠、制表符、换行、回车转义，NULL 写作 \\N
+        """
+        def escape(val: Any) -> str:
+            if val is None:
+                return "\\N"
+            if isinstance(val, bool):
+                return true_value if val else false_value
+            if isinstance(val, str):
+                return val.translate(_TSV_ESCAPES)
+            if isinstance(val, (dict, list)):
+                return json.dumps(val, ensure_ascii=False).translate(_TSV_ESCAPES)
+            return str(val)
+
+        return "".join(
+            "\t".join([escape(row.get(name, "")) for name in field_names]) + "\n"
+            for row in chunk
+        )
+
+
+# TSV 转义表
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
 
 
 # 单例实例
@@ -14,11 +14,14 @@ from datetime import datetime, timedelta
 from extensions import db
 from models import User, Project
 from models.history import GenerationHistory
+from services.job_service import generation_job_service
 
 
 class HistoryService:
     """历史记录服务"""
     
+    MAX_REPLAY_COUNT = 10000  # 重放一次性返回全部数据，与 /api/generate 非流式上限一致
+    
     def create_history(
         self,
         user_id: int,
@@ -30,7 +33,11 @@ class HistoryService:
         export_format: str = 'json',
         table_name: str = None,
         execution_time_ms: int = None,
-        data_size_bytes: int = None
+        data_size_bytes: int = None,
+        seed: int = None,
+        engine: str = None,
+        status: str = 'completed',
+        kind: str = None
     ) -> GenerationHistory:
         """创建历史记录"""
         history = GenerationHistory(
@@ -39,23 +46,53 @@ class HistoryService:
             template_id=template_id,
             name=name or f"生成 {row_count} 条数据",
             row_count=row_count,
+            seed=seed,
+            engine=engine,
             export_format=export_format,
             table_name=table_name,
             execution_time_ms=execution_time_ms,
             data_size_bytes=data_size_bytes,
-            status='completed'
+            status=status,
+            kind=kind
         )
         history.fields = fields
         history.save()
         
-        # 更新项目统计
-        if project_id:
+        # 更新项目统计（未完成的任务在完成时再统计）
+        if project_id and status == 'completed':
             project = Project.query.get(project_id)
             if project:
                 project.increment_generation(row_count)
         
         return history
     
+    def replay_history(self, history_id: int, user_id: int) -> Tuple[Optional[list], Optional[str]]:
+        """
+        按 配置 + 种子 重新生成历史数据
+        返回: (数据, 错误信息)
+        """
+        history = self.get_history(history_id, user_id=user_id)
+        if not history:
+            return None, "记录不存在或无权访问"
+        
+        if not history.replayable:
+            return None, "该记录未保存随机种子，无法重放"
+        
+        if history.row_count > self.MAX_REPLAY_COUNT:
+            return None, f"重放最多支持 {self.MAX_REPLAY_COUNT} 条数据，请使用相同种子流式生成"
+        
+        from services.data_generator_service import data_generator_service
+        if data_generator_service.resolve_engine(history.engine) != (history.engine or data_generator_service.ENGINE_ROW):
+            return None, f"生成引擎 {history.engine} 不可用，无法重放"
+        
+        data = data_generator_service.generate_data(
+            history.fields,
+            history.row_count,
+            engine=history.engine,
+            seed=history.seed
+        )
+        return data, None
+    
     def get_history(self, history_id: int, user_id: int = None) -> Optional[GenerationHistory]:
         """获取单条历史记录"""
         history = GenerationHistory.query.get(history_id)
@@ -140,6 +177,9 @@ class HistoryService:
         if history.user_id != user_id:
             return False, "无权删除此记录"
         
+        if history.kind == generation_job_service.KIND_JOB:
+            # 取消仍在运行的任务并删除结果文件
+            generation_job_service.discard_job(history)
         history.delete()
         return True, None
     
@@ -0,0 +1,327 @@
+"""
+生成任务服务
+异步执行大数据量生成任务：后台线程池生成、结果落盘、进度查询与下载
+进度、心跳与取消请求保存在数据库中，多进程部署时任一进程都可查询或取消任务；
+心跳超时的任务视为执行它的进程已退出
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, Tuple, Dict, Any
+
+from extensions import db
+from models.history import GenerationHistory
+
+
+class GenerationJobService:
+    """异步生成任务服务"""
+
+    MAX_ROWS = 10000000  # 单个任务最大生成行数
+
+    STATUS_PENDING = 'pending'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    FORMAT_NDJSON = 'ndjson'
+    KIND_JOB = 'job'  # 历史记录的 kind，区分异步任务与普通生成记录
+
+    HEARTBEAT_SECONDS = 5  # 本进程任务的进度与心跳写入间隔
+    DEFAULT_STALE_SECONDS = 60  # pending 任务超过该秒数没有心跳即视为已中断
+
+    def __init__(self):
+        self._app = None
+        self._executor = None
+        self._spool_dir = None
+        self._stale_seconds = self.DEFAULT_STALE_SECONDS
+        # 本进程中排队或运行的任务: job_uuid -> {rows_done, cancelled}
+        self._progress: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """初始化工作线程池、落盘目录与心跳线程"""
+        if self._executor:
+            return
+
+        self._app = app
+        self._spool_dir = app.config.get('GENERATION_JOB_DIR')
+        self._stale_seconds = app.config.get('GENERATION_JOB_STALE_SECONDS', self.DEFAULT_STALE_SECONDS)
+        os.makedirs(self._spool_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config.get('GENERATION_JOB_WORKERS', 2),
+            thread_name_prefix='generation-job'
+        )
+
+        # 已退出的进程留下的任务无人执行；其他进程中的任务仍有心跳，不受影响
+        with app.app_context():
+            self._fail_interrupted_jobs()
+        threading.Thread(target=self._heartbeat_loop, name='generation-job-heartbeat', daemon=True).start()
+
+    def _fail_interrupted_jobs(self):
+        """将心跳超时的 pending 任务标记为失败"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self._stale_seconds)
+        try:
+            if GenerationHistory.query.filter(
+                GenerationHistory.kind == self.KIND_JOB,
+                GenerationHistory.status == self.STATUS_PENDING,
+                db.func.coalesce(GenerationHistory.heartbeat_at, GenerationHistory.updated_at) < cutoff
+            ).update({'status': self.STATUS_FAILED, 'error_message': '服务重启，任务已中断'},
+                     synchronize_session=False):
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Failed to clean up interrupted jobs: {e}")
+
+    def _heartbeat_loop(self):
+        """定期写入本进程任务的进度与心跳、读取取消请求，并清理心跳超时的任务"""
+        while True:
+            time.sleep(self.HEARTBEAT_SECONDS)
+            with self._app.app_context():
+                try:
+                    self._heartbeat()
+                    self._fail_interrupted_jobs()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Generation job heartbeat failed: {e}")
+                finally:
+                    db.session.remove()
+
+    def _heartbeat(self):
+        """写入本进程任务（含排队中的任务）的进度与心跳；已被取消或删除的任务通知工作线程停止"""
+        with self._lock:
+            snapshot = {job_uuid: progress['rows_done'] for job_uuid, progress in self._progress.items()}
+        if not snapshot:
+            return
+
+        now = datetime.utcnow()
+        for job_uuid, rows_done in snapshot.items():
+            GenerationHistory.query.filter_by(uuid=job_uuid, status=self.STATUS_PENDING).update(
+                {'rows_done': rows_done, 'heartbeat_at': now}, synchronize_session=False
+            )
+        live = {
+            job_uuid for job_uuid, cancel_requested in db.session.query(
+                GenerationHistory.uuid, GenerationHistory.cancel_requested
+            ).filter(GenerationHistory.uuid.in_(list(snapshot))).all()
+            if not cancel_requested
+        }
+        db.session.commit()
+
+        with self._lock:
+            for job_uuid in snapshot:
+                if job_uuid not in live and job_uuid in self._progress:
+                    self._progress[job_uuid]['cancelled'] = True
+
+    def _spool_path(self, job_uuid: str) -> str:
+        """任务结果文件路径"""
+        return os.path.join(self._spool_dir, f'{job_uuid}.{self.FORMAT_NDJSON}')
+
+    # ------------------------------------------------------------------
+    # 提交与执行
+    # ------------------------------------------------------------------
+
+    def submit_job(
+        self,
+        user_id: int,
+        fields: list,
+        count: int,
+        engine: str = None,
+        seed: int = None,
+        name: str = None,
+        project_id: int = None,
+        template_id: str = None
+    ) -> Tuple[Optional[GenerationHistory], Optional[str]]:
+        """
+        提交生成任务
+        返回: (任务对应的历史记录, 错误信息)
+        """
+        if not self._executor:
+            return None, "任务服务未初始化"
+
+        from services.history_service import history_service
+        from services.data_generator_service import data_generator_service
+
+        # 多进程生成未指定种子时使用的种子记录到任务，结果可以重放
+        seed = data_generator_service.resolve_seed(count, self._app.config.get('GENERATION_WORKERS'), seed)
+        job = history_service.create_history(
+            user_id=user_id,
+            fields=fields,
+            row_count=count,
+            name=name or f"[任务] 生成 {count} 条数据",
+            project_id=project_id,
+            template_id=template_id,
+            export_format=self.FORMAT_NDJSON,
+            seed=seed,
+            engine=engine,
+            status=self.STATUS_PENDING,
+            kind=self.KIND_JOB
+        )
+
+        with self._lock:
+            self._progress[job.uuid] = {'rows_done': 0, 'cancelled': False}
+        self._executor.submit(self._run_job, job.uuid)
+        return job, None
+
+    def _run_job(self, job_uuid: str):
+        """在工作线程中执行任务"""
+        with self._app.app_context():
+            try:
+                self._do_run_job(job_uuid)
+            finally:
+                db.session.remove()
+                with self._lock:
+                    self._progress.pop(job_uuid, None)
+
+    def _do_run_job(self, job_uuid: str):
+        """分块生成并写入结果文件，完成后更新历史记录状态"""
+        from services.data_generator_service import data_generator_service
+
+        job = GenerationHistory.find_by_uuid(job_uuid)
+        if not job or job.status != self.STATUS_PENDING:
+            # 排队期间已被删除或判定中断
+            return
+
+        progress = self._progress[job_uuid]
+        path = self._spool_path(job_uuid)
+        part_path = path + '.part'
+        start_time = time.time()
+        data_size_bytes = 0
+
+        values = {}
+        try:
+            if job.cancel_requested:
+                raise RuntimeError('任务已取消')
+            with open(part_path, 'wb') as f:
+                for payload in data_generator_service.iter_chunks(
+                    job.fields, job.row_count, engine=job.engine, seed=job.seed,
+                    workers=self._app.config.get('GENERATION_WORKERS'), serialize=True
+                ):
+                    if progress['cancelled']:
+                        raise RuntimeError('任务已取消')
+                    f.write(payload)
+                    data_size_bytes += len(payload)
+                    progress['rows_done'] += payload.count(b'\n')
+            os.replace(part_path, path)
+
+            values.update(status=self.STATUS_COMPLETED, data_size_bytes=data_size_bytes)
+        except Exception as e:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            values.update(status=self.STATUS_FAILED, error_message=str(e))
+            print(f"Generation job {job_uuid} failed: {e}")
+
+        values.update(
+            rows_done=progress['rows_done'],
+            execution_time_ms=int((time.time() - start_time) * 1000)
+        )
+        # 条件更新：任务在运行期间被删除或判定中断时不覆盖
+        updated = GenerationHistory.query.filter_by(id=job.id, status=self.STATUS_PENDING).update(
+            values, synchronize_session=False
+        )
+        db.session.commit()
+        if not updated:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+
+        if values['status'] == self.STATUS_COMPLETED and job.project_id:
+            from models import Project
+            project = Project.query.get(job.project_id)
+            if project:
+                project.increment_generation(job.row_count)
+
+    # ------------------------------------------------------------------
+    # 查询、取消与下载
+    # ------------------------------------------------------------------
+
+    def get_job(self, job_uuid: str, user_id: int) -> Optional[GenerationHistory]:
+        """获取任务（仅限本人）"""
+        job = GenerationHistory.find_by_uuid(job_uuid)
+        if not job or job.user_id != user_id or job.kind != self.KIND_JOB:
+            return None
+        return job
+
+    def get_job_state(self, job: GenerationHistory, refresh: bool = False) -> Dict[str, Any]:
+        """
+        任务状态与进度；refresh 为 True 时从数据库重新读取（其他进程写入的进度）
+        任务在本进程中运行时使用内存中的最新进度
+        """
+        if refresh:
+            # 结束当前事务，读取其他进程提交的最新状态
+            db.session.commit()
+            job = GenerationHistory.query.populate_existing().filter_by(id=job.id).first() or job
+
+        with self._lock:
+            progress = self._progress.get(job.uuid)
+            local_rows = progress['rows_done'] if progress else None
+
+        status = job.status
+        if status == self.STATUS_COMPLETED:
+            rows_done = job.row_count
+        else:
+            rows_done = local_rows if local_rows is not None else (job.rows_done or 0)
+
+        data = job.to_dict(include_fields=False)
+        data.update({
+            'status': status,
+            'rows_done': rows_done,
+            'progress': round(rows_done / job.row_count, 4) if job.row_count else 1.0,
+            'downloadable': status == self.STATUS_COMPLETED and os.path.exists(self._spool_path(job.uuid))
+        })
+        return data
+
+    def cancel_job(self, job: GenerationHistory) -> Tuple[bool, Optional[str]]:
+        """
+        取消运行中的任务，或删除已完成任务的结果文件
+        取消请求写入数据库，执行任务的进程在下次心跳时停止（本进程中的任务立即停止）
+        返回: (成功, 错误信息)
+        """
+        if self._request_cancel(job):
+            return True, None
+
+        path = self._spool_path(job.uuid)
+        if not os.path.exists(path):
+            return False, "任务结果不存在"
+        os.remove(path)
+        return True, None
+
+    def discard_job(self, job: GenerationHistory) -> None:
+        """删除任务记录前调用：取消仍在运行的任务并删除结果文件"""
+        self._request_cancel(job)
+        path = self._spool_path(job.uuid)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _request_cancel(self, job: GenerationHistory) -> bool:
+        """请求取消 pending 任务，任务已结束时返回 False"""
+        requested = GenerationHistory.query.filter_by(id=job.id, status=self.STATUS_PENDING).update(
+            {'cancel_requested': True}, synchronize_session=False
+        )
+        db.session.commit()
+        with self._lock:
+            progress = self._progress.get(job.uuid)
+            if progress:
+                progress['cancelled'] = True
+        return bool(requested)
+
+    def get_result_path(self, job: GenerationHistory) -> Tuple[Optional[str], Optional[str]]:
+        """
+        获取已完成任务的结果文件
+        返回: (文件路径, 错误信息)
+        """
+        if job.status == self.STATUS_PENDING:
+            return None, "任务尚未完成"
+        if job.status == self.STATUS_FAILED:
+            return None, f"任务失败: {job.error_message}"
+
+        path = self._spool_path(job.uuid)
+        if not os.path.exists(path):
+            return None, "任务结果已被删除"
+        return path, None
+
+
+# 单例实例
+generation_job_service = GenerationJobService()
@@ -0,0 +1,241 @@
+"""
+外键键池
+每个被引用的源表列只物化一份键值，所有引用它的关系共享；
+外键采样只抽取行号（整数数组），再按行号批量取键，不复制或打乱键值本身
+"""
+import random
+from typing import List, Any, Iterable, Dict
+
+try:
+    import numpy as np
+except ImportError:  # 未安装 numpy 时退化为列表存储与逐个采样
+    np = None
+
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def make_rng(seed: int = None):
+    """采样使用的随机数生成器：有 numpy 时为 numpy Generator，否则为 random.Random"""
+    if np is not None:
+        return np.random.default_rng(seed)
+    return random.Random(seed) if seed is not None else random.Random()
+
+
+class KeyPool:
+    """
+    一个源表列的键池
+    - 整数键存为 int64 数组，不保留 Python int 对象
+    - compact 为 True 时 ASCII 字符串键（如 UUID）存为定长字节数组，不保留 Python str 对象，
+      适用于源表行不再保留在内存中的场景
+    - 其他键存为对象数组，只保存对源表中已有值的引用
+    """
+
+    def __init__(self, values: List[Any], compact: bool = False):
+        self._size = len(values)
+        if np is None:
+            self._keys = values
+        else:
+            self._keys = _to_array(values, compact)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], column: str) -> "KeyPool":
+        """由源表的行构建某一列的键池"""
+        return cls([row.get(column) for row in rows])
+
+    @classmethod
+    def from_chunks(cls, chunks: List[List[Any]]) -> "KeyPool":
+        """由逐块收集的键值构建紧凑键池（每块已由 compact_chunk 转换）"""
+        pool = cls([])
+        chunks = [chunk for chunk in chunks if len(chunk)]
+        if np is None:
+            pool._keys = [value for chunk in chunks for value in chunk]
+        elif chunks:
+            kinds = {chunk.dtype.kind for chunk in chunks}
+            if len(kinds) > 1:
+                # 各块类型不一致时统一退化为对象数组
+                chunks = [chunk.astype(str).astype(object) if chunk.dtype.kind == 'S' else chunk.astype(object)
+                          for chunk in chunks]
+            pool._keys = np.concatenate(chunks)
+        pool._size = len(pool._keys)
+        return pool
+
+    @staticmethod
+    def compact_chunk(values: List[Any]):
+        """将一块键值转换为紧凑存储，供 from_chunks 合并"""
+        return values if np is None else _to_array(values, True)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """键池自身占用的字节数（不含被引用的对象）"""
+        if np is not None:
+            return int(self._keys.nbytes)
+        return self._size * 8
+
+    def take(self, indices) -> List[Any]:
+        """按行号批量取键"""
+        if np is not None:
+            keys = self._keys[indices]
+            return (keys.astype(str) if keys.dtype.kind == 'S' else keys).tolist()
+        keys = self._keys
+        return [keys[i] for i in indices]
+
+    def uniform_indices(self, rng, count: int):
+        """均匀有放回地抽取 count 个行号"""
+        if np is not None:
+            return rng.integers(0, self._size, count)
+        randrange, size = rng.randrange, self._size
+        return [randrange(size) for _ in range(count)]
+
+    def zipf_indices(self, rng, count: int, s: float):
+        """
+        按 Zipf 分布有放回地抽取 count 个行号：第 k 热的键权重为 1 / k^s，热度排名随机分配给各行
+        先按多项分布一次抽出每个键的命中次数，再展开打乱，避免逐个样本二分查找
+        """
+        if np is not None:
+            weights = (rng.permutation(self._size) + 1.0) ** -s
+            return self.fanout_indices(rng, rng.multinomial(count, weights / weights.sum()))
+        ranks = list(range(1, self._size + 1))
+        rng.shuffle(ranks)
+        cumulative, total = [], 0.0
+        for rank in ranks:
+            total += rank ** -s
+            cumulative.append(total)
+        return rng.choices(range(self._size), cum_weights=cumulative, k=count)
+
+    def fanout_indices(self, rng, fanouts):
+        """每个行号按其扇出数重复后随机打乱：fanouts[i] 为第 i 个键对应的子行数"""
+        if np is not None:
+            return rng.permutation(np.repeat(np.arange(self._size), fanouts))
+        indices = [i for i, fanout in enumerate(fanouts) for _ in range(fanout)]
+        rng.shuffle(indices)
+        return indices
+
+    def normal_fanouts(self, rng, mean: float, stddev: float):
+        """每个键的子行数服从均值 mean、标准差 stddev 的正态分布（四舍五入，小于 0 取 0）"""
+        if np is not None:
+            return np.maximum(np.rint(rng.normal(mean, stddev, self._size)), 0).astype(np.int64)
+        return [max(int(round(rng.gauss(mean, stddev))), 0) for _ in range(self._size)]
+
+    def range_fanouts(self, rng, low: int, high: int):
+        """每个键的子行数在 [low, high] 内均匀分布"""
+        if np is not None:
+            return rng.integers(low, high + 1, self._size)
+        return [rng.randint(low, high) for _ in range(self._size)]
+
+    def permutation_indices(self, rng, count: int):
+        """随机排列行号后循环取前 count 个：count 不超过键数时每个键至多使用一次"""
+        if np is not None:
+            return np.resize(rng.permutation(self._size), count)
+        order = list(range(self._size))
+        rng.shuffle(order)
+        return [order[i % self._size] for i in range(count)]
+
+
+def _to_array(values: List[Any], compact: bool):
+    """键值列表 -> numpy 数组：int64、定长 ASCII 字节（compact）或对象数组"""
+    if values and all(type(v) is int and INT64_MIN <= v <= INT64_MAX for v in values):
+        return np.fromiter(values, dtype=np.int64, count=len(values))
+    if compact and values and all(type(v) is str and v.isascii() and not v.endswith('\0') for v in values):
+        return np.array(values, dtype=bytes)
+    keys = np.empty(len(values), dtype=object)
+    keys[:] = values
+    return keys
+
+
+MAX_PAIR_ROUNDS = 64  # 多对多补抽的最大轮数
+
+
+def sample_pairs(rng, n_source: int, n_target: int, min_per_source: int, max_per_source: int,
+                 max_per_target: int = None):
+    """
+    为多对多关联表抽取不重复的 (源行号, 目标行号) 对
+    每个源行关联 [min_per_source, max_per_source] 个不同的目标行（不超过目标行数），
+    max_per_target 限制每个目标行被关联的次数
+    行对编码为 源行号 * n_target + 目标行号 的 int64，排序去重后按缺额补抽，
+    结果按源行号、目标行号有序
+    :return: (源行号数组, 目标行号数组)
+    """
+    if n_source == 0 or n_target == 0:
+        return [], []
+    if np is None:
+        return _sample_pairs_python(rng, n_source, n_target, min_per_source, max_per_source, max_per_target)
+
+    if n_source * n_target > INT64_MAX:
+        raise ValueError("多对多两侧行数的乘积超出 int64 范围")
+
+    degrees = np.minimum(rng.integers(min_per_source, max_per_source + 1, n_source), n_target)
+    codes = np.empty(0, dtype=np.int64)
+    deficit = degrees
+
+    if max_per_target is None:
+        # 关联数超过目标行数一半的源行直接无放回抽取，避免随机补抽收敛过慢
+        dense = np.flatnonzero(degrees * 2 > n_target)
+        if len(dense):
+            codes = np.sort(np.concatenate([
+                source * n_target + rng.choice(n_target, degrees[source], replace=False) for source in dense
+            ]))
+            deficit = degrees.copy()
+            deficit[dense] = 0
+
+    for _ in range(MAX_PAIR_ROUNDS):
+        sources = np.repeat(np.arange(n_source, dtype=np.int64), deficit)
+        if not len(sources):
+            break
+        if max_per_target is None:
+            targets = rng.integers(0, n_target, len(sources))
+        else:
+            used = np.bincount(codes % n_target, minlength=n_target)
+            open_targets = np.flatnonzero(used < max_per_target)
+            if not len(open_targets):
+                break
+            targets = open_targets[rng.integers(0, len(open_targets), len(sources))]
+
+        codes = _sorted_unique(np.concatenate([codes, sources * n_target + targets]))
+
+        if max_per_target is not None:
+            # 超出上限的目标行随机保留 max_per_target 个关联
+            targets = codes % n_target
+            order = np.lexsort((rng.random(len(codes)), targets))
+            sorted_targets = targets[order]
+            group_start = np.searchsorted(sorted_targets, sorted_targets, side='left')
+            rank = np.arange(len(codes)) - group_start
+            codes = np.sort(codes[order[rank < max_per_target]])
+
+        deficit = np.maximum(degrees - np.bincount(codes // n_target, minlength=n_source), 0)
+
+    return codes // n_target, codes % n_target
+
+
+def _sorted_unique(codes):
+    """原地排序后去重（np.unique 在新版 numpy 中走哈希路径，大数组上反而更慢）"""
+    codes.sort()
+    if len(codes) < 2:
+        return codes
+    keep = np.empty(len(codes), dtype=bool)
+    keep[0] = True
+    np.not_equal(codes[1:], codes[:-1], out=keep[1:])
+    return codes[keep]
+
+
+def _sample_pairs_python(rng, n_source, n_target, min_per_source, max_per_source, max_per_target):
+    """未安装 numpy 时逐个源行抽取，用集合去重"""
+    used = [0] * n_target
+    sources, targets = [], []
+    for source in range(n_source):
+        degree = min(rng.randint(min_per_source, max_per_source), n_target)
+        chosen = set()
+        for _ in range(degree * MAX_PAIR_ROUNDS):
+            if len(chosen) == degree:
+                break
+            target = rng.randrange(n_target)
+            if target in chosen or (max_per_target is not None and used[target] >= max_per_target):
+                continue
+            chosen.add(target)
+            used[target] += 1
+        for target in sorted(chosen):
+            sources.append(source)
+            targets.append(target)
+    return sources, targets
@@ -1,104 +1,619 @@
-
 from services.data_generator_service import data_generator_service
+from services.export_service import export_service
+from services.key_pool import KeyPool, make_rng, sample_pairs
+from services import tree_builder
+import json
 import random
-import uuid
+import zipfile
+
+
+class _ArchiveSink:
+    """
+    ZipFile 的输出缓冲：只支持写入（不可 seek），ZipFile 因此在每个条目后写数据描述符，
+    写入的字节由 drain 取出后即可发送
+    """
+
+    def __init__(self):
+        self._parts = []
+        self.size = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        """取出并清空已写入的字节"""
+        data = b''.join(self._parts)
+        self._parts = []
+        self.size = 0
+        return data
+
 
 class RelationGeneratorService:
-    def generate_relation_data(self, tables, relations):
+    ARCHIVE_COMPRESS_LEVEL = 1  # ZIP 中数据文件的 deflate 级别：生成速度优先
+
+    ONE_TO_ONE = 'one-to-one'
+    ONE_TO_MANY = 'one-to-many'
+    MANY_TO_MANY = 'many-to-many'
+    SELF_REFERENCING = 'self-referencing'  # 自引用（树形结构），源表与目标表为同一张表
+
+    # 一对多的分布：uniform / zipf 按目标表行数抽取父行；normal / fixed 按父行扇出数决定目标表行数
+    DISTRIBUTIONS = ['uniform', 'zipf', 'normal', 'fixed']
+    FANOUT_DISTRIBUTIONS = ('normal', 'fixed')
+    DEFAULT_MIN_PER_SOURCE = 1  # 多对多时每个源行默认关联的目标行数范围
+    DEFAULT_MAX_PER_SOURCE = 3
+    DEFAULT_TREE_FANOUT = 3  # 树形结构默认每个节点的子节点数（skewed 时为上限）
+
+    def build_dependency_graph(self, tables, relations):
+        """
+        由关系配置构建表之间的依赖图（源表 -> 目标表），并校验关系引用的表和列
+        多对多关系不在两张表之间加边，而是生成一张依赖两侧的关联表
+        :return: (table_map, parents, children, incoming)
+                 table_map: {表名: 表配置}，包含多对多关系对应的关联表；
+                 parents: {表名: 依赖的源表集合}；children: {表名: 依赖它的目标表集合}；
+                 incoming: {表名: [(关系序号, 关系)]}，即需要在该表生成时填充的外键列（或关联表对应的关系）
+        自引用关系不加边（同一张表内父行总在子行之前生成），只记入该表的 incoming
+        :raises ValueError: 表或列不存在、同一外键列被多个关系填充、关联表或树形结构配置无效
+        """
+        table_map = {}
+        for table in tables:
+            if table['name'] in table_map:
+                raise ValueError(f"表名重复: {table['name']}")
+            table_map[table['name']] = table
+
+        parents = {name: set() for name in table_map}
+        children = {name: set() for name in table_map}
+        incoming = {name: [] for name in table_map}
+        filled_columns = {}
+
+        for rel_index, rel in enumerate(relations):
+            source_name, target_name = rel['sourceTable'], rel['targetTable']
+            for name in (source_name, target_name):
+                if name not in table_map:
+                    raise ValueError(f"关系引用了不存在的表: {name}")
+
+            for name, column in self._referenced_columns(rel) or [(source_name, rel['sourceColumn'])]:
+                if column not in {field['name'] for field in table_map[name]['fields']}:
+                    raise ValueError(f"关系引用了不存在的列: {name}.{column}")
+
+            if rel['relationType'] == self.SELF_REFERENCING:
+                tree = self._tree_spec(rel, rel_index)
+                count = table_map[target_name].get('count')
+                if tree['shape'] == tree_builder.SHAPE_BALANCED and tree['depth'] is not None \
+                        and isinstance(count, int) and count > tree_builder.tree_capacity(tree['fanout'], tree['depth']):
+                    raise ValueError(
+                        f"表 {target_name} 的行数 {count} 超出 fanout={tree['fanout']}、depth={tree['depth']} 的树的容量"
+                    )
+                if any(self._decides_count(other, i) for i, other in incoming[target_name]):
+                    raise ValueError(f"表 {target_name} 的行数只能由一个按扇出分布的关系或自引用关系决定")
+                for column in tree['columns']:
+                    if (target_name, column) in filled_columns:
+                        raise ValueError(f"外键列 {target_name}.{column} 被多个关系填充")
+                    filled_columns[(target_name, column)] = rel_index
+                incoming[target_name].append((rel_index, rel))
+                continue
+            if source_name == target_name and rel['relationType'] != self.MANY_TO_MANY:
+                raise ValueError(f"表 {source_name} 的关系引用自身，请使用 {self.SELF_REFERENCING} 类型")
+
+            if rel['relationType'] == self.MANY_TO_MANY:
+                junction = self._junction_spec(rel, rel_index)
+                if junction['name'] in table_map:
+                    raise ValueError(f"关联表名与已有表重复: {junction['name']}")
+                table_map[junction['name']] = junction
+                parents[junction['name']] = {source_name, target_name}
+                children[junction['name']] = set()
+                incoming[junction['name']] = [(rel_index, rel)]
+                children[source_name].add(junction['name'])
+                children[target_name].add(junction['name'])
+                continue
+
+            column = (target_name, rel['targetColumn'])
+            if column in filled_columns:
+                raise ValueError(f"外键列 {target_name}.{rel['targetColumn']} 被多个关系填充")
+            filled_columns[column] = rel_index
+
+            if self._distribution(rel, rel_index)['type'] in self.FANOUT_DISTRIBUTIONS:
+                if any(self._decides_count(other, i) for i, other in incoming[target_name]):
+                    raise ValueError(f"表 {target_name} 的行数只能由一个按扇出分布的关系或自引用关系决定")
+
+            parents[target_name].add(source_name)
+            children[source_name].add(target_name)
+            incoming[target_name].append((rel_index, rel))
+
+        return table_map, parents, children, incoming
+
+    def _referenced_columns(self, rel):
+        """
+        关系需要从其他表读取键值的 (表名, 列名)：外键关系为源表的键，多对多为两侧的键；
+        自引用关系读取的是本表正在生成的键，不需要键池
+        """
+        if rel['relationType'] == self.SELF_REFERENCING:
+            return []
+        columns = [(rel['sourceTable'], rel['sourceColumn'])]
+        if rel['relationType'] == self.MANY_TO_MANY:
+            columns.append((rel['targetTable'], rel['targetColumn']))
+        return columns
+
+    def _distribution(self, rel, rel_index):
+        """
+        一对多关系的分布配置，distribution 可为类型名或 {type, ...}：
+        - uniform: 均匀抽取父行（默认）
+        - zipf: {s} 父行热度服从 Zipf 分布，s 越大越集中（默认 1.0）
+        - normal: {mean, stddev} 每个父行的子行数服从正态分布，目标表行数 = 子行数之和
+        - fixed: {min, max} 每个父行的子行数在 [min, max] 内，目标表行数 = 子行数之和
+        """
+        distribution = rel.get('distribution') or 'uniform'
+        if isinstance(distribution, str):
+            distribution = {'type': distribution}
+        if rel['relationType'] != self.ONE_TO_MANY:
+            return {'type': 'uniform'}
+
+        dist_type = distribution.get('type') or 'uniform'
+        if dist_type not in self.DISTRIBUTIONS:
+            raise ValueError(f"关系 {rel_index + 1} 的 distribution 必须为 {self.DISTRIBUTIONS} 之一")
+
+        def number(key, default, minimum=0):
+            value = distribution.get(key, default)
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or value < minimum:
+                raise ValueError(f"关系 {rel_index + 1} 的分布参数 {key} 无效")
+            return value
+
+        if dist_type == 'zipf':
+            return {'type': dist_type, 's': number('s', 1.0)}
+        if dist_type == 'normal':
+            return {'type': dist_type, 'mean': number('mean', 1), 'stddev': number('stddev', 1)}
+        if dist_type == 'fixed':
+            low, high = number('min', 1), number('max', 1)
+            if int(low) != low or int(high) != high or low > high:
+                raise ValueError(f"关系 {rel_index + 1} 的分布参数 min / max 必须为整数且 min 不大于 max")
+            return {'type': dist_type, 'min': int(low), 'max': int(high)}
+        return {'type': dist_type}
+
+    def _decides_count(self, rel, rel_index):
+        """关系是否决定目标表的行数（按扇出分布的一对多关系，或 skewed 树可能提前结束的自引用关系）"""
+        if rel['relationType'] == self.SELF_REFERENCING:
+            return True
+        return self._distribution(rel, rel_index)['type'] in self.FANOUT_DISTRIBUTIONS
+
+    def _tree_spec(self, rel, rel_index):
+        """
+        自引用（树形结构）配置：sourceColumn 为节点键，targetColumn 为父节点键列（根节点为空）
+        可选项：shape balanced / skewed，fanout 每个节点的子节点数（skewed 时为上限），depth 最大层数，
+        skew skewed 时子节点数分布的偏斜程度，levelColumn 层级列，pathColumn 物化路径列（pathSeparator 分隔符），
+        leftColumn / rightColumn 嵌套集合左右值列
+        """
+        if rel['sourceTable'] != rel['targetTable']:
+            raise ValueError(f"关系 {rel_index + 1} 为 {self.SELF_REFERENCING} 时源表与目标表必须相同")
+
+        spec = {
+            'shape': rel.get('shape') or tree_builder.SHAPE_BALANCED,
+            'fanout': rel.get('fanout', self.DEFAULT_TREE_FANOUT),
+            'depth': rel.get('depth'),
+            'skew': rel.get('skew', 1.0),
+            'key_column': rel['sourceColumn'],
+            'parent_column': rel['targetColumn'],
+            'level_column': rel.get('levelColumn'),
+            'path_column': rel.get('pathColumn'),
+            'path_separator': rel.get('pathSeparator') or '/',
+            'left_column': rel.get('leftColumn'),
+            'right_column': rel.get('rightColumn'),
+        }
+        if spec['shape'] not in tree_builder.SHAPES:
+            raise ValueError(f"关系 {rel_index + 1} 的 shape 必须为 {tree_builder.SHAPES} 之一")
+        for key in ('fanout', 'depth'):
+            value = spec[key]
+            if value is None and key == 'depth':
+                continue
+            if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                raise ValueError(f"关系 {rel_index + 1} 的 {key} 必须为正整数")
+        if not isinstance(spec['skew'], (int, float)) or isinstance(spec['skew'], bool) or spec['skew'] < 0:
+            raise ValueError(f"关系 {rel_index + 1} 的 skew 必须为非负数")
+        if bool(spec['left_column']) != bool(spec['right_column']):
+            raise ValueError(f"关系 {rel_index + 1} 的 leftColumn 与 rightColumn 需要同时指定")
+
+        spec['columns'] = [
+            column for column in (spec['parent_column'], spec['level_column'], spec['path_column'],
+                                  spec['left_column'], spec['right_column'])
+            if column
+        ]
+        if spec['key_column'] in spec['columns'] or len(set(spec['columns'])) != len(spec['columns']):
+            raise ValueError(f"关系 {rel_index + 1} 的树形结构列名重复")
+        return spec
+
+    def _junction_spec(self, rel, rel_index):
+        """
+        多对多关联表配置
+        可选项：junctionTable 表名，junctionSourceColumn / junctionTargetColumn 列名，
+        minPerSource / maxPerSource 每个源行关联的目标行数范围，maxPerTarget 每个目标行最多被关联的次数
+        """
+        source_name, target_name = rel['sourceTable'], rel['targetTable']
+        spec = {
+            'name': rel.get('junctionTable') or f"{source_name}_{target_name}",
+            'junction': True,
+            'source_column': rel.get('junctionSourceColumn') or f"{source_name}_{rel['sourceColumn']}",
+            'target_column': rel.get('junctionTargetColumn') or f"{target_name}_{rel['targetColumn']}",
+            'min_per_source': rel.get('minPerSource', self.DEFAULT_MIN_PER_SOURCE),
+            'max_per_source': rel.get('maxPerSource', self.DEFAULT_MAX_PER_SOURCE),
+            'max_per_target': rel.get('maxPerTarget'),
+        }
+        if spec['source_column'] == spec['target_column']:
+            raise ValueError(
+                f"关联表 {spec['name']} 的两列同名，请通过 junctionSourceColumn / junctionTargetColumn 指定列名"
+            )
+
+        for key in ('min_per_source', 'max_per_source', 'max_per_target'):
+            value = spec[key]
+            if value is None and key == 'max_per_target':
+                continue
+            if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"关系 {rel_index + 1} 的关联数量必须为非负整数")
+        if spec['min_per_source'] > spec['max_per_source']:
+            raise ValueError(f"关系 {rel_index + 1} 的 minPerSource 不能大于 maxPerSource")
+        return spec
+
+    def topological_order(self, tables, relations):
+        """
+        按依赖关系排序表名（Kahn 算法），源表总在引用它的目标表之前；无依赖关系的表保持配置顺序
+        :raises ValueError: 存在循环依赖时报告环上的表
+        """
+        _, parents, children, _ = self.build_dependency_graph(tables, relations)
+        return self._sort(parents, children)
+
+    def _sort(self, parents, children):
+        """对依赖图做拓扑排序，存在环时抛出 ValueError"""
+        remaining = {name: len(deps) for name, deps in parents.items()}
+        position = {name: i for i, name in enumerate(parents)}
+        ready = [name for name, count in remaining.items() if count == 0]
+        order = []
+
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for child in sorted(children[name], key=position.get):
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    ready.append(child)
+
+        if len(order) < len(parents):
+            cycle = self._find_cycle({name: deps for name, deps in parents.items() if remaining[name] > 0})
+            raise ValueError(f"表之间存在循环依赖: {' -> '.join(cycle)}")
+        return order
+
+    @staticmethod
+    def _find_cycle(parents):
+        """在未能排序的子图中找出一个环，返回 [A, B, ..., A]"""
+        name = next(iter(parents))
+        path, seen = [], {}
+        # 剩余每个节点至少有一个剩余的源表，沿源表回溯必然回到已访问的节点
+        while name not in seen:
+            seen[name] = len(path)
+            path.append(name)
+            name = sorted(parent for parent in parents[name] if parent in parents)[0]
+        cycle = path[seen[name]:] + [name]
+        return list(reversed(cycle))
+
+    def generate_relation_data(self, tables, relations, seed=None, workers=None):
         """
         生成关联数据
+        按依赖关系的拓扑顺序逐表生成：源表生成完成后才生成引用它的目标表；
+        行生成受 GIL 限制，不按表并发，大表由 workers 多进程分片并行生成；
+        外键列在生成目标表时直接由源表的键填充，不先生成再覆盖；
+        多对多关系在两侧表生成后输出一张不含重复行对的关联表
         :param tables: list of dict, 每个表的配置 {id, name, count, fields}
         :param relations: list of dict, 关系配置 {sourceTable, sourceColumn, targetTable, targetColumn, relationType}
-        :return: dict, {tableName: [rows]}
-        """
-        result_data = {}
-        
-        # 1. 首先生成所有表的基础数据（不包含外键）
-        table_map = {t['name']: t for t in tables}
-        
-        # 确定生成顺序（拓扑排序的简化版，这里先假设这里没有循环依赖且用户定义顺序合理，或者先生成所有主数据后再填补外键）
-        # 更好的策略：先生成所有非外键数据，再处理外键关联
-        
-        for table in tables:
-            # 过滤掉作为外键的目标列，这些列的数据需要后续根据关系生成
-            # 但 DataGeneratorService 需要知道所有列。
-            # 策略：先让 DataGeneratorService 生成所有数据，对于外键列，我们稍后覆盖它们。
-            
-            # 转换 fields 格式以匹配 DataGeneratorService
-            # 前端 fields包含 id, name, type. 后端需要 type, name, options
-            # 注意：前端 RelationPage 的 fields 只有简单的 id, name, type。需要适配。
-            
-            gen_fields = []
-            fk_columns = set()
-            
-            # 找出该表作为目标表的所有关系，标记外键列
-            for rel in relations:
-                if rel['targetTable'] == table['name']:
-                    fk_columns.add(rel['targetColumn'])
-            
-            for field in table['fields']:
-                # 如果是外键列，暂时作为 string 生成，稍后覆盖
-                # 或者可以传递特殊类型给 DataGenerator? 不，直接生成即可，反正要覆盖。
-                gen_fields.append({
-                    "name": field['name'],
-                    "type": field['type'],
-                    "options": {}
-                })
-            
-            rows = data_generator_service.generate_data(gen_fields, table['count'])
-            result_data[table['name']] = rows
-            
-        # 2. 处理关系，填充/覆盖外键数据
+        :param seed: int, 随机种子（可选），每张表和每个关系使用由其派生的独立随机数流
+        :param workers: int, 多进程分片生成的进程数（可选），大表按分片并行生成
+        :return: dict, {tableName: [rows]}，按配置中表的顺序，关联表排在最后
+        :raises ValueError: 关系配置无效或存在循环依赖
+        """
+        table_map, parents, children, incoming = self.build_dependency_graph(tables, relations)
+        # 先完成排序，循环依赖在生成任何数据之前报告
+        order = self._sort(parents, children)
+
+        # 每个被引用的列只建一个键池，所有引用它的关系共享
+        referenced = {name: set() for name in table_map}
         for rel in relations:
-            source_table_name = rel['sourceTable']
-            target_table_name = rel['targetTable']
-            source_col = rel['sourceColumn']
-            target_col = rel['targetColumn']
-            rel_type = rel['relationType']
-            
-            if source_table_name not in result_data or target_table_name not in result_data:
-                continue
-                
-            source_rows = result_data[source_table_name]
-            target_rows = result_data[target_table_name]
-            
-            # 获取源表的所有可用 ID (或其他关联键)
-            source_keys = [row.get(source_col) for row in source_rows]
-            
-            if not source_keys:
-                continue
-                
-            if rel_type == 'one-to-one':
-                # 一对一：目标表的每一行对应源表的一个唯一行
-                # 如果目标表行数 > 源表行数，则无法唯一，只能循环或报错。这里选择循环使用但尽量唯一。
-                # 实际上 1:1 通常要求行数一致。我们这里打乱源key然后赋值。
-                shuffled_keys = source_keys.copy()
-                random.shuffle(shuffled_keys)
-                
-                for i, row in enumerate(target_rows):
-                    key = shuffled_keys[i % len(shuffled_keys)]
-                    row[target_col] = key
-                    
-            elif rel_type == 'one-to-many':
-                # 一对多：目标表的每一行关联到源表的一个行（源表是"一"，目标表是"多"）
-                # 例如 User(1) -> Orders(N)。Order 表中的 user_id 从 User 表 id 中随机选。
-                for row in target_rows:
-                    row[target_col] = random.choice(source_keys)
-                    
-            elif rel_type == 'many-to-many':
-                # 多对多：通常不直接修改这两个表，而是应该有一个中间表。
-                # 但如果用户的配置是直接连，这通常是不合逻辑的物理模型。
-                # 假设用户想模拟的是：通过某种方式关联。
-                # 对于标准的多对多，通常是生成第三张表。
-                # 但此处的 UI 只有 "表" 和 "关系"。如果这是逻辑关系，生成数据时如何体现？
-                # 如果用户定义了 T1 和 T2 多对多，且指定了 T1.id 和 T2.uid... 这在物理上通常意味着 T2 有个 uid 指向 T1，但这只是 1:N。
-                # 如果是 T1 和 T2 多对多，通常意味着存在 T3 (T1_id, T2_id)。
-                # 鉴于此工具的简单性，如果用户选择了多对多，我们是否应该自动生成中间表数据并返回？
-                # 或者，暂不支持自动生成中间表，只支持 FK 填充。
-                # 我们按照 1:N 处理 FK 填充。因为物理上必须是 1:N (外键在目标表)。
-                for row in target_rows:
-                    row[target_col] = random.choice(source_keys)
-
-        return result_data
+            for name, column in self._referenced_columns(rel):
+                referenced[name].add(column)
+
+        results = {}
+        pools = {}
+        for name in order:
+            rows = self._generate_table(table_map[name], incoming[name], pools, seed, workers)
+            results[name] = rows
+            for column in referenced[name]:
+                pools[(name, column)] = KeyPool.from_rows(rows, column)
+
+        return {name: results[name] for name in table_map}
+
+    def iter_relation_archive(self, tables, relations, export_format='jsonl', seed=None, workers=None,
+                              **export_options):
+        """
+        流式生成关联数据并输出 ZIP 字节：每张表一个文件，另附 manifest.json
+        按依赖顺序逐表生成，每张表分块生成后直接写入 ZIP 中的对应文件，写出的字节随即产出，
+        不经过临时文件；内存中只保留被引用列的紧凑键池，并在所有引用它的表生成完成后释放，
+        峰值内存与总行数无关，只取决于块大小和被引用的键列
+        带种子时各表数据与 generate_relation_data 的结果一致
+        :param export_format: 每张表的文件格式（ExportService 支持的格式）
+        :param export_options: 透传给 ExportService.iter_export 的选项（dialect、compression 等）
+        :return: ZIP 字节块的迭代器，清单 {format, seed, tables: [{name, file, rows}]} 写在 manifest.json 中
+        :raises ValueError: 关系配置无效或存在循环依赖（在返回迭代器之前校验）
+        """
+        table_map, parents, children, incoming = self.build_dependency_graph(tables, relations)
+        order = self._sort(parents, children)
+        return self._iter_archive(table_map, parents, children, incoming, order, relations,
+                                  export_format, seed, workers, export_options)
+
+    def _iter_archive(self, table_map, parents, children, incoming, order, relations,
+                      export_format, seed, workers, export_options):
+        """iter_relation_archive 的生成器部分：ZipFile 写入不可 seek 的缓冲区，每写入一块即取出产出"""
+        referenced = {name: set() for name in table_map}
+        for rel in relations:
+            for name, column in self._referenced_columns(rel):
+                referenced[name].add(column)
+
+        _, extension = export_service.FORMAT_INFO[export_format]
+        # 列式格式本身已压缩，直接存储
+        compression = zipfile.ZIP_STORED if export_format in export_service.COLUMNAR_FORMATS else zipfile.ZIP_DEFLATED
+        manifest = {'format': export_format, 'seed': seed, 'tables': []}
+        pools = {}
+        pending_children = {name: len(deps) for name, deps in children.items()}
+
+        sink = _ArchiveSink()
+        with zipfile.ZipFile(sink, 'w', compression=compression, allowZip64=True,
+                             compresslevel=self.ARCHIVE_COMPRESS_LEVEL) as archive:
+            for name in order:
+                table = table_map[name]
+                plan = self._plan_table(table, incoming[name], pools, seed)
+                key_chunks = {column: [] for column in referenced[name]}
+
+                def iter_rows():
+                    for rows in self._iter_table_chunks(plan, seed, workers):
+                        for column, chunks in key_chunks.items():
+                            chunks.append(KeyPool.compact_chunk([row.get(column) for row in rows]))
+                        yield from rows
+
+                file_name = f"{name}.{extension}"
+                with archive.open(file_name, 'w', force_zip64=True) as entry:
+                    for data in export_service.iter_export(
+                        export_format, iter_rows(), self._output_fields(plan, table, table_map, incoming[name]),
+                        table_name=name, **export_options
+                    ):
+                        entry.write(data)
+                        if sink.size:
+                            yield sink.drain()
+                manifest['tables'].append({'name': name, 'file': file_name, 'rows': plan['count']})
+
+                for column, chunks in key_chunks.items():
+                    pools[(name, column)] = KeyPool.from_chunks(chunks)
+                # 所有引用某张表的表都已生成后，释放它的键池
+                for parent in parents[name]:
+                    pending_children[parent] -= 1
+                    if pending_children[parent] == 0:
+                        for column in referenced[parent]:
+                            pools.pop((parent, column), None)
+
+            archive.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+        # 关闭时写出最后的数据描述符与中央目录
+        yield sink.drain()
+
+    @staticmethod
+    def _output_fields(plan, table, table_map, incoming):
+        """输出文件的字段配置：外键列使用被引用源列的类型，便于列式格式按类型写出"""
+        field_types = {field['name']: field['type'] for field in table.get('fields', [])}
+        for _, rel in incoming:
+            columns = [(rel['targetColumn'], rel['sourceTable'], rel['sourceColumn'])]
+            if table.get('junction'):
+                columns = [
+                    (table['source_column'], rel['sourceTable'], rel['sourceColumn']),
+                    (table['target_column'], rel['targetTable'], rel['targetColumn']),
+                ]
+            for column, source_name, source_column in columns:
+                source_types = {field['name']: field['type'] for field in table_map[source_name]['fields']}
+                field_types[column] = source_types.get(source_column, 'string')
+            if rel['relationType'] == RelationGeneratorService.SELF_REFERENCING:
+                spec = plan['tree']['spec']
+                for column in (spec['level_column'], spec['left_column'], spec['right_column']):
+                    if column:
+                        field_types[column] = 'number'
+                if spec['path_column']:
+                    field_types[spec['path_column']] = 'string'
+        return [{"name": name, "type": field_types.get(name, 'string')} for name in plan['names']]
+
+    def _generate_table(self, table, incoming, pools, seed, workers):
+        """生成单张表的全部行"""
+        plan = self._plan_table(table, incoming, pools, seed)
+        return [row for chunk in self._iter_table_chunks(plan, seed, workers) for row in chunk]
+
+    def _plan_table(self, table, incoming, pools, seed):
+        """
+        确定单张表的行数、需要生成的非外键列，以及每个外键列的 (键池, 父行号序列)
+        外键列不交给 DataGeneratorService 生成，而是按行号从源表键池中取值；
+        多对多关联表没有需要生成的列，两列都按抽取的行对取值
+        """
+        if table.get('junction'):
+            rel_index, rel = incoming[0]
+            source_pool = pools[(rel['sourceTable'], rel['sourceColumn'])]
+            target_pool = pools[(rel['targetTable'], rel['targetColumn'])]
+            source_indices, target_indices = self._junction_indices(table, source_pool, target_pool, rel_index, seed)
+            return {
+                'name': table['name'],
+                'count': len(source_indices),
+                'gen_fields': [],
+                'names': [table['source_column'], table['target_column']],
+                'foreign_keys': {
+                    table['source_column']: (source_pool, source_indices),
+                    table['target_column']: (target_pool, target_indices),
+                },
+            }
+
+        tree = None
+        for rel_index, rel in incoming:
+            if rel['relationType'] == self.SELF_REFERENCING:
+                tree = self._plan_tree(table, rel, rel_index, seed)
+        fk_columns = {
+            rel['targetColumn']: (rel_index, rel) for rel_index, rel in incoming
+            if rel['relationType'] != self.SELF_REFERENCING
+        }
+        tree_columns = tree['spec']['columns'] if tree else []
+
+        # 前端 fields 只有 id, name, type，转换为 DataGeneratorService 的格式
+        gen_fields = [
+            {"name": field['name'], "type": field['type'], "options": {}}
+            for field in table['fields'] if field['name'] not in fk_columns and field['name'] not in tree_columns
+        ]
+
+        # 自引用关系或按扇出分布的一对多关系决定目标表行数，先于其他外键列抽取
+        count = len(tree['parents']) if tree else table['count']
+        foreign_keys = {}
+        for column, (rel_index, rel) in fk_columns.items():
+            distribution = self._distribution(rel, rel_index)
+            if distribution['type'] in self.FANOUT_DISTRIBUTIONS:
+                pool = pools[(rel['sourceTable'], rel['sourceColumn'])]
+                indices = self._fanout_indices(pool, distribution, self._relation_rng(seed, rel_index))
+                foreign_keys[column] = (pool, indices)
+                count = len(indices)
+
+        for column, (rel_index, rel) in fk_columns.items():
+            if column not in foreign_keys:
+                pool = pools[(rel['sourceTable'], rel['sourceColumn'])]
+                foreign_keys[column] = (pool, self._foreign_key_indices(rel, pool, count, rel_index, seed))
+
+        # 按字段配置的顺序输出；不在字段配置中的外键列、树形结构列追加在末尾
+        names = [field['name'] for field in table['fields']]
+        names += [column for column in list(foreign_keys) + tree_columns if column not in names]
+        return {
+            'name': table['name'],
+            'count': count,
+            'gen_fields': gen_fields,
+            'names': names,
+            'foreign_keys': foreign_keys,
+            'tree': tree,
+        }
+
+    def _plan_tree(self, table, rel, rel_index, seed):
+        """
+        自引用关系：按广度优先顺序构造树，得到每行的父行号与层级（父行总在子行之前），
+        需要时计算嵌套集合左右值；节点键与物化路径在分块生成时按行号从已生成的行中取得
+        """
+        spec = self._tree_spec(rel, rel_index)
+        count = table['count']
+        rng = random.Random(data_generator_service.derive_seed(seed, 'relation', rel_index)) \
+            if seed is not None else random.Random()
+        parents, levels = tree_builder.build_tree(
+            rng, count, spec['fanout'], depth=spec['depth'], shape=spec['shape'], skew=spec['skew']
+        )
+        lefts, rights = tree_builder.nested_set(parents) if spec['left_column'] else (None, None)
+        return {'spec': spec, 'parents': parents, 'levels': levels, 'lefts': lefts, 'rights': rights}
+
+    def _iter_table_chunks(self, plan, seed, workers, chunk_size=None):
+        """
+        按块生成一张表的行：非外键列分块生成，外键列按相同的行区间从键池取值后组装；
+        自引用表在组装后按行号填充树形结构列
+        """
+        count, names, foreign_keys, tree = plan['count'], plan['names'], plan['foreign_keys'], plan.get('tree')
+        tree_keys, tree_paths = [], []
+        if plan['gen_fields']:
+            table_seed = None if seed is None else data_generator_service.derive_seed(seed, 'table', plan['name'])
+            chunks = data_generator_service.iter_chunks(
+                plan['gen_fields'], count, seed=table_seed, chunk_size=chunk_size, workers=workers
+            )
+        else:
+            size = chunk_size or data_generator_service.SHARD_BLOCK_SIZE
+            chunks = ([{} for _ in range(min(size, count - start))] for start in range(0, count, size))
+
+        start = 0
+        for rows in chunks:
+            end = start + len(rows)
+            if foreign_keys:
+                columns = [
+                    None if name not in foreign_keys else
+                    (foreign_keys[name][0].take(foreign_keys[name][1][start:end])
+                     if foreign_keys[name][1] is not None else [None] * len(rows))
+                    for name in names
+                ]
+                rows = [
+                    {name: (row.get(name) if values is None else values[i]) for name, values in zip(names, columns)}
+                    for i, row in enumerate(rows)
+                ]
+            if tree:
+                self._fill_tree_columns(tree, rows, start, tree_keys, tree_paths)
+            yield rows
+            start = end
+
+    @staticmethod
+    def _fill_tree_columns(tree, rows, start, keys, paths):
+        """
+        填充一块行的树形结构列：父节点键、层级、物化路径、左右值
+        keys / paths 累积已生成行的节点键和路径，父行号总小于当前行号，可直接按行号读取
+        """
+        spec, parents = tree['spec'], tree['parents']
+        key_column, parent_column = spec['key_column'], spec['parent_column']
+        level_column, path_column = spec['level_column'], spec['path_column']
+        left_column, right_column, separator = spec['left_column'], spec['right_column'], spec['path_separator']
+        for index, row in enumerate(rows, start):
+            key = row.get(key_column)
+            keys.append(key)
+            parent = parents[index]
+            row[parent_column] = None if parent < 0 else keys[parent]
+            if level_column:
+                row[level_column] = tree['levels'][index]
+            if path_column:
+                path = str(key) if parent < 0 else f"{paths[parent]}{separator}{key}"
+                paths.append(path)
+                row[path_column] = path
+            if left_column:
+                row[left_column] = tree['lefts'][index]
+                row[right_column] = tree['rights'][index]
+
+    @staticmethod
+    def _relation_rng(seed, rel_index):
+        """关系使用的随机数生成器，设置种子时由主种子和关系序号派生"""
+        return make_rng(None if seed is None else data_generator_service.derive_seed(seed, 'relation', rel_index))
+
+    def _foreign_key_indices(self, rel, pool, count, rel_index, seed):
+        """按关系类型从源表键池中抽取 count 个父行号；源表为空时返回 None"""
+        if not len(pool):
+            return None
+
+        rng = self._relation_rng(seed, rel_index)
+
+        if rel['relationType'] == self.ONE_TO_ONE:
+            # 一对一：目标表的每一行对应源表的一个唯一行
+            # 目标表行数 > 源表行数时无法唯一，只能循环使用
+            return pool.permutation_indices(rng, count)
+
+        # 一对多：目标表的每一行关联到源表的一个行（源表是"一"，目标表是"多"）
+        # 例如 User(1) -> Orders(N)。Order 表中的 user_id 从 User 表 id 中随机选。
+        distribution = self._distribution(rel, rel_index)
+        if distribution['type'] == 'zipf':
+            # 少数热点父行拥有大量子行，用于复现热点键
+            return pool.zipf_indices(rng, count, distribution['s'])
+        return pool.uniform_indices(rng, count)
+
+    @staticmethod
+    def _fanout_indices(pool, distribution, rng):
+        """按每个父行的子行数生成打乱后的父行号序列，长度即目标表行数"""
+        if distribution['type'] == 'normal':
+            fanouts = pool.normal_fanouts(rng, distribution['mean'], distribution['stddev'])
+        else:
+            fanouts = pool.range_fanouts(rng, distribution['min'], distribution['max'])
+        return pool.fanout_indices(rng, fanouts)
+
+    def _junction_indices(self, junction, source_pool, target_pool, rel_index, seed):
+        """
+        多对多关联表的行对：按两侧行号抽取不重复的行对（int64 编码排序去重）
+        例如 Student(N) <-> Course(M)，生成 student_course(student_id, course_id)
+        """
+        return sample_pairs(
+            self._relation_rng(seed, rel_index), len(source_pool), len(target_pool),
+            junction['min_per_source'], junction['max_per_source'], junction['max_per_target']
+        )
+
 
 relation_generator_service = RelationGeneratorService()
+
@@ -145,14 +145,23 @@ class SchedulerService:
             fields = task.fields
             count = task.row_count
             
-            result = data_generator_service.generate_data(fields, count)
-            
-            # 计算统计
-            duration_ms = int((time.time() - start_time) * 1000)
-            data_size = len(json.dumps(result, ensure_ascii=False).encode('utf-8'))
-            
-            # 处理输出
-            output_status, output_message = self._handle_output(task, result)
+            if task.output_type == 'datasource':
+                # 边生成边写入数据源，不在内存中保留全部数据
+                rows_generated, output_status, output_message, seed = self._seed_datasource(task)
+                duration_ms = int((time.time() - start_time) * 1000)
+                data_size = None
+            else:
+                workers = self._app.config.get('GENERATION_WORKERS') if self._app else None
+                seed = data_generator_service.resolve_seed(count, workers, task.seed)
+                result = data_generator_service.generate_parallel(fields, count, seed=seed, workers=workers)
+                rows_generated = len(result)
+                
+                # 计算统计
+                duration_ms = int((time.time() - start_time) * 1000)
+                data_size = len(json.dumps(result, ensure_ascii=False).encode('utf-8'))
+                
+                # 处理输出
+                output_status, output_message = self._handle_output(task, result)
             
             # 创建历史记录
             from services.history_service import history_service
@@ -167,7 +176,9 @@ class SchedulerService:
                     export_format=task.export_format,
                     table_name=task.table_name,
                     execution_time_ms=duration_ms,
-                    data_size_bytes=data_size
+                    data_size_bytes=data_size,
+                    seed=seed,
+                    engine=data_generator_service.ENGINE_ROW
                 )
             except Exception as he:
                 print(f"Failed to create history for task {task_uuid}: {he}")
@@ -176,7 +187,7 @@ class SchedulerService:
             log.finished_at = datetime.utcnow()
             log.duration_ms = duration_ms
             log.status = 'success'
-            log.rows_generated = len(result)
+            log.rows_generated = rows_generated
             log.data_size_bytes = data_size
             log.output_status = output_status
             log.output_message = output_message
@@ -209,9 +220,92 @@ class SchedulerService:
         if output_type == 'webhook':
             return self._send_webhook(output_config, data, task)
         
+        if output_type == 'storage':
+            return self._save_to_storage(output_config, data, task)
+        
         # 其他输出类型可以后续扩展
         return 'skipped', f'不支持的输出类型: {output_type}'
     
+    def _save_to_storage(self, config: dict, data: list, task: ScheduledTask) -> Tuple[str, str]:
+        """按任务的导出格式写出文件到存储目录"""
+        from services.export_service import export_service
+        from services.compression_service import compression_service
+        
+        export_format = task.export_format or export_service.FORMAT_JSON
+        base_dir = self._app.config.get('SCHEDULED_EXPORT_DIR') if self._app else None
+        if not base_dir:
+            return 'failed', '存储目录未配置'
+        
+        try:
+            encoding = config.get('compress')
+            compress_error = compression_service.validate_encoding(encoding)
+            if compress_error:
+                return 'failed', compress_error
+            
+            _, extension = export_service.FORMAT_INFO[export_format]
+            directory = os.path.join(base_dir, task.uuid)
+            os.makedirs(directory, exist_ok=True)
+            file_name = compression_service.file_name(
+                f"{datetime.now().strftime('%Y%m%d%H%M%S')}.{extension}", encoding
+            )
+            path = os.path.join(directory, file_name)
+            
+            chunks = export_service.iter_export(
+                export_format, data, task.fields,
+                table_name=task.table_name,
+                compression=config.get('compression')
+            )
+            if encoding:
+                chunks = compression_service.compress_stream(chunks, encoding)
+            with open(path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            
+            return 'success', f'已保存到 {path}'
+        except Exception as e:
+            return 'failed', f'保存失败: {str(e)}'
+    
+    def _seed_datasource(self, task: ScheduledTask) -> Tuple[int, str, str, Optional[int]]:
+        """
+        datasource 输出：分块生成并通过批量写入路径直接写入数据源
+        :return: (已写入行数, 输出状态, 输出信息, 使用的种子)，未指定种子时使用自动生成并记录在写入记录中的种子
+        """
+        from models.datasource import DataSource
+        from services.datasource_write_service import datasource_write_service
+        
+        config = task.output_settings
+        datasource = DataSource.find_by_uuid(config.get('datasource_id'))
+        if not datasource or datasource.user_id != task.user_id:
+            return 0, 'failed', '数据源不存在', task.seed
+        
+        table_name = config.get('table_name') or task.table_name
+        if not table_name:
+            return 0, 'failed', '未配置表名', task.seed
+        
+        chunk_size = config.get('chunk_size', datasource_write_service.DEFAULT_CHUNK_SIZE)
+        mode = config.get('transaction', datasource_write_service.MODE_CHUNK)
+        write_concern = config.get('write_concern')
+        error = datasource_write_service.validate_options(chunk_size, mode, datasource.type, write_concern)
+        if error:
+            return 0, 'failed', error, task.seed
+        
+        write, error = datasource_write_service.start_write(
+            datasource, task.user_id, table_name, task.row_count,
+            chunk_size=chunk_size, mode=mode, seed=task.seed, seeded=True
+        )
+        if error:
+            return 0, 'failed', error, task.seed
+        
+        success, summary, error = datasource_write_service.run_seed(
+            write, task.fields,
+            create_table=config.get('create_table', False),
+            columns=config.get('columns'),
+            write_concern=write_concern
+        )
+        if not success:
+            return write.committed_rows, 'failed', f'写入失败: {error}（写入ID {write.uuid}）', write.seed
+        return summary['rows'], 'success', f"已写入 {datasource.name}.{table_name} {summary['rows']} 行（写入ID {write.uuid}）", write.seed
+    
     def _send_webhook(self, config: dict, data: list, task: ScheduledTask) -> Tuple[str, str]:
         """发送 Webhook"""
         import requests
@@ -267,13 +361,24 @@ class SchedulerService:
         output_config: dict = None,
         timezone: str = 'Asia/Shanghai',
         max_runs: int = None,
-        expires_at: datetime = None
+        expires_at: datetime = None,
+        seed: int = None
     ) -> Tuple[Optional[ScheduledTask], Optional[str]]:
         """创建定时任务"""
         # 验证 cron 表达式
         if not self._validate_cron(cron_expression):
             return None, "无效的 Cron 表达式"
         
+        from services.data_generator_service import data_generator_service
+        seed_error = data_generator_service.validate_seed(seed)
+        if seed_error:
+            return None, seed_error
+        
+        from services.export_service import export_service
+        format_error = export_service.validate_format(export_format, (output_config or {}).get('compression'))
+        if format_error:
+            return None, format_error
+        
         # 创建任务
         task = ScheduledTask(
             user_id=user_id,
@@ -284,6 +389,7 @@ class SchedulerService:
             cron_expression=cron_expression,
             timezone=timezone,
             row_count=row_count,
+            seed=seed,
             export_format=export_format,
             table_name=table_name,
             output_type=output_type,
@@ -347,7 +453,17 @@ class SchedulerService:
             task.fields = kwargs['fields']
         if 'row_count' in kwargs:
             task.row_count = kwargs['row_count']
+        if 'seed' in kwargs:
+            from services.data_generator_service import data_generator_service
+            seed_error = data_generator_service.validate_seed(kwargs['seed'])
+            if seed_error:
+                return None, seed_error
+            task.seed = kwargs['seed']
         if 'export_format' in kwargs:
+            from services.export_service import export_service
+            format_error = export_service.validate_format(kwargs['export_format'])
+            if format_error:
+                return None, format_error
             task.export_format = kwargs['export_format']
         if 'table_name' in kwargs:
             task.table_name = kwargs['table_name']
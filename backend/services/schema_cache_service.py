@@ -0,0 +1,95 @@
+"""
+数据源结构缓存服务
+表列表与表结构缓存在应用数据库中：过期前直接返回，不访问数据源；
+过期后先取一次数据源的结构指纹（只返回一行，包含表的估计行数），与缓存时一致则续期，变化时才重新获取
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models.datasource import DataSource, DataSourceSchemaCache
+from connectors.base_connector import BaseConnector
+from connectors.connection_pool import pool_manager
+
+
+class SchemaCacheService:
+    """数据源结构缓存服务"""
+
+    SCOPE_TABLES = ''  # 表列表的缓存范围
+
+    def __init__(self):
+        self.ttl = 300
+
+    def init_app(self, app):
+        """读取缓存过期时间"""
+        self.ttl = app.config.get('SCHEMA_CACHE_TTL', self.ttl)
+
+    def get(
+        self,
+        datasource: DataSource,
+        scope: str,
+        loader: Callable[[BaseConnector], Any],
+        refresh: bool = False
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        获取缓存的结构，必要时通过 loader 从数据源重新获取
+        :param scope: SCOPE_TABLES 或表名
+        :param loader: loader(connector) 从数据源获取结构
+        :param refresh: 忽略缓存强制重新获取
+        :return: (结构, 缓存信息 {cached, fetched_at})
+        """
+        entry = DataSourceSchemaCache.query.filter_by(datasource_id=datasource.id, scope=scope).first()
+        now = datetime.utcnow()
+        if entry and not refresh and (now - entry.checked_at).total_seconds() < self.ttl:
+            return entry.schema, self._meta(entry, True)
+
+        connector = pool_manager.connector_for(datasource)
+        if connector is None:
+            raise ValueError(f"不支持的数据源类型: {datasource.type}")
+        with connector:
+            fingerprint = connector.schema_fingerprint()
+            if entry and not refresh and fingerprint is not None and fingerprint == entry.fingerprint:
+                entry.checked_at = now
+                db.session.commit()
+                return entry.schema, self._meta(entry, True)
+            schema = loader(connector)
+        datasource.record_query()
+
+        if entry is None:
+            entry = DataSourceSchemaCache(datasource_id=datasource.id, scope=scope)
+            db.session.add(entry)
+        entry.fingerprint = fingerprint
+        entry.schema = schema
+        entry.fetched_at = entry.checked_at = now
+        meta = self._meta(entry, False)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # 并发请求已写入同一范围的缓存
+            db.session.rollback()
+        return schema, meta
+
+    def invalidate(self, datasource: DataSource, scope: Optional[str] = None) -> None:
+        """清除数据源的结构缓存（数据源配置变化、建表后调用），scope 为空时清除全部"""
+        query = DataSourceSchemaCache.query.filter_by(datasource_id=datasource.id)
+        if scope is not None:
+            query = query.filter_by(scope=scope)
+        query.delete(synchronize_session=False)
+        db.session.commit()
+
+    @staticmethod
+    def _meta(entry: DataSourceSchemaCache, cached: bool) -> Dict[str, Any]:
+        return {
+            'cached': cached,
+            'fetched_at': entry.fetched_at.isoformat() if entry.fetched_at else None,
+        }
+
+
+# 单例实例
+schema_cache_service = SchemaCacheService()
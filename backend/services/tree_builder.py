@@ -0,0 +1,79 @@
+"""
+树形结构生成
+为自引用表（如 org.parent_id -> org.id）按广度优先顺序一次线性遍历构造父节点序列，
+并可选计算嵌套集合（左右值）
+节点编号即行号：根节点为 0，父节点的行号总小于子节点
+"""
+import itertools
+from typing import List, Optional, Tuple
+
+SHAPE_BALANCED = 'balanced'
+SHAPE_SKEWED = 'skewed'
+SHAPES = [SHAPE_BALANCED, SHAPE_SKEWED]
+
+
+def tree_capacity(fanout: int, depth: int) -> int:
+    """深度为 depth、每个节点 fanout 个子节点的满树节点数"""
+    return sum(fanout ** level for level in range(depth))
+
+
+def build_tree(
+    rng,
+    count: int,
+    fanout: int,
+    depth: Optional[int] = None,
+    shape: str = SHAPE_BALANCED,
+    skew: float = 1.0
+) -> Tuple[List[int], List[int]]:
+    """
+    按广度优先顺序生成树：依次展开每个节点，为其追加子节点，直到达到 count 个节点
+    - balanced: 每个节点恰好 fanout 个子节点（最后一层可能不满）
+    - skewed: 每个节点的子节点数 k 取 0..fanout，概率与 1 / (k + 1)^skew 成正比，
+      少数节点子节点多、多数节点为叶子；展开队列将空时至少保留一个子节点，避免提前结束
+    depth 限制层数（根为第 0 层）；skewed 时可能因层数限制在 count 之前结束
+    :return: (父节点行号列表（根为 -1）, 层级列表)
+    """
+    if count <= 0:
+        return [], []
+
+    if shape == SHAPE_SKEWED:
+        cum_weights = list(itertools.accumulate(1.0 / (k + 1) ** skew for k in range(fanout + 1)))
+        children = iter(rng.choices(range(fanout + 1), cum_weights=cum_weights, k=count))
+    else:
+        children = itertools.repeat(fanout)
+
+    parents, levels = [-1], [0]
+    node = 0
+    while len(parents) < count and node < len(parents):
+        level = levels[node]
+        if depth is None or level + 1 < depth:
+            k = next(children)
+            if k == 0 and node == len(parents) - 1:
+                k = 1
+            k = min(k, count - len(parents))
+            parents.extend(itertools.repeat(node, k))
+            levels.extend(itertools.repeat(level + 1, k))
+        node += 1
+    return parents, levels
+
+
+def nested_set(parents: List[int]) -> Tuple[List[int], List[int]]:
+    """
+    嵌套集合左右值：先逆序累加子树大小，再正序按兄弟顺序分配左值
+    父节点行号总小于子节点，两次线性遍历即可
+    """
+    n = len(parents)
+    sizes = [1] * n
+    for i in range(n - 1, 0, -1):
+        sizes[parents[i]] += sizes[i]
+
+    lefts, rights, next_left = [0] * n, [0] * n, [0] * n
+    for i, parent in enumerate(parents):
+        left = 1 if parent < 0 else next_left[parent]
+        if parent >= 0:
+            next_left[parent] += 2 * sizes[i]
+        lefts[i] = left
+        rights[i] = left + 2 * sizes[i] - 1
+        next_left[i] = left + 1
+    return lefts, rights
+
@@ -0,0 +1,115 @@
+"""
+测试公共配置
+后端模块以 backend 目录为根导入（与 app.py 一致），测试使用内存 SQLite 数据库
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from connectors.base_connector import BaseConnector  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    """只初始化数据库扩展的最小应用（不启动调度器与后台线程）"""
+    from flask import Flask
+    from config import TestingConfig
+    from extensions import db, init_extensions
+
+    app = Flask('app', root_path=BACKEND_DIR)
+    app.config.from_object(TestingConfig)
+    init_extensions(app)
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+
+@pytest.fixture
+def user(app):
+    """测试用户"""
+    from models import User
+
+    user = User(username='tester', email='tester@example.com')
+    user.set_password('Passw0rd!')
+    return user.save()
+
+
+class MemoryConnection:
+    """内存中的"数据库连接"：写入先进入未提交缓冲，commit 后才对外可见"""
+
+    def __init__(self, store):
+        self.store = store
+        self.pending = []
+
+    def commit(self):
+        self.store.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        self.pending = []
+
+
+class MemoryConnector(BaseConnector):
+    """
+    写入内存列表的连接器，用于在没有数据库服务时测试分块写入与断点续写
+    fail_on 中的块序号（本连接器第几次调用 write_chunk，从 0 开始）写入时抛出异常
+    """
+
+    def __init__(self, store, fail_on=()):
+        super().__init__('memory', 0)
+        self.store = store
+        self.fail_on = set(fail_on)
+        self.calls = 0
+
+    def create_connection(self):
+        return MemoryConnection(self.store)
+
+    def test_connection(self):
+        return True, 'ok', None
+
+    def get_tables(self):
+        return []
+
+    def get_table_schema(self, table_name, exact_count=False):
+        return {'name': table_name, 'columns': []}
+
+    def count_rows(self, table_name):
+        return len(self.store)
+
+    def execute_query(self, query, params=None):
+        return []
+
+    def insert_data(self, table_name, data):
+        return True, len(data), None
+
+    def write_chunk(self, table_name, rows):
+        call, self.calls = self.calls, self.calls + 1
+        if call in self.fail_on:
+            raise RuntimeError(f"写入第 {call} 块失败")
+        self._connection.pending.extend(rows)
+        return len(rows)
+
+
+@pytest.fixture
+def memory_datasource(app, user, monkeypatch):
+    """
+    指向内存连接器的数据源：返回 (数据源, 已提交的行, 失败块序号集合)
+    修改失败块序号集合即可让之后创建的连接器在指定块失败
+    """
+    from models import DataSource
+    from connectors.connection_pool import pool_manager
+
+    datasource = DataSource(user_id=user.id, name='memory', type='postgresql', host='localhost', port=5432)
+    datasource.save()
+    store, fail_on = [], set()
+    monkeypatch.setattr(pool_manager, 'connector_for', lambda ds: MemoryConnector(store, fail_on))
+    return datasource, store, fail_on
@@ -0,0 +1,144 @@
+"""
+数据源连接池：复用空闲连接、上限与等待超时、空闲回收（在池锁外关闭连接）、配置变化与失效时重建
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from connectors.connection_pool import ConnectionPool, ConnectionPoolManager
+
+
+class FakeConnection:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def rollback(self):
+        pass
+
+
+class Factory:
+    def __init__(self, close_delay=0):
+        self.created = 0
+        self.closed = []
+        self.close_delay = close_delay
+
+    def create(self):
+        self.created += 1
+        return FakeConnection(f'conn-{self.created}')
+
+    def close(self, connection):
+        time.sleep(self.close_delay)
+        self.closed.append(connection)
+
+
+def _pool(factory, **kwargs):
+    options = dict(max_size=2, idle_timeout=60, health_check_interval=60, acquire_timeout=0.2)
+    options.update(kwargs)
+    return ConnectionPool(factory=factory.create, close=factory.close, ping=lambda c: True, **options)
+
+
+def test_released_connection_is_reused():
+    factory = Factory()
+    pool = _pool(factory)
+    first = pool.acquire()
+    pool.release(first)
+
+    assert pool.acquire() == first
+    assert factory.created == 1
+
+
+def test_acquire_times_out_at_max_size():
+    pool = _pool(Factory(), max_size=1)
+    pool.acquire()
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+
+
+def test_discarded_connection_is_closed_and_frees_its_slot():
+    factory = Factory()
+    pool = _pool(factory, max_size=1)
+    connection = pool.acquire()
+    pool.release(connection, discard=True)
+
+    assert factory.closed == [connection]
+    assert pool.acquire() != connection
+
+
+def test_evict_idle_keeps_min_size():
+    factory = Factory()
+    pool = _pool(factory, max_size=3, min_size=1, idle_timeout=0.05)
+    connections = [pool.acquire() for _ in range(3)]
+    for connection in connections:
+        pool.release(connection)
+    time.sleep(0.1)
+
+    assert pool.evict_idle() == 2
+    assert pool.stats()['idle'] == 1
+    assert len(factory.closed) == 2
+
+
+def test_slow_close_does_not_block_borrowers():
+    factory = Factory(close_delay=0.5)
+    pool = _pool(factory, max_size=3, idle_timeout=0.05)
+    connections = [pool.acquire() for _ in range(2)]
+    for connection in connections:
+        pool.release(connection)
+    time.sleep(0.1)
+
+    reaper = threading.Thread(target=pool.evict_idle)
+    reaper.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    pool.release(pool.acquire())
+    assert time.monotonic() - started < 0.3
+    reaper.join()
+    assert len(factory.closed) == 2
+
+
+def _datasource(**overrides):
+    values = dict(uuid='ds-1', type='postgresql', host='db.local', port=5432, database='app',
+                  username='app', use_ssl=False, password='secret')
+    values.update(overrides)
+    password = values.pop('password')
+    return SimpleNamespace(get_password=lambda: password, **values)
+
+
+def test_manager_reaps_idle_connections_of_all_pools():
+    manager = ConnectionPoolManager()
+    manager.settings['idle_timeout'] = 0.05
+    factories = []
+    for name in ('a', 'b'):
+        connector = manager.connector_for(_datasource(uuid=name))
+        factory = Factory()
+        connector._pool._factory, connector._pool._close = factory.create, factory.close
+        factories.append(factory)
+        connector.connect()
+        connector.disconnect()
+    time.sleep(0.1)
+
+    assert manager.evict_idle() == 2
+    assert all(len(factory.closed) == 1 for factory in factories)
+
+
+def test_manager_rebuilds_pool_when_config_changes():
+    manager = ConnectionPoolManager()
+    connector = manager.connector_for(_datasource())
+    pool = connector._pool
+
+    assert manager.connector_for(_datasource())._pool is pool
+    assert manager.connector_for(_datasource(password='rotated'))._pool is not pool
+    assert pool._closed
+
+
+def test_invalidate_closes_pool():
+    manager = ConnectionPoolManager()
+    pool = manager.connector_for(_datasource())._pool
+    manager.invalidate('ds-1')
+
+    assert pool._closed
+    assert manager.stats() == {}
+    with pytest.raises(ConnectionError):
+        pool.acquire()
@@ -0,0 +1,85 @@
+"""
+服务端 seed 的种子：新写入自动生成并记录种子，续写只能使用原种子，
+未指定种子的定时任务写入数据源时返回实际使用的种子
+"""
+from models.scheduled_task import ScheduledTask
+from services.data_generator_service import data_generator_service
+from services.datasource_write_service import datasource_write_service as service
+from services.scheduler_service import scheduler_service
+
+
+FIELDS = [{"name": "id", "type": "uuid"}, {"name": "email", "type": "email"}]
+TOTAL = 500
+
+
+def _failed_seed(datasource, user, fail_on, seed=None):
+    write, error = service.start_write(
+        datasource, user.id, 'items', TOTAL, chunk_size=100, seed=seed, seeded=True
+    )
+    assert error is None
+    fail_on.add(2)
+    ok, _, _ = service.run_seed(write, FIELDS)
+    assert not ok
+    fail_on.clear()
+    return write
+
+
+def _resume(datasource, user, write, **kwargs):
+    return service.start_write(
+        datasource, user.id, 'items', TOTAL, chunk_size=100, resume_id=write.uuid, **kwargs
+    )
+
+
+def test_new_seed_write_records_generated_seed(memory_datasource, user):
+    datasource, store, fail_on = memory_datasource
+    write = _failed_seed(datasource, user, fail_on)
+    assert write.seed is not None
+
+    resumed, error = _resume(datasource, user, write, seeded=True)
+    assert error is None
+    ok, _, _ = service.run_seed(resumed, FIELDS)
+    assert ok
+    assert store == data_generator_service.generate_data(FIELDS, TOTAL, seed=write.seed)
+
+
+def test_resume_with_same_seed_is_accepted(memory_datasource, user):
+    datasource, store, fail_on = memory_datasource
+    write = _failed_seed(datasource, user, fail_on, seed=123)
+
+    resumed, error = _resume(datasource, user, write, seed=123, seeded=True)
+    assert error is None and resumed.seed == 123
+
+
+def test_resume_with_different_seed_is_rejected(memory_datasource, user):
+    datasource, store, fail_on = memory_datasource
+    write = _failed_seed(datasource, user, fail_on, seed=123)
+
+    resumed, error = _resume(datasource, user, write, seed=124, seeded=True)
+    assert resumed is None and '123' in error
+    assert write.status == service.STATUS_FAILED
+
+
+def test_resume_must_use_the_same_write_path(memory_datasource, user):
+    datasource, store, fail_on = memory_datasource
+    seeded = _failed_seed(datasource, user, fail_on, seed=7)
+    assert _resume(datasource, user, seeded)[0] is None
+
+    plain, _ = service.start_write(datasource, user.id, 'items', TOTAL, chunk_size=100)
+    fail_on.add(0)
+    service.run_write(plain, iter([{'id': i} for i in range(TOTAL)]))
+    fail_on.clear()
+    assert _resume(datasource, user, plain, seeded=True)[0] is None
+
+
+def test_unseeded_scheduled_seed_reports_used_seed(memory_datasource, user):
+    datasource, store, fail_on = memory_datasource
+    task = ScheduledTask(user_id=user.id, name='nightly', cron_expression='0 0 * * *',
+                         row_count=TOTAL, output_type='datasource')
+    task.fields = FIELDS
+    task.output_settings = {'datasource_id': datasource.uuid, 'table_name': 'items', 'chunk_size': 100}
+    task.save()
+
+    rows, status, _, seed = scheduler_service._seed_datasource(task)
+    assert (rows, status) == (TOTAL, 'success')
+    assert seed is not None
+    assert store == data_generator_service.generate_data(FIELDS, TOTAL, seed=seed)
@@ -0,0 +1,159 @@
+"""
+数据源分块写入的检查点与断点续写：
+失败后从最后提交的块继续，续写只能认领已失败的写入，长时间没有进度的写入视为已中断
+"""
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import DataSourceWrite
+from services.data_generator_service import data_generator_service
+from services.datasource_write_service import datasource_write_service as service
+
+
+ROWS = [{'id': i, 'name': f'row-{i}'} for i in range(1000)]
+FIELDS = [
+    {"name": "id", "type": "uuid"},
+    {"name": "name", "type": "name"},
+    {"name": "amount", "type": "amount"},
+]
+
+
+def _start(datasource, user, **kwargs):
+    options = dict(table_name='items', total_rows=len(ROWS), chunk_size=100)
+    options.update(kwargs)
+    write, error = service.start_write(datasource, user.id, **options)
+    assert error is None
+    return write
+
+
+def test_chunk_mode_resumes_from_last_committed_chunk(memory_datasource, user):
+    datasource, store, fail_on = memory_datasource
+    write = _start(datasource, user)
+
+    fail_on.add(4)
+    ok, _, error = service.run_write(write, iter(ROWS))
+    assert not ok and error
+    assert write.status == service.STATUS_FAILED
+    assert (write.committed_rows, write.committed_chunks) == (400, 4)
+    assert store == ROWS[:400]
+
+    fail_on.clear()
+    resumed, error = service.start_write(
+        datasource, user.id, 'items', len(ROWS), chunk_size=100, resume_id=write.uuid
+    )
+    assert error is None and resumed.id == write.id
+    assert resumed.status == service.STATUS_RUNNING
+
+    # 客户端重新提交全部数据，已提交的行被跳过
+    ok, summary, error = service.run_write(resumed, iter(ROWS))
+    assert ok, error
+    assert summary['rows'] == 600
+    assert store == ROWS
+    assert (resumed.committed_rows, resumed.committed_chunks) == (1000, 10)
+    assert resumed.status == service.STATUS_COMPLETED
+
+
+def test_single_transaction_failure_commits_nothing(memory_datasource, user):
+    datasource, store, fail_on = memory_datasource
+    write = _start(datasource, user, mode=service.MODE_SINGLE)
+
+    fail_on.add(9)
+    ok, _, _ = service.run_write(write, iter(ROWS))
+    assert not ok
+    assert store == [] and write.committed_rows == 0
+
+    fail_on.clear()
+    resumed, error = service.start_write(
+        datasource, user.id, 'items', len(ROWS), chunk_size=100, resume_id=write.uuid
+    )
+    assert error is None
+    ok, _, _ = service.run_write(resumed, iter(ROWS))
+    assert ok
+    assert store == ROWS
+    assert (resumed.committed_rows, resumed.committed_chunks) == (1000, 10)
+
+
+def test_seeded_resume_matches_one_pass(memory_datasource, user):
+    datasource, store, fail_on = memory_datasource
+    write = _start(datasource, user, seed=99, seeded=True)
+
+    fail_on.add(5)
+    ok, _, _ = service.run_seed(write, FIELDS)
+    assert not ok and write.committed_rows == 500
+
+    fail_on.clear()
+    resumed, error = service.start_write(
+        datasource, user.id, 'items', len(ROWS), chunk_size=100, resume_id=write.uuid, seeded=True
+    )
+    assert error is None
+    ok, _, _ = service.run_seed(resumed, FIELDS)
+    assert ok
+    assert store == data_generator_service.generate_data(FIELDS, len(ROWS), seed=99)
+
+
+def test_only_failed_writes_can_be_resumed(memory_datasource, user):
+    datasource, store, fail_on = memory_datasource
+    write = _start(datasource, user)
+
+    def resume():
+        return service.start_write(datasource, user.id, 'items', len(ROWS), chunk_size=100, resume_id=write.uuid)
+
+    # 运行中的写入不能被再次认领
+    assert resume()[0] is None
+
+    fail_on.add(0)
+    service.run_write(write, iter(ROWS))
+    fail_on.clear()
+    claimed, error = resume()
+    assert error is None
+    # 同一失败写入的第二次认领失败
+    assert resume()[0] is None
+
+    service.run_write(claimed, iter(ROWS))
+    assert claimed.status == service.STATUS_COMPLETED
+    assert resume()[0] is None
+
+
+def test_resume_must_match_original_write(memory_datasource, user):
+    datasource, store, fail_on = memory_datasource
+    write = _start(datasource, user)
+    fail_on.add(0)
+    service.run_write(write, iter(ROWS))
+
+    _, error = service.start_write(datasource, user.id, 'other', len(ROWS), resume_id=write.uuid)
+    assert error
+    _, error = service.start_write(datasource, user.id, 'items', len(ROWS) + 1, resume_id=write.uuid)
+    assert error
+    _, error = service.start_write(datasource, user.id + 1, 'items', len(ROWS), resume_id=write.uuid)
+    assert error
+    assert db.session.get(DataSourceWrite, write.id).status == service.STATUS_FAILED
+
+
+def test_stale_running_write_is_marked_failed(memory_datasource, user):
+    datasource, store, fail_on = memory_datasource
+    write = _start(datasource, user)
+    assert service.get_write(write.uuid, user.id).status == service.STATUS_RUNNING
+
+    DataSourceWrite.query.filter_by(id=write.id).update(
+        {'updated_at': datetime.utcnow() - timedelta(seconds=service.DEFAULT_STALE_SECONDS + 1)}
+    )
+    db.session.commit()
+    assert service.get_write(write.uuid, user.id).status == service.STATUS_FAILED
+
+    resumed, error = service.start_write(
+        datasource, user.id, 'items', len(ROWS), chunk_size=100, resume_id=write.uuid
+    )
+    assert error is None and resumed.status == service.STATUS_RUNNING
+
+
+def test_queued_seed_of_superseded_run_is_dropped(app, memory_datasource, user, monkeypatch):
+    datasource, store, fail_on = memory_datasource
+    monkeypatch.setattr(service, '_app', app)
+    write = _start(datasource, user, seed=1, seeded=True)
+
+    service._run_seed_in_context(write.uuid, 'superseded-run', FIELDS, False, None)
+    assert store == [] and write.committed_rows == 0
+
+    service._run_seed_in_context(write.uuid, write.run_id, FIELDS, False, None)
+    db.session.refresh(write)
+    assert len(store) == len(ROWS) and write.status == service.STATUS_COMPLETED
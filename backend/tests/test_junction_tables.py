@@ -0,0 +1,109 @@
+"""
+多对多关联表：行对不重复、每个源行的关联数在配置范围内、每个目标行的关联数不超过上限
+"""
+import random
+from collections import Counter
+
+import pytest
+
+from services import key_pool
+from services.key_pool import make_rng, sample_pairs
+from services.relation_generator_service import RelationGeneratorService
+
+
+def _pairs(sources, targets):
+    return list(zip((int(s) for s in sources), (int(t) for t in targets)))
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def rng_factory(request, monkeypatch):
+    """分别覆盖 numpy 实现与未安装 numpy 时的逐行实现"""
+    if request.param == 'numpy':
+        if key_pool.np is None:
+            pytest.skip('numpy 未安装')
+        return make_rng
+    monkeypatch.setattr(key_pool, 'np', None)
+    return random.Random
+
+
+@pytest.mark.parametrize('n_source, n_target, low, high', [
+    (1000, 50, 1, 5),
+    (200, 10, 3, 10),  # 关联数接近或超过目标行数
+    (50, 3, 0, 3),
+])
+def test_pairs_are_unique_and_within_degree(rng_factory, n_source, n_target, low, high):
+    sources, targets = sample_pairs(rng_factory(7), n_source, n_target, low, high)
+    pairs = _pairs(sources, targets)
+
+    assert len(pairs) == len(set(pairs))
+    assert pairs == sorted(pairs)
+    assert all(0 <= s < n_source and 0 <= t < n_target for s, t in pairs)
+    degrees = Counter(s for s, _ in pairs)
+    assert all(min(low, n_target) <= degrees.get(s, 0) <= min(high, n_target) for s in range(n_source))
+
+
+def test_max_per_target_is_enforced(rng_factory):
+    sources, targets = sample_pairs(rng_factory(11), 500, 200, 1, 4, max_per_target=3)
+    pairs = _pairs(sources, targets)
+
+    assert len(pairs) == len(set(pairs))
+    assert max(Counter(t for _, t in pairs).values()) <= 3
+
+
+def test_empty_side_yields_no_pairs():
+    assert _pairs(*sample_pairs(make_rng(1), 0, 10, 1, 3)) == []
+    assert _pairs(*sample_pairs(make_rng(1), 10, 0, 1, 3)) == []
+
+
+def _relation_config(**options):
+    tables = [
+        {"id": "1", "name": "students", "count": 300,
+         "fields": [{"id": "a", "name": "id", "type": "uuid"}, {"id": "b", "name": "name", "type": "name"}]},
+        {"id": "2", "name": "courses", "count": 40,
+         "fields": [{"id": "c", "name": "id", "type": "uuid"}, {"id": "d", "name": "title", "type": "word"}]},
+    ]
+    relations = [dict({
+        "sourceTable": "students", "sourceColumn": "id",
+        "targetTable": "courses", "targetColumn": "id",
+        "relationType": "many-to-many",
+    }, **options)]
+    return tables, relations
+
+
+def test_junction_table_references_existing_keys_without_duplicates():
+    service = RelationGeneratorService()
+    tables, relations = _relation_config(minPerSource=2, maxPerSource=6, maxPerTarget=40)
+    data = service.generate_relation_data(tables, relations, seed=42)
+
+    assert list(data) == ['students', 'courses', 'students_courses']
+    links = [(row['students_id'], row['courses_id']) for row in data['students_courses']]
+    assert len(links) == len(set(links))
+
+    student_ids = {row['id'] for row in data['students']}
+    course_ids = {row['id'] for row in data['courses']}
+    assert all(s in student_ids and c in course_ids for s, c in links)
+    per_student = Counter(s for s, _ in links)
+    assert all(2 <= per_student[s] <= 6 for s in student_ids)
+    assert max(Counter(c for _, c in links).values()) <= 40
+
+
+def test_junction_table_is_reproducible_with_seed():
+    service = RelationGeneratorService()
+    tables, relations = _relation_config(junctionTable='enrollments',
+                                         junctionSourceColumn='student_id', junctionTargetColumn='course_id')
+    first = service.generate_relation_data(tables, relations, seed=5)
+    second = service.generate_relation_data(tables, relations, seed=5)
+
+    assert first['enrollments'] == second['enrollments']
+    assert set(first['enrollments'][0]) == {'student_id', 'course_id'}
+
+
+@pytest.mark.parametrize('options', [
+    {'minPerSource': 4, 'maxPerSource': 2},
+    {'minPerSource': -1},
+    {'junctionSourceColumn': 'id', 'junctionTargetColumn': 'id'},
+])
+def test_invalid_junction_options_are_rejected(options):
+    tables, relations = _relation_config(**options)
+    with pytest.raises(ValueError):
+        RelationGeneratorService().generate_relation_data(tables, relations, seed=1)
@@ -0,0 +1,147 @@
+"""
+PostgreSQL 批量写入：COPY FROM STDIN 成功时释放保存点，
+COPY 在读取数据前被拒绝时回退为多行 INSERT，指定方式或已发送数据时不回退
+使用记录语句的假游标，不需要 PostgreSQL 服务
+"""
+import pytest
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+from connectors.postgres_connector import PostgreSQLConnector  # noqa: E402
+
+
+ROWS = [{'id': i, 'name': f'row-{i}', 'tags': ['a', 'b']} for i in range(12)]
+
+
+class CopyRejected(psycopg2.Error):
+    pgcode = '42501'  # insufficient_privilege
+
+
+class CopyFailed(psycopg2.Error):
+    pgcode = '23505'  # unique_violation
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql, params=None):
+        self.connection.statements.append(sql)
+
+    def copy_expert(self, sql, stream, size=8192):
+        self.connection.statements.append(sql)
+        error = self.connection.copy_error
+        if error is not None and self.connection.fail_after_read:
+            stream.read(size)
+        if error is not None:
+            raise error('COPY failed')
+        data = b''
+        while True:
+            block = stream.read(size)
+            if not block:
+                break
+            data += block
+        self.connection.copied.append(data.decode('utf-8'))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, copy_error=None, fail_after_read=False):
+        self.copy_error = copy_error
+        self.fail_after_read = fail_after_read
+        self.statements = []
+        self.copied = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+@pytest.fixture
+def connector(monkeypatch):
+    connector = PostgreSQLConnector(host='localhost', database='test')
+    inserted = []
+
+    def insert_values(cursor, table_name, rows, columns):
+        batch = list(rows)
+        inserted.extend(batch)
+        return len(batch)
+
+    monkeypatch.setattr(connector, '_insert_values', insert_values)
+    connector.inserted = inserted
+    return connector
+
+
+def _savepoints(connection):
+    return [sql for sql in connection.statements if 'SAVEPOINT' in sql]
+
+
+def test_copy_releases_its_savepoint(connector):
+    connector._connection = FakeConnection()
+    stats = connector.bulk_insert('items', ROWS)
+
+    assert (stats['method'], stats['rows']) == ('copy', len(ROWS))
+    assert _savepoints(connector._connection) == ['SAVEPOINT bulk_copy', 'RELEASE SAVEPOINT bulk_copy']
+    lines = connector._connection.copied[0].splitlines()
+    assert len(lines) == len(ROWS)
+    assert lines[0].split('\t')[:2] == ['0', 'row-0']
+
+
+def test_repeated_chunks_do_not_stack_savepoints(connector):
+    connector._connection = FakeConnection()
+    for _ in range(5):
+        connector.write_chunk('items', ROWS)
+
+    savepoints = _savepoints(connector._connection)
+    assert savepoints.count('SAVEPOINT bulk_copy') == savepoints.count('RELEASE SAVEPOINT bulk_copy') == 5
+
+
+def test_explicit_copy_takes_no_savepoint(connector):
+    connector._connection = FakeConnection()
+    connector.bulk_insert('items', ROWS, method=PostgreSQLConnector.METHOD_COPY)
+
+    assert _savepoints(connector._connection) == []
+
+
+def test_rejected_copy_falls_back_to_insert(connector):
+    connector._connection = FakeConnection(copy_error=CopyRejected)
+    stats = connector.write_chunk('items', ROWS)
+
+    assert stats == len(ROWS)
+    assert connector.write_method == PostgreSQLConnector.METHOD_INSERT
+    assert connector.inserted == ROWS
+    assert _savepoints(connector._connection) == [
+        'SAVEPOINT bulk_copy', 'ROLLBACK TO SAVEPOINT bulk_copy', 'RELEASE SAVEPOINT bulk_copy'
+    ]
+
+
+def test_explicit_copy_does_not_fall_back(connector):
+    connector._connection = FakeConnection(copy_error=CopyRejected)
+    with pytest.raises(CopyRejected):
+        connector.bulk_insert('items', ROWS, method=PostgreSQLConnector.METHOD_COPY)
+    assert connector.inserted == []
+
+
+def test_data_errors_do_not_fall_back(connector):
+    connector._connection = FakeConnection(copy_error=CopyFailed)
+    with pytest.raises(CopyFailed):
+        connector.bulk_insert('items', ROWS)
+    assert connector.inserted == []
+
+
+def test_copy_failing_after_reading_rows_does_not_fall_back(connector):
+    # 已发送的行无法重放，回退会丢失这些行
+    connector._connection = FakeConnection(copy_error=CopyRejected, fail_after_read=True)
+    with pytest.raises(CopyRejected):
+        connector.bulk_insert('items', ROWS)
+    assert connector.inserted == []
+
+
+def test_insert_method_skips_copy(connector):
+    connector._connection = FakeConnection()
+    stats = connector.bulk_insert('items', ROWS, method=PostgreSQLConnector.METHOD_INSERT)
+
+    assert stats['method'] == 'insert'
+    assert connector.inserted == ROWS
+    assert connector._connection.statements == []
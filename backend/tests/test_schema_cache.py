@@ -0,0 +1,101 @@
+"""
+数据源结构缓存：过期前不访问数据源，过期后按结构指纹决定续期或重新获取，写入后清除缓存
+"""
+import pytest
+
+from connectors.connection_pool import pool_manager
+from services.datasource_write_service import datasource_write_service
+from services.schema_cache_service import schema_cache_service
+
+from tests.conftest import MemoryConnector
+
+
+class FingerprintConnector(MemoryConnector):
+    fingerprint = 'v1'
+    fingerprint_calls = 0
+
+    def schema_fingerprint(self):
+        FingerprintConnector.fingerprint_calls += 1
+        return FingerprintConnector.fingerprint
+
+
+@pytest.fixture
+def cached_datasource(memory_datasource, monkeypatch):
+    datasource, store, fail_on = memory_datasource
+    monkeypatch.setattr(FingerprintConnector, 'fingerprint', 'v1')
+    monkeypatch.setattr(FingerprintConnector, 'fingerprint_calls', 0)
+    monkeypatch.setattr(pool_manager, 'connector_for', lambda ds: FingerprintConnector(store, fail_on))
+    monkeypatch.setattr(schema_cache_service, 'ttl', 300)
+    loads = []
+
+    def get(**kwargs):
+        def loader(connector):
+            loads.append(1)
+            return {'tables': [{'name': 'items', 'row_count': len(store)}]}
+        return schema_cache_service.get(datasource, schema_cache_service.SCOPE_TABLES, loader, **kwargs)
+
+    return datasource, get, loads
+
+
+def test_fresh_entry_is_served_without_contacting_datasource(cached_datasource):
+    _, get, loads = cached_datasource
+    schema, meta = get()
+    assert meta['cached'] is False
+
+    assert get() == (schema, dict(meta, cached=True))
+    assert len(loads) == 1
+    assert FingerprintConnector.fingerprint_calls == 1
+
+
+def test_expired_entry_with_same_fingerprint_is_renewed(cached_datasource, monkeypatch):
+    _, get, loads = cached_datasource
+    get()
+    monkeypatch.setattr(schema_cache_service, 'ttl', 0)
+
+    _, meta = get()
+    assert meta['cached'] is True
+    assert len(loads) == 1
+    assert FingerprintConnector.fingerprint_calls == 2
+
+
+def test_expired_entry_with_changed_fingerprint_is_reloaded(cached_datasource, monkeypatch):
+    _, get, loads = cached_datasource
+    get()
+    monkeypatch.setattr(schema_cache_service, 'ttl', 0)
+    monkeypatch.setattr(FingerprintConnector, 'fingerprint', 'v2')
+
+    _, meta = get()
+    assert meta['cached'] is False
+    assert len(loads) == 2
+
+
+def test_expired_entry_without_fingerprint_is_reloaded(cached_datasource, monkeypatch):
+    _, get, loads = cached_datasource
+    monkeypatch.setattr(FingerprintConnector, 'fingerprint', None)
+    get()
+    monkeypatch.setattr(schema_cache_service, 'ttl', 0)
+
+    assert get()[1]['cached'] is False
+    assert len(loads) == 2
+
+
+def test_refresh_and_invalidate_reload(cached_datasource):
+    datasource, get, loads = cached_datasource
+    get()
+    assert get(refresh=True)[1]['cached'] is False
+    schema_cache_service.invalidate(datasource)
+    assert get()[1]['cached'] is False
+    assert len(loads) == 3
+
+
+def test_write_invalidates_cached_row_counts(cached_datasource, user):
+    datasource, get, loads = cached_datasource
+    assert get()[0]['tables'][0]['row_count'] == 0
+
+    write, _ = datasource_write_service.start_write(datasource, user.id, 'items', 200, chunk_size=100)
+    ok, _, _ = datasource_write_service.run_write(write, iter([{'id': i} for i in range(200)]))
+    assert ok
+
+    schema, meta = get()
+    assert meta['cached'] is False
+    assert schema['tables'][0]['row_count'] == 200
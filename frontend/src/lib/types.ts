@@ -158,7 +158,7 @@ export interface ScheduledTask {
     tableName?: string
 
     // 输出配置
-    outputType: 'none' | 'webhook' | 'email' | 'storage'
+    outputType: 'none' | 'webhook' | 'email' | 'storage' | 'datasource'
     outputConfig?: Record<string, unknown>
 
     // 状态
@@ -203,7 +203,7 @@ export interface CronPreset {
 
 // ==================== 关联数据 ====================
 
-export type RelationType = 'one-to-one' | 'one-to-many' | 'many-to-many'
+export type RelationType = 'one-to-one' | 'one-to-many' | 'many-to-many' | 'self-referencing'
 
 export interface TableRelation {
     id: string
@@ -28,6 +28,7 @@ const relationTypeOptions: { value: RelationType; label: string }[] = [
     { value: 'one-to-one', label: '一对一' },
     { value: 'one-to-many', label: '一对多' },
     { value: 'many-to-many', label: '多对多' },
+    { value: 'self-referencing', label: '自引用（树）' },
 ]
 
 // 初始表结构
@@ -429,7 +430,11 @@ export function RelationPage() {
                                 </div>
                                 <div className="flex">
                                     <dt className="w-20 font-mono">N:M</dt>
-                                    <dd>多对多：需要中间表进行关联</dd>
+                                    <dd>多对多：自动生成中间表（源表_目标表），行对不重复</dd>
+                                </div>
+                                <div className="flex">
+                                    <dt className="w-20 font-mono">Tree</dt>
+                                    <dd>自引用（树）：源表与目标表相同，目标字段填充父节点的键，根节点为空</dd>
                                 </div>
                             </dl>
                         </CardContent>